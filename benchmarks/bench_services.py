@@ -0,0 +1,289 @@
+"""
+Service-layer microbenchmarks (no HTTP).
+
+Calls the application services directly against in-memory and file-backed
+SQLite to show how each hot path scales:
+
+- VotingService.cast_vote with hash chains of growing length
+- ElectionService.create_election with 1k/10k/100k registered users
+- SqlAlchemyVoteRepository.get_results over 10^4..10^6 votes
+- AuthService.authenticate_user
+
+Each case reports the median of several runs. `--save-baseline` stores the
+medians in a JSON file; later runs are compared against that file and any
+case slower than the baseline by more than `--threshold` is flagged (exit
+code 1), so a regression shows up before it ships.
+
+Usage (from the Backend root):
+    python -m benchmarks.bench_services                     # quick sizes, compare to baseline
+    python -m benchmarks.bench_services --profile full --save-baseline
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.application import schemas
+from src.domain.vote_chain import GENESIS_HASH, compute_vote_hash
+from src.application.services.auth_service import AuthService
+from src.application.services.election_service import ElectionService
+from src.application.services.voting_service import VotingService
+from src.core.voted_bitmap import voted_bitmaps
+from src.infrastructure.database.models import Base, User, Election, Candidate, Vote, VotingToken
+from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository, SqlAlchemyCandidateRepository
+from src.infrastructure.repositories.user_repository import SqlAlchemyUserRepository
+from src.infrastructure.repositories.vote_repository import SqlAlchemyVoteRepository, SqlAlchemyVotingTokenRepository
+from src.infrastructure.security.utils import get_password_hash
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines.json"
+PASSWORD = "password123"
+
+PROFILES = {
+    "quick": {
+        "chain_lengths": [100, 1_000, 10_000],
+        "user_counts": [1_000, 10_000],
+        "vote_counts": [10_000, 100_000],
+    },
+    "full": {
+        "chain_lengths": [100, 1_000, 10_000, 100_000],
+        "user_counts": [1_000, 10_000, 100_000],
+        "vote_counts": [10_000, 100_000, 1_000_000],
+    },
+}
+
+INSERT_CHUNK = 20_000
+
+
+class Backend:
+    """A fresh database per case: in-memory, or a SQLite file in a temp dir."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        if kind == "memory":
+            self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        else:
+            self.path = Path(tempfile.mkdtemp(prefix="evoting-bench-")) / "bench.db"
+            self.engine = create_engine(f"sqlite:///{self.path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.db = Session(bind=self.engine, autoflush=False)
+        # Election ids start at 1 again in every fresh database: forget the previous case's voters.
+        voted_bitmaps().reset()
+
+    def close(self):
+        self.db.close()
+        self.engine.dispose()
+        if self.kind == "file":
+            self.path.unlink(missing_ok=True)
+
+    def bulk_insert(self, model, rows: List[dict]) -> None:
+        with self.engine.begin() as conn:
+            for i in range(0, len(rows), INSERT_CHUNK):
+                conn.execute(insert(model), rows[i:i + INSERT_CHUNK])
+
+    def election_service(self) -> ElectionService:
+        return ElectionService(
+            SqlAlchemyElectionRepository(self.db), SqlAlchemyCandidateRepository(self.db),
+            SqlAlchemyVotingTokenRepository(self.db), SqlAlchemyUserRepository(self.db),
+        )
+
+    def voting_service(self) -> VotingService:
+        return VotingService(SqlAlchemyVoteRepository(self.db), SqlAlchemyVotingTokenRepository(self.db), SqlAlchemyElectionRepository(self.db))
+
+
+_password_hash: Optional[str] = None
+
+
+def password_hash() -> str:
+    global _password_hash
+    if _password_hash is None:
+        _password_hash = get_password_hash(PASSWORD)
+    return _password_hash
+
+
+def add_users(backend: Backend, count: int, prefix: str = "user") -> List[int]:
+    now = datetime.now(timezone.utc)
+    backend.bulk_insert(User, [
+        {"username": f"{prefix}_{i}", "password_hash": password_hash(), "role": "voter", "created_at": now}
+        for i in range(count)
+    ])
+    with backend.engine.connect() as conn:
+        return conn.execute(select(User.id).where(User.username.like(f"{prefix}_%")).order_by(User.id)).scalars().all()
+
+
+def add_active_election(backend: Backend, candidates: int = 4) -> tuple:
+    now = datetime.now(timezone.utc)
+    admin_id = add_users(backend, 1, prefix="admin")[0]
+    backend.bulk_insert(Election, [{
+        "title": "Benchmark", "description": "", "start_time": now - timedelta(hours=1),
+        "end_time": now + timedelta(days=1), "status": "active", "created_by": admin_id,
+    }])
+    with backend.engine.connect() as conn:
+        election_id = conn.execute(select(Election.id).order_by(Election.id.desc())).scalars().first()
+    backend.bulk_insert(Candidate, [{"name": f"Candidate {c}", "bio": "", "election_id": election_id} for c in range(candidates)])
+    with backend.engine.connect() as conn:
+        candidate_ids = conn.execute(select(Candidate.id).where(Candidate.election_id == election_id)).scalars().all()
+    return election_id, candidate_ids
+
+
+def add_vote_chain(backend: Backend, election_id: int, candidate_ids: List[int], length: int) -> None:
+    now = datetime.now(timezone.utc)
+    prev_hash = GENESIS_HASH
+    rows = []
+    for i in range(length):
+        candidate_id = candidate_ids[i % len(candidate_ids)]
+        vote_hash = compute_vote_hash(prev_hash, -i, candidate_id, now.isoformat())
+        rows.append({"vote_hash": vote_hash, "prev_vote_hash": prev_hash, "created_at": now, "election_id": election_id, "candidate_id": candidate_id})
+        prev_hash = vote_hash
+    backend.bulk_insert(Vote, rows)
+
+
+def measure(fn: Callable[[], None], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "max_s": max(samples), "runs": repeat}
+
+
+# --- Cases ---
+
+def bench_cast_vote(kind: str, chain_length: int, repeat: int) -> Dict[str, float]:
+    backend = Backend(kind)
+    try:
+        election_id, candidate_ids = add_active_election(backend)
+        add_vote_chain(backend, election_id, candidate_ids, chain_length)
+        voters = add_users(backend, repeat)
+        expires = datetime.now(timezone.utc) + timedelta(days=1)
+        backend.bulk_insert(VotingToken, [
+            {"token_hash": hashlib.sha256(f"bench-{user_id}".encode()).hexdigest(), "is_used": False,
+             "expires_at": expires, "election_id": election_id, "user_id": user_id}
+            for user_id in voters
+        ])
+        service = backend.voting_service()
+        pending = list(voters)
+
+        def cast():
+            service.cast_vote(schemas.VoteCastRequest(election_id=election_id, candidate_id=candidate_ids[0], user_id=pending.pop()))
+
+        return measure(cast, repeat)
+    finally:
+        backend.close()
+
+
+def bench_create_election(kind: str, user_count: int, repeat: int) -> Dict[str, float]:
+    backend = Backend(kind)
+    try:
+        admin_id = add_users(backend, 1, prefix="admin")[0]
+        add_users(backend, user_count)
+        service = backend.election_service()
+        now = datetime.now(timezone.utc)
+        election = schemas.ElectionCreate(
+            title="Benchmark", description="", start_time=now, end_time=now + timedelta(days=1),
+            candidates=[schemas.CandidateCreate(name=f"Candidate {c}") for c in range(4)],
+        )
+        return measure(lambda: service.create_election(election, user_id=admin_id), repeat)
+    finally:
+        backend.close()
+
+
+def bench_get_results(kind: str, vote_count: int, repeat: int) -> Dict[str, float]:
+    backend = Backend(kind)
+    try:
+        election_id, candidate_ids = add_active_election(backend)
+        add_vote_chain(backend, election_id, candidate_ids, vote_count)
+        repo = SqlAlchemyVoteRepository(backend.db)
+        return measure(lambda: repo.get_results(election_id), repeat)
+    finally:
+        backend.close()
+
+
+def bench_authenticate(kind: str, repeat: int) -> Dict[str, float]:
+    backend = Backend(kind)
+    try:
+        add_users(backend, 1_000)
+        service = AuthService(SqlAlchemyUserRepository(backend.db))
+        return measure(lambda: service.authenticate_user("user_500", PASSWORD), repeat)
+    finally:
+        backend.close()
+
+
+def run(profile: str, backends: List[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    sizes = PROFILES[profile]
+    results: Dict[str, Dict[str, float]] = {}
+    for kind in backends:
+        for n in sizes["chain_lengths"]:
+            results[f"cast_vote[{kind},chain={n}]"] = bench_cast_vote(kind, n, repeat)
+        for n in sizes["user_counts"]:
+            results[f"create_election[{kind},users={n}]"] = bench_create_election(kind, n, repeat)
+        for n in sizes["vote_counts"]:
+            results[f"get_results[{kind},votes={n}]"] = bench_get_results(kind, n, repeat)
+        results[f"authenticate_user[{kind}]"] = bench_authenticate(kind, repeat)
+        for case, result in results.items():
+            if case.split("[")[1].startswith(kind):
+                print(f"{case:<45} median {result['median_s'] * 1000:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[dict]:
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline:
+            continue
+        before = baseline[case]["median_s"]
+        ratio = result["median_s"] / before if before else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append({"case": case, "baseline_s": before, "current_s": result["median_s"], "ratio": ratio})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Service-layer microbenchmarks.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--backend", choices=["memory", "file"], action="append", help="Repeatable; default runs both.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run's medians as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown before a case is flagged (0.25 = 25%%).")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args(argv)
+
+    results = run(args.profile, args.backend or ["memory", "file"], args.repeat)
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline.exists() else {}
+    regressions = compare(results, baseline, args.threshold)
+    report = {
+        "profile": args.profile,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "results": results,
+        "regressions": regressions,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({"profile": args.profile, "created_at": report["created_at"], "results": results}, indent=2))
+    for regression in regressions:
+        print(f"REGRESSION {regression['case']}: {regression['ratio']:.2f}x slower than baseline", file=sys.stderr)
+    return 1 if regressions and not args.save_baseline else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+End-to-end load test for voting-day traffic.
+
+Seeds a throwaway SQLite database with N voters and M active elections,
+boots the API with uvicorn in a subprocess, and drives an open-loop mix of
+logins, voting-token requests, ballots and results polling at a target
+request rate. Prints (or writes) a machine-readable JSON report with
+throughput and p50/p95/p99 latency and error rate per route, so releases
+can be compared run against run.
+
+Usage (from the Backend root):
+    python -m benchmarks.load_test --voters 500 --elections 5 --rate 200 --duration 30 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = "password123"
+
+# Relative weight of each operation in the traffic mix.
+DEFAULT_MIX = {"login": 2, "token": 2, "vote": 2, "results": 4}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def seed(database_url: str, voters: int, elections: int, candidates: int) -> Dict[int, List[int]]:
+    """Creates the schema, voters and active elections; returns {election_id: [candidate ids]}."""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "load-test-secret")
+    from sqlalchemy import create_engine, insert, select
+    from src.infrastructure.database.models import Base, User, Election, Candidate
+    from src.infrastructure.security.utils import get_password_hash
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    # One bcrypt hash shared by every voter keeps seeding fast.
+    password_hash = get_password_hash(PASSWORD)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"username": "admin", "password_hash": password_hash, "role": "admin", "created_at": now}])
+        conn.execute(insert(User), [
+            {"username": f"load_voter_{i}", "password_hash": password_hash, "role": "voter", "created_at": now}
+            for i in range(voters)
+        ])
+        admin_id = conn.execute(select(User.id).where(User.username == "admin")).scalar_one()
+        conn.execute(insert(Election), [
+            {"title": f"Load Election {i}", "description": "Load test", "start_time": now - timedelta(minutes=1),
+             "end_time": now + timedelta(days=1), "status": "active", "created_by": admin_id}
+            for i in range(elections)
+        ])
+        election_ids = conn.execute(select(Election.id).order_by(Election.id)).scalars().all()
+        conn.execute(insert(Candidate), [
+            {"name": f"Candidate {c}", "bio": "", "election_id": election_id}
+            for election_id in election_ids for c in range(candidates)
+        ])
+        rows = conn.execute(select(Candidate.election_id, Candidate.id)).all()
+    engine.dispose()
+    ballot: Dict[int, List[int]] = defaultdict(list)
+    for election_id, candidate_id in rows:
+        ballot[election_id].append(candidate_id)
+    return dict(ballot)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def boot_server(database_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env.setdefault("SECRET_KEY", "load-test-secret")
+    # Every virtual voter comes from this one IP; measure the API, not the admission control.
+    env.setdefault("RATE_LIMIT_ENABLED", "false")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=str(ROOT), env=env,
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout}s")
+
+
+class VirtualVoters:
+    """
+    Tracks where each simulated voter is in the journey
+    (login -> voting token -> ballot) so every request in the mix is valid.
+    """
+
+    def __init__(self, voters: int, ballot: Dict[int, List[int]]):
+        self.ballot = ballot
+        self.logged_out = [f"load_voter_{i}" for i in range(voters)]
+        random.shuffle(self.logged_out)
+        self.sessions: Dict[str, dict] = {}  # username -> {"jwt", "user_id", "pending": [election ids]}
+        self.need_token: List[str] = []
+        self.ready: List[tuple] = []  # (username, election_id, raw voting token)
+
+
+class LoadTest:
+    def __init__(self, base_url: str, voters: VirtualVoters, rate: float, duration: float, mix: Dict[str, int], max_in_flight: int):
+        self.base_url = base_url
+        self.voters = voters
+        self.rate = rate
+        self.duration = duration
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.max_in_flight = max_in_flight
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status_counts: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+        self.in_flight = 0
+
+    async def _timed(self, route: str, request) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.latencies[route].append(time.perf_counter() - started)
+            self.errors[route] += 1
+            self.status_counts[route][0] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - started)
+        self.status_counts[route][response.status_code] += 1
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def _pick(self) -> str:
+        op = random.choices(self.ops, self.weights)[0]
+        # Fall back to an earlier step of the journey when nobody is ready for this one.
+        if op == "vote" and not self.voters.ready:
+            op = "token"
+        if op == "token" and not self.voters.need_token:
+            op = "login"
+        if op == "results" and not self.voters.sessions:
+            op = "login"
+        if op == "login" and not self.voters.logged_out:
+            op = "results" if self.voters.sessions else None
+        return op
+
+    async def _login(self, client: httpx.AsyncClient) -> None:
+        username = self.voters.logged_out.pop()
+        response = await self._timed("POST /token", client.post("/token", data={"username": username, "password": PASSWORD}))
+        if response is None or response.status_code != 200:
+            self.voters.logged_out.append(username)
+            return
+        jwt = response.json()["access_token"]
+        me = await self._timed("GET /users/me/", client.get("/users/me/", headers={"Authorization": f"Bearer {jwt}"}))
+        if me is None or me.status_code != 200:
+            self.voters.logged_out.append(username)
+            return
+        self.voters.sessions[username] = {"jwt": jwt, "user_id": me.json()["id"], "pending": list(self.voters.ballot)}
+        self.voters.need_token.append(username)
+
+    async def _token(self, client: httpx.AsyncClient) -> None:
+        username = self.voters.need_token.pop(random.randrange(len(self.voters.need_token)))
+        session = self.voters.sessions[username]
+        election_id = session["pending"].pop()
+        if session["pending"]:
+            self.voters.need_token.append(username)
+        response = await self._timed(
+            "POST /elections/{election_id}/token",
+            client.post(f"/elections/{election_id}/token", headers={"Authorization": f"Bearer {session['jwt']}"}),
+        )
+        if response is not None and response.status_code == 200:
+            self.voters.ready.append((username, election_id, response.json()["voting_token"]))
+
+    async def _vote(self, client: httpx.AsyncClient) -> None:
+        _, election_id, voting_token = self.voters.ready.pop(random.randrange(len(self.voters.ready)))
+        # The token identifies the voter: one indexed probe-and-burn on the server.
+        body = {
+            "election_id": election_id,
+            "candidate_id": random.choice(self.voters.ballot[election_id]),
+            "voting_token": voting_token,
+        }
+        await self._timed("POST /api/votes", client.post("/api/votes", json=body))
+
+    async def _results(self, client: httpx.AsyncClient) -> None:
+        session = random.choice(list(self.voters.sessions.values()))
+        election_id = random.choice(list(self.voters.ballot))
+        await self._timed(
+            "GET /api/elections/{election_id}/results",
+            client.get(f"/api/elections/{election_id}/results", headers={"Authorization": f"Bearer {session['jwt']}"}),
+        )
+
+    async def _run_one(self, client: httpx.AsyncClient, op: str) -> None:
+        self.in_flight += 1
+        try:
+            await getattr(self, f"_{op}")(client)
+        finally:
+            self.in_flight -= 1
+
+    async def run(self) -> float:
+        """Open-loop arrivals: requests start on schedule whether or not earlier ones finished."""
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30.0) as client:
+            tasks = set()
+            started = time.perf_counter()
+            interval = 1.0 / self.rate
+            next_at = started
+            while next_at - started < self.duration:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_at += interval
+                op = self._pick()
+                if op is None:
+                    break
+                if self.in_flight >= self.max_in_flight:
+                    self.dropped += 1
+                    continue
+                task = asyncio.create_task(self._run_one(client, op))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            return time.perf_counter() - started
+
+    def report(self, elapsed: float, config: dict) -> dict:
+        routes = {}
+        total = 0
+        for route, values in sorted(self.latencies.items()):
+            values.sort()
+            total += len(values)
+            routes[route] = {
+                "count": len(values),
+                "errors": self.errors[route],
+                "error_rate": self.errors[route] / len(values),
+                "throughput_rps": len(values) / elapsed,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "mean_ms": sum(values) / len(values) * 1000,
+                "max_ms": values[-1] * 1000,
+                "status_codes": {str(code): n for code, n in sorted(self.status_counts[route].items())},
+            }
+        return {
+            "config": config,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "elapsed_seconds": elapsed,
+            "total_requests": total,
+            "throughput_rps": total / elapsed if elapsed else 0.0,
+            "error_rate": sum(self.errors.values()) / total if total else 0.0,
+            "dropped_arrivals": self.dropped,
+            "routes": routes,
+        }
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        op, weight = part.split("=")
+        if op not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{op}' (expected one of {', '.join(DEFAULT_MIX)})")
+        mix[op] = int(weight)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description="Voting-day load test for the e-voting API.")
+    parser.add_argument("--voters", type=int, default=200)
+    parser.add_argument("--elections", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=100.0, help="Target request rate (requests/second).")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic to generate.")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. login=2,token=2,vote=2,results=4")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Arrivals beyond this many open requests are dropped and counted.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix="evoting-load-")
+    database_url = f"sqlite:///{Path(workdir) / 'load.db'}"
+    ballot = seed(database_url, args.voters, args.elections, args.candidates)
+
+    port = free_port()
+    server = boot_server(database_url, port, args.workers)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_ready(base_url))
+        test = LoadTest(base_url, VirtualVoters(args.voters, ballot), args.rate, args.duration, args.mix, args.max_in_flight)
+        elapsed = asyncio.run(test.run())
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    report = test.report(elapsed, config)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,168 @@
+from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-# Imports from new structure
-from src.infrastructure.database.session import engine, SessionLocal
-from src.infrastructure.database.models import Base
-from src.infrastructure.database.seeder import seed_database  # <--- Import Seeder
-from src.presentation.api.v1 import auth_router, election_router, vote_router
-from src.core.scheduler import scheduler
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from src.core import config
+from src.core.config import Settings, get_settings
 
-# --- SCHEDULER ---
+# Nothing here touches the database or reads .env at import time: the engine,
+# DDL, seeding and the scheduler start in the lifespan hook, and the routers
+# are imported when an app is built. Run with `uvicorn main:app` or
+# `uvicorn main:create_app --factory`.
+
+origins = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "https://fluffy-waffle-omega.vercel.app",
+]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Run Seeder
-    with SessionLocal() as db:
-        seed_database(db)
+    from src.infrastructure.database.session import all_engines, get_engine, new_session
+    from src.infrastructure.database.models import Base
+    from src.infrastructure.database.migrations import upgrade_schema
+    from src.infrastructure.database.seeder import seed_database
+    from src.infrastructure.database.snapshot import restore_if_empty
+    from src.infrastructure.database.instrumentation import instrument_engine, track_queries, trace_queries
+    from src.infrastructure.vote_journal import close_journal, open_journal
+    from src.core.bulkhead import reserve_threads
+    from src.core.leader import LeaderLock
+    from src.core.scheduler import scheduler
+    from src.core.tracing import BatchSpanProcessor, exporter_from_settings, tracer
+    from src.application.jobs import run_due_transitions, load_scheduled_transitions, sweep_voting_tokens
+
+    settings = get_settings()
+    engine = get_engine()
+
+    # An empty database is filled from the snapshot in one step, before DDL and seeding.
+    if settings.DB_SNAPSHOT_PATH:
+        restore_if_empty(engine, settings.DB_SNAPSHOT_PATH)
+
+    # Create database tables, then add what create_all cannot to tables of an older version
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+    # Startup: Run Seeder (SEED_DATABASE=false skips it)
+    if settings.SEED_DATABASE:
+        with new_session() as db:
+            seed_database(db)
+
+    if settings.METRICS_ENABLED:
+        for name, group_engine in all_engines().items():
+            instrument_engine(group_engine, name)
+        track_queries()
+
+    # Journal intake: ballots acknowledged before a restart are applied before new ones are taken.
+    journal = None
+    if settings.VOTE_JOURNAL_PATH:
+        journal = open_journal(settings.VOTE_JOURNAL_PATH)
+        journal.drain(new_session, settings.VOTE_JOURNAL_APPLY_BATCH_SIZE)
+        journal.start_applier(new_session, settings.VOTE_JOURNAL_APPLY_INTERVAL_SECONDS, settings.VOTE_JOURNAL_APPLY_BATCH_SIZE)
+
+    # Sync endpoints run on anyio's worker threads: make room for every group's limit.
+    bulkheads = getattr(app.state, "bulkheads", None)
+    if bulkheads:
+        reserve_threads(bulkheads)
+
+    if settings.TRACING_ENABLED:
+        tracer.configure(BatchSpanProcessor(exporter_from_settings(settings)), settings.TRACING_SAMPLE_RATIO)
+        trace_queries()
+
+    # Startup: Scheduler'ı başlat (heap is rebuilt from the elections table).
+    # With several uvicorn workers only the lock holder runs it; the others
+    # wait on the lock and take over as soon as the leader exits.
+    def start_scheduler():
+        if not scheduler.running:
+            scheduler.register("transition", run_due_transitions)
+            scheduler.register("token_sweep", sweep_voting_tokens)
+            scheduler.add_periodic("token_sweep", settings.TOKEN_SWEEP_INTERVAL_SECONDS)
+            scheduler.start(loader=load_scheduled_transitions, resync_interval=settings.SCHEDULER_RESYNC_SECONDS)
 
-    # Startup: Scheduler'ı başlat
-    if not scheduler.running:
-        scheduler.start()
+    leader = LeaderLock(settings.SCHEDULER_LOCK_FILE)
+    leader.campaign(start_scheduler)
     yield
-    # Shutdown: Scheduler'ı kapat
-    scheduler.shutdown()
+    # Shutdown: Scheduler'ı kapat, then hand leadership to the next worker
+    if scheduler.running:
+        scheduler.shutdown()
+    leader.release()
+    if journal is not None:
+        journal.stop_applier()
+        journal.drain(new_session, settings.VOTE_JOURNAL_APPLY_BATCH_SIZE)
+        close_journal()
+    tracer.shutdown()
 
 
-app = FastAPI(lifespan=lifespan)
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Builds the API. Passing `settings` replaces the ones read from the environment."""
+    if settings is not None:
+        config.configure(settings)
+    settings = get_settings()
 
-origins = [
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-    "https://fluffy-waffle-omega.vercel.app",
-]
+    from src.presentation.api.v1 import auth_router, election_router, vote_router, admin_router
+    from src.presentation.middleware import MetricsMiddleware, QueryAccountingMiddleware, TracingMiddleware
+
+    app = FastAPI(lifespan=lifespan)
+
+    # Added first, so it runs inside the rate limiter and CORS: only admitted
+    # requests queue for a group slot, and 503s still carry CORS headers.
+    if settings.BULKHEADS_ENABLED:
+        from src.core.bulkhead import bulkheads_from_settings
+        from src.presentation.middleware import BulkheadMiddleware
+        app.state.bulkheads = bulkheads_from_settings(settings)
+        app.add_middleware(BulkheadMiddleware, bulkheads=app.state.bulkheads)
+
+    # Added before CORS so it runs inside it: 429 responses still carry CORS headers.
+    if settings.RATE_LIMIT_ENABLED:
+        from src.core.rate_limit import Limit, limiter_from_settings
+        from src.presentation.middleware import RateLimitMiddleware, default_rate_limit_rules
+        app.add_middleware(
+            RateLimitMiddleware,
+            limiter=limiter_from_settings(settings),
+            rules=default_rate_limit_rules(settings),
+            global_limit=Limit.parse(settings.RATE_LIMIT_GLOBAL),
+        )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(QueryAccountingMiddleware, expose_headers=settings.DEBUG, n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD)
+        app.add_middleware(MetricsMiddleware)
+    if settings.TRACING_ENABLED:
+        app.add_middleware(TracingMiddleware)
+
+    # Include Routers
+    app.include_router(auth_router.router)
+    app.include_router(election_router.router)
+    app.include_router(vote_router.router)
+    app.include_router(admin_router.router)
+    if settings.METRICS_ENABLED:
+        from src.presentation.api.v1 import metrics_router
+        app.include_router(metrics_router.router)
+
+    # Root endpoint
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to the Secure E-Voting API (Refactored)"}
+
+    return app
+
+
+_app: Optional[FastAPI] = None
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include Routers
-app.include_router(auth_router.router)
-app.include_router(election_router.router)
-app.include_router(vote_router.router)
-
-# Root endpoint
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the Secure E-Voting API (Refactored)"}
\ No newline at end of file
+# `main.app` is built on first access, so `uvicorn main:app` and
+# `from main import app` keep working without import-time side effects.
+def __getattr__(name):
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,31 +1,118 @@
-from src.infrastructure.database.session import SessionLocal
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from src.core import metrics
+from src.core.config import get_settings
+from src.infrastructure.database.session import new_session
 from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository
+from src.infrastructure.repositories.vote_repository import SqlAlchemyVotingTokenRepository, SqlAlchemyVoteRepository
 import logging
+import time
 
 # Loglama görebilmek için basit bir konfigürasyon
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def start_election_job(election_id: int):
-    """Seçimi başlatan arka plan görevi"""
-    db = SessionLocal()
+# Outcome of the most recent token sweep (rows reclaimed, time spent), for monitoring.
+last_token_sweep: Dict[str, Any] = {}
+
+metrics.token_sweep_duration_seconds.set_function(lambda: last_token_sweep.get("total_seconds", 0.0))
+
+# Downstream hooks called with {"active": [...ids], "completed": [...ids]} after each tick.
+transition_hooks: List[Callable[[Dict[str, List[int]]], None]] = []
+
+def run_due_transitions(election_ids=None) -> Dict[str, List[int]]:
+    """
+    Seçim durumlarını güncelleyen arka plan görevi.
+
+    The heap entries only decide *when* to wake up; the work itself is one
+    set-based UPDATE per target status covering every election that is due,
+    so stale or duplicate entries cost nothing extra.
+    """
+    db = new_session()
     try:
         repo = SqlAlchemyElectionRepository(db)
-        repo.start_election(election_id)
-        logger.info(f"JOB: Election {election_id} has been STARTED automatically.")
+        changed = repo.transition_due_elections(datetime.now(timezone.utc))
     except Exception as e:
-        logger.error(f"JOB ERROR (Start Election {election_id}): {str(e)}")
+        logger.error(f"JOB ERROR (Election transitions): {str(e)}")
+        return {"active": [], "completed": []}
     finally:
         db.close()
 
-def end_election_job(election_id: int):
-    """Seçimi bitiren arka plan görevi"""
-    db = SessionLocal()
+    if changed["active"]:
+        logger.info(f"JOB: Elections {changed['active']} have been STARTED automatically.")
+    if changed["completed"]:
+        logger.info(f"JOB: Elections {changed['completed']} have been ENDED automatically.")
+    for hook in transition_hooks:
+        try:
+            hook(changed)
+        except Exception as e:
+            logger.error(f"JOB ERROR (Transition hook {getattr(hook, '__name__', hook)}): {str(e)}")
+    return changed
+
+def load_scheduled_transitions():
+    """Rebuilds the lifecycle heap from the elections table at startup."""
+    db = new_session()
     try:
         repo = SqlAlchemyElectionRepository(db)
-        repo.end_election(election_id)
-        logger.info(f"JOB: Election {election_id} has been ENDED automatically.")
+        entries = []
+        for election_id, start_time, end_time, status in repo.get_scheduled_transitions():
+            if status == "pending" and start_time is not None:
+                entries.append((start_time, "transition", election_id))
+            if end_time is not None:
+                entries.append((end_time, "transition", election_id))
+        return entries
+    finally:
+        db.close()
+
+def sweep_voting_tokens(_payloads=None, batch_size: Optional[int] = None, compact: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Kullanılmayacak oy tokenlarını temizleyen bakım görevi.
+
+    Deletes the unused tokens of completed elections in chunks of `batch_size`, each
+    in its own short transaction, so voters writing to the same table never
+    wait behind one long delete. Expired vote idempotency keys are purged the
+    same way. Optionally compacts the database afterwards.
+    """
+    settings = get_settings()
+    batch_size = batch_size or settings.TOKEN_SWEEP_BATCH_SIZE
+    compact = settings.TOKEN_SWEEP_COMPACT if compact is None else compact
+    started = time.perf_counter()
+    rows_deleted = 0
+    keys_deleted = 0
+    chunks = 0
+    db = new_session()
+    try:
+        repo = SqlAlchemyVotingTokenRepository(db)
+        now = datetime.now(timezone.utc)
+        while True:
+            deleted = repo.delete_completed_election_tokens(now, batch_size)
+            rows_deleted += deleted
+            chunks += 1
+            if deleted < batch_size:
+                break
+        vote_repo = SqlAlchemyVoteRepository(db)
+        while True:
+            deleted = vote_repo.delete_expired_idempotency_keys(now, batch_size)
+            keys_deleted += deleted
+            if deleted < batch_size:
+                break
+        sweep_seconds = time.perf_counter() - started
+        if compact and rows_deleted:
+            repo.compact()
     except Exception as e:
-        logger.error(f"JOB ERROR (End Election {election_id}): {str(e)}")
+        logger.error(f"JOB ERROR (Token sweep): {str(e)}")
+        sweep_seconds = time.perf_counter() - started
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+    last_token_sweep.update({
+        "rows_deleted": rows_deleted,
+        "idempotency_keys_deleted": keys_deleted,
+        "chunks": chunks,
+        "sweep_seconds": sweep_seconds,
+        "total_seconds": time.perf_counter() - started,
+        "finished_at": datetime.now(timezone.utc),
+    })
+    metrics.token_sweep_rows_deleted_total.inc(amount=rows_deleted)
+    logger.info(f"JOB: Token sweep reclaimed {rows_deleted} rows in {chunks} chunks and {keys_deleted} idempotency keys ({last_token_sweep['total_seconds']:.3f}s).")
+    return dict(last_token_sweep)
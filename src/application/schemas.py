@@ -1,8 +1,8 @@
 # Defines the data shapes (schemas) that are used for API requests and responses
 # It helps with data validation and documentation
 from datetime import datetime
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import AliasChoices, BaseModel, Field, ConfigDict, model_validator
+from typing import List, Literal, Optional
 
 # Schema for the access token response
 class Token(BaseModel):
@@ -64,12 +64,26 @@ class ElectionBase(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
 
-class ElectionCreate(ElectionBase):
+# Who may vote: everyone, one role, or an explicit roster of user ids
+class ElectionEligibility(BaseModel):
+    eligibility: Literal["all", "role", "roster"] = "all"
+    eligible_role: Optional[str] = None
+    roster: List[int] = []
+
+    @model_validator(mode="after")
+    def check_rule(self):
+        if self.eligibility == "role" and not self.eligible_role:
+            raise ValueError("eligible_role is required when eligibility is 'role'")
+        if self.eligibility != "roster" and self.roster:
+            raise ValueError("roster is only allowed when eligibility is 'roster'")
+        return self
+
+class ElectionCreate(ElectionBase, ElectionEligibility):
     # The user sends a list of candidates when creating an election
     candidates: List[CandidateCreate]
 
 # NEW: Schema for the specific API request (POST /api/elections)
-class ElectionCreateRequest(BaseModel):
+class ElectionCreateRequest(ElectionEligibility):
     title: str
     description: Optional[str] = None
     start_time: Optional[datetime] = None
@@ -77,9 +91,15 @@ class ElectionCreateRequest(BaseModel):
     candidate_names: List[str]
     creator_id: Optional[int] = None
 
+class RosterUpdate(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1)
+
 class Election(ElectionBase):
     id: int
     status: str
+    status_override: Optional[str] = None
+    eligibility: str = "all"
+    eligible_role: Optional[str] = None
     created_by: int
     candidates: List[Candidate] = []
 
@@ -91,6 +111,10 @@ class ElectionUpdate(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
 
+# Admin override of the time-derived status; null returns control to the clock
+class ElectionStatusOverride(BaseModel):
+    status: Optional[Literal["pending", "active", "completed"]] = None
+
 # --- VOTING SCHEMAS ---
 
 class VoteCreate(BaseModel):
@@ -101,12 +125,36 @@ class VoteCreate(BaseModel):
 class VoteCastRequest(BaseModel):
     election_id: int
     candidate_id: int
-    user_id: int
+    # The voter is either named, or identified by the token from POST /elections/{id}/token (preferred)
+    user_id: Optional[int] = None
+    voting_token: Optional[str] = Field(None, max_length=128, validation_alias=AliasChoices("voting_token", "token"))
+
+    @model_validator(mode="after")
+    def check_voter(self):
+        if self.user_id is None and self.voting_token is None:
+            raise ValueError("Either voting_token or user_id is required")
+        return self
 
 class VoteReceipt(BaseModel):
     vote_hash: str
     timestamp: datetime
 
+# Offline kiosks replay their buffered ballots in one request.
+class VoteBatchRequest(BaseModel):
+    ballots: List[VoteCastRequest] = Field(..., min_length=1, max_length=5000)
+
+class BallotResult(BaseModel):
+    index: int
+    success: bool
+    vote_hash: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    error: Optional[str] = None
+
+class VoteBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BallotResult]
+
 
 # --- RESULT SCHEMAS ---
 
@@ -120,3 +168,20 @@ class ElectionResult(BaseModel):
     title: str
     status: str
     results: List[CandidateResult]
+
+class TimelineSeries(BaseModel):
+    candidate_id: int
+    name: str
+    votes: List[int]
+    cumulative: List[int]
+
+# Bucket i covers [start + i * bucket_seconds, start + (i + 1) * bucket_seconds).
+class ElectionTimeline(BaseModel):
+    election_id: int
+    status: str
+    start: datetime
+    bucket_seconds: int
+    total_votes: int
+    turnout: List[int]
+    cumulative_turnout: List[int]
+    candidates: List[TimelineSeries]
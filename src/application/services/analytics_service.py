@@ -0,0 +1,109 @@
+from typing import Optional
+import datetime
+import itertools
+import math
+import numpy as np
+from src.domain.interfaces import IVoteRepository, IElectionRepository
+from src.domain.election_status import COMPLETED
+from src.application import schemas
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+from src.core.tracing import traced_class
+from src.infrastructure.vote_journal import vote_journal
+
+# Keeps a response (and the work to build it) bounded whatever bucket size is asked for.
+MAX_BUCKETS = 10_000
+
+_timeline_cache: Optional[TTLCache] = None
+
+def timeline_cache() -> TTLCache:
+    """Per-process cache of completed elections' ballot columns (timestamps, candidate ids), keyed by election and window."""
+    global _timeline_cache
+    if _timeline_cache is None:
+        settings = get_settings()
+        _timeline_cache = TTLCache(settings.ANALYTICS_CACHE_SIZE, settings.ANALYTICS_CACHE_TTL_SECONDS)
+    return _timeline_cache
+
+@traced_class
+class AnalyticsService:
+    def __init__(self, vote_repo: IVoteRepository, election_repo: IElectionRepository):
+        self.vote_repo = vote_repo
+        self.election_repo = election_repo
+
+    def get_timeline(self, election_id: int, bucket_seconds: int = 3600) -> Optional[schemas.ElectionTimeline]:
+        """
+        Turnout and per-candidate votes per bucket, with cumulative curves.
+        The ballots are read as two columns in one scan and binned with
+        NumPy, never with a query per bucket.
+        """
+        election = self.election_repo.get_by_id(election_id)
+        if not election:
+            return None
+        timestamps, voted_for = self._columns(election)
+
+        # Window: the election's, widened to any ballot cast outside it (e.g. opened early by an admin),
+        # and aligned to the bucket size so hourly buckets start on the hour.
+        now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        start = election.start_time.timestamp() if election.start_time else now
+        end = min(election.end_time.timestamp(), now) if election.end_time else now
+        if len(timestamps):
+            start, end = min(start, timestamps.min()), max(end, timestamps.max())
+        start = math.floor(start / bucket_seconds) * bucket_seconds
+        buckets = max(1, math.ceil((end - start) / bucket_seconds))
+        if buckets > MAX_BUCKETS:
+            raise ValueError(f"The election spans {buckets} buckets of {bucket_seconds}s; use larger buckets (at most {MAX_BUCKETS}).")
+
+        bucket = np.minimum(((timestamps - start) // bucket_seconds).astype(np.int64), buckets - 1)
+        candidates = sorted(election.candidates, key=lambda candidate: candidate.id)
+        candidate_ids = np.array([candidate.id for candidate in candidates], dtype=np.int64)
+        # One bincount over (candidate row, bucket) cells gives every candidate's histogram at once.
+        # Ballots for a candidate that was deleted since still count towards turnout.
+        row = np.searchsorted(candidate_ids, voted_for)
+        known = row < len(candidate_ids)
+        known[known] = candidate_ids[row[known]] == voted_for[known]
+        cells = row[known] * buckets + bucket[known]
+        per_candidate = np.bincount(cells, minlength=len(candidates) * buckets).reshape(len(candidates), buckets)
+        cumulative = np.cumsum(per_candidate, axis=1)
+        turnout = np.bincount(bucket, minlength=buckets)
+
+        timeline = schemas.ElectionTimeline(
+            election_id=election.id,
+            status=election.status,
+            start=datetime.datetime.fromtimestamp(start, datetime.timezone.utc),
+            bucket_seconds=bucket_seconds,
+            total_votes=len(timestamps),
+            turnout=turnout.tolist(),
+            cumulative_turnout=np.cumsum(turnout).tolist(),
+            candidates=[
+                schemas.TimelineSeries(candidate_id=candidate.id, name=candidate.name, votes=per_candidate[i].tolist(), cumulative=cumulative[i].tolist())
+                for i, candidate in enumerate(candidates)
+            ],
+        )
+        return timeline
+
+    def _columns(self, election):
+        """
+        (timestamps, candidate ids) of the election's ballots. A completed
+        election cannot change any more, so its columns are cached and any
+        bucket size is answered from memory; the key includes the window and
+        override, so editing them is never answered from a stale entry.
+        """
+        journal = vote_journal()
+        cacheable = election.status == COMPLETED and not (journal and journal.pending_counts(election.id))
+        key = (election.id, election.start_time, election.end_time, election.status_override)
+        if cacheable:
+            columns = timeline_cache().get(key)
+            if columns is not None:
+                return columns
+        if journal is None:
+            rows = self.vote_repo.get_vote_timeline(election.id)
+        else:
+            # Ballots still in the journal are added, as for the results, so the counts agree.
+            with journal.consistent_read():
+                rows = self.vote_repo.get_vote_timeline(election.id) + journal.pending_ballots(election.id)
+        # fromiter over the flattened rows; np.array would inspect every row object as a sequence.
+        data = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=2 * len(rows)).reshape(-1, 2)
+        columns = (data[:, 0].copy(), data[:, 1].astype(np.int64))
+        if cacheable:
+            timeline_cache().set(key, columns)
+        return columns
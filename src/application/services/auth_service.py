@@ -3,9 +3,11 @@ from src.domain.interfaces import IUserRepository
 from src.infrastructure.security.utils import verify_password, get_password_hash, create_access_token
 from src.infrastructure.database.models import User
 from src.application import schemas
-from src.core.config import settings
+from src.core.config import get_settings
 from datetime import timedelta
+from src.core.tracing import traced_class
 
+@traced_class
 class AuthService:
     def __init__(self, user_repo: IUserRepository):
         self.user_repo = user_repo
@@ -35,7 +37,7 @@ class AuthService:
         return user
 
     def create_user_token(self, user: User):
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        access_token_expires = timedelta(minutes=get_settings().ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
             data={"sub": user.username}, expires_delta=access_token_expires
         )
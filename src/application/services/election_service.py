@@ -1,11 +1,13 @@
 from typing import List, Dict, Any, Optional
-import hashlib
-import datetime
-import secrets
+from src.domain import eligibility
 from src.domain.interfaces import IElectionRepository, ICandidateRepository, IVotingTokenRepository, IUserRepository
-from src.infrastructure.database.models import Election, Candidate, VotingToken
+from src.infrastructure.database.models import Election, Candidate
 from src.application import schemas
+from src.core.tracing import traced_class
+from src.core.voted_bitmap import voted_bitmaps
+from src.infrastructure.vote_journal import vote_journal
 
+@traced_class
 class ElectionService:
     def __init__(self, election_repo: IElectionRepository, candidate_repo: ICandidateRepository, token_repo: IVotingTokenRepository, user_repo: IUserRepository):
         self.election_repo = election_repo
@@ -14,12 +16,20 @@ class ElectionService:
         self.user_repo = user_repo
 
     def create_election(self, election_data: schemas.ElectionCreate, user_id: int):
+        """
+        Creates the election and its candidates. Voters are not enumerated:
+        the eligibility rule is stored on the election and each voter's
+        ballot-state row is created on their first token request or ballot,
+        so this costs the same whatever the number of users.
+        """
         # 1. Create Election
         new_election = Election(
             title=election_data.title,
             description=election_data.description,
             start_time=election_data.start_time,
             end_time=election_data.end_time,
+            eligibility=election_data.eligibility,
+            eligible_role=election_data.eligible_role,
             created_by=user_id
         )
         created_election = self.election_repo.create(new_election)
@@ -32,24 +42,21 @@ class ElectionService:
                 election_id=created_election.id
             )
             self.candidate_repo.create(new_candidate)
-        
-        # 3. Generate Tokens for ALL users
-        users = self.user_repo.get_all()
-        for user in users:
-            raw_token = secrets.token_urlsafe(16)
-            hashed_token = hashlib.sha256(raw_token.encode()).hexdigest()
-            # Requirement: Tokens expire when election ends or in 24h
-            expires = election_data.end_time if election_data.end_time else datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=24)
-            
-            self.token_repo.create_token(
-                token_hash=hashed_token,
-                user_id=user.id,
-                election_id=created_election.id,
-                expires_at=expires
-            )
-        
+
+        # 3. Roster elections list their voters explicitly
+        if election_data.eligibility == eligibility.ROSTER and election_data.roster:
+            self.election_repo.add_to_roster(created_election.id, election_data.roster)
+
         return created_election
 
+    def add_to_roster(self, election_id: int, user_ids: List[int]):
+        election = self.election_repo.get_by_id(election_id)
+        if not election:
+            raise ValueError("Election not found.")
+        if election.eligibility != eligibility.ROSTER:
+            raise ValueError("Election does not use a roster.")
+        self.election_repo.add_to_roster(election_id, user_ids)
+
     def get_elections(self, skip: int = 0, limit: int = 100):
         return self.election_repo.get_all(skip, limit)
 
@@ -61,6 +68,15 @@ class ElectionService:
     
     def end_election(self, election_id: int):
         return self.election_repo.end_election(election_id)
+
+    def set_status_override(self, election_id: int, status: Optional[str]):
+        # None clears the override and lets start_time/end_time decide again.
+        return self.election_repo.update(election_id, {"status": status})
     
     def delete_election(self, election_id: int):
-        return self.election_repo.delete(election_id)
+        self.election_repo.delete(election_id)
+        # The id can be reused by a later election, which must not inherit these voters.
+        voted_bitmaps().drop(election_id)
+        journal = vote_journal()
+        if journal is not None:
+            journal.forget(election_id)
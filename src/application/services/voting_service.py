@@ -1,11 +1,37 @@
-from typing import Optional
+from typing import Dict, List, Optional, Union
 import hashlib
 import datetime
 import secrets
 from src.domain.interfaces import IVoteRepository, IVotingTokenRepository, IElectionRepository
+from src.domain.vote_chain import GENESIS_HASH, compute_vote_hash
 from src.infrastructure.database.models import Vote, VotingToken
 from src.application import schemas
+from src.core.cache import TTLCache
+from src.core.config import get_settings
+from src.core.tracing import traced_class
+from src.core.voted_bitmap import voted_bitmaps
+from src.infrastructure.security.voting_tokens import derive_voting_token, verify_voting_token
+from src.infrastructure.vote_journal import VoteJournal, vote_journal
 
+_receipt_cache: Optional[TTLCache] = None
+
+def receipt_cache() -> TTLCache:
+    """Per-process cache of idempotency key hash -> VoteReceipt, in front of the idempotency_keys table."""
+    global _receipt_cache
+    if _receipt_cache is None:
+        settings = get_settings()
+        _receipt_cache = TTLCache(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+    return _receipt_cache
+
+def hash_token(raw_token: str) -> str:
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+def idempotency_key_hash(vote_req: schemas.VoteCastRequest, key: str) -> bytes:
+    # Scoped to the voter (or their token) and election, so one client's key can never return another voter's receipt.
+    voter = vote_req.user_id if vote_req.user_id is not None else hash_token(vote_req.voting_token)
+    return hashlib.sha256(f"{vote_req.election_id}:{voter}:{key}".encode()).digest()[:16]
+
+@traced_class
 class VotingService:
     def __init__(self, vote_repo: IVoteRepository, token_repo: IVotingTokenRepository, election_repo: IElectionRepository):
         self.vote_repo = vote_repo
@@ -13,13 +39,21 @@ class VotingService:
         self.election_repo = election_repo
 
     def generate_token(self, user_id: int, election_id: int):
+        if get_settings().VOTING_TOKEN_MODE == "derived":
+            # Nothing is stored: the token is recomputed and compared when the ballot is cast.
+            self._check_eligible(user_id, election_id)
+            return derive_voting_token(user_id, election_id)
+
         existing_token = self.token_repo.get_token(user_id, election_id)
         if existing_token:
             return None
-        
+
+        # First contact with this election: check the eligibility rule before creating the voter's row.
+        self._check_eligible(user_id, election_id)
+
         raw_token = secrets.token_urlsafe(16)
-        hashed_token = hashlib.sha256(raw_token.encode()).hexdigest()
-        
+        hashed_token = hash_token(raw_token)
+
         self.token_repo.create_token(
             token_hash=hashed_token,
             user_id=user_id,
@@ -28,38 +62,89 @@ class VotingService:
         )
         return raw_token
 
-    def cast_vote(self, vote_req: schemas.VoteCastRequest):
+    def cast_vote(self, vote_req: schemas.VoteCastRequest, idempotency_key: Optional[str] = None) -> Union[Vote, schemas.VoteReceipt]:
+        """
+        Casts a ballot and returns the stored Vote. With an idempotency key, a
+        retry of a ballot that already went through returns the original
+        VoteReceipt instead, from the cache or one indexed lookup, without
+        touching tokens or the chain.
+        """
+        key_hash = None
+        if idempotency_key:
+            key_hash = idempotency_key_hash(vote_req, idempotency_key)
+            receipt = self._find_receipt(key_hash)
+            if receipt:
+                return receipt
+
         # 0. Validate Election Status
-        election = self.election_repo.get_by_id(vote_req.election_id)
-        if not election:
-            raise ValueError("Election not found.")
-        if election.status != "active":
-            raise ValueError(f"Election is not active. Current status: {election.status}")
+        election = self._active_election(vote_req.election_id)
+
+        journal = vote_journal()
+        if journal is not None:
+            return self._cast_journaled(journal, vote_req, election, key_hash)
 
         # 1. Validate Token
-        db_token = self.token_repo.get_token(vote_req.user_id, vote_req.election_id)
-        if not db_token:
-            raise ValueError("Voting token not found for this user and election.")
-        if db_token.is_used:
-            raise ValueError("Double Vote: This token has already been used.")
-        
-        # Check expiry (naive vs aware handling required if not standardized)
-        # Using database.models.AwareDateTime, db_token.expires_at should be aware.
-        if db_token.expires_at < datetime.datetime.now(datetime.timezone.utc):
-             raise ValueError("Token has expired.")
+        user_id = vote_req.user_id
+        derived = vote_req.voting_token is not None and get_settings().VOTING_TOKEN_MODE == "derived"
+        if derived:
+            user_id = self._verify_derived_token(vote_req)
+        # A repeat ballot is answered from the voted bitmap without touching the token table
+        # (a stored token is burned in one statement anyway, and it identifies the voter).
+        voted = voted_bitmaps().get(vote_req.election_id)
+        stored_token = vote_req.voting_token is not None and not derived
+        if not stored_token and user_id in voted:
+            return self._double_vote(key_hash)
+        if derived:
+            # Derived token, checked in memory: the burn is the only token-table access.
+            if not self.token_repo.claim_ballots(vote_req.election_id, [user_id], self._ballot_expiry(election)):
+                voted.add(user_id)
+                return self._double_vote(key_hash)
+        elif stored_token:
+            # Presented token: one probe of the unique token_hash index that also burns it.
+            token_hash = hash_token(vote_req.voting_token)
+            burned_by = self.token_repo.burn_token_by_hash(
+                token_hash, vote_req.election_id, user_id, datetime.datetime.now(datetime.timezone.utc)
+            )
+            if burned_by is None:
+                # Only a rejected ballot pays for a second read, to say why.
+                db_token = self.token_repo.get_token_by_hash(token_hash)
+                if not db_token or db_token.election_id != vote_req.election_id or user_id not in (None, db_token.user_id):
+                    raise ValueError("Invalid voting token.")
+                if db_token.is_used:
+                    voted.add(db_token.user_id)
+                    return self._double_vote(key_hash)
+                raise ValueError("Token has expired.")
+            user_id = burned_by
+        else:
+            db_token = self.token_repo.get_token(user_id, vote_req.election_id)
+            if not db_token:
+                # No ballot state yet: an eligible voter gets a used row, committed with the vote.
+                if user_id not in self.election_repo.filter_eligible(election, [user_id]):
+                    raise ValueError("You are not eligible to vote in this election.")
+                if not self.token_repo.claim_ballots(vote_req.election_id, [user_id], self._ballot_expiry(election)):
+                    voted.add(user_id)
+                    return self._double_vote(key_hash)
+            else:
+                if db_token.is_used:
+                    voted.add(user_id)
+                    return self._double_vote(key_hash)
 
-        # 2. Mark Token Used
-        # Note: Ideally this should be atomic with vote creation.
-        # Here we rely on the repository implementation.
-        self.token_repo.mark_as_used(db_token)
+                # Check expiry (naive vs aware handling required if not standardized)
+                # Using database.models.AwareDateTime, db_token.expires_at should be aware.
+                if db_token.expires_at < datetime.datetime.now(datetime.timezone.utc):
+                     raise ValueError("Token has expired.")
+
+                # 2. Mark Token Used
+                # Note: Ideally this should be atomic with vote creation.
+                # Here we rely on the repository implementation.
+                self.token_repo.mark_as_used(db_token)
 
         # 3. Blockchain Logic
         last_vote = self.vote_repo.get_last_vote(vote_req.election_id)
-        prev_hash = last_vote.vote_hash if last_vote else "GENESIS"
+        prev_hash = last_vote.vote_hash if last_vote else GENESIS_HASH
         
         timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        data_to_hash = f"{prev_hash}{vote_req.user_id}{vote_req.candidate_id}{timestamp}"
-        vote_hash = hashlib.sha256(data_to_hash.encode()).hexdigest()
+        vote_hash = compute_vote_hash(prev_hash, user_id, vote_req.candidate_id, timestamp)
 
         new_vote = Vote(
             vote_hash=vote_hash,
@@ -69,7 +154,290 @@ class VotingService:
             created_at=datetime.datetime.now(datetime.timezone.utc)
         )
         
-        return self.vote_repo.create(new_vote)
+        if key_hash is None:
+            vote = self.vote_repo.create(new_vote)
+        else:
+            ttl = get_settings().IDEMPOTENCY_KEY_TTL_SECONDS
+            vote = self.vote_repo.create(new_vote, key_hash, new_vote.created_at + datetime.timedelta(seconds=ttl))
+            receipt_cache().set(key_hash, schemas.VoteReceipt(vote_hash=vote.vote_hash, timestamp=vote.created_at))
+        voted.add(user_id)
+        return vote
+
+    def _active_election(self, election_id: int):
+        election = self.election_repo.get_by_id(election_id)
+        if not election:
+            raise ValueError("Election not found.")
+        # Status is derived from the election window on read, so no scheduler run is needed here.
+        status = election.status
+        if status != "active":
+            raise ValueError(f"Election is not active. Current status: {status}")
+        return election
+
+    def _cast_journaled(self, journal: VoteJournal, vote_req: schemas.VoteCastRequest, election, key_hash: Optional[bytes], durable: bool = True) -> Vote:
+        """
+        Journal intake: the ballot is validated with reads only, appended to the
+        vote journal and acknowledged once it is on disk. The returned Vote is
+        not stored yet; the journal's applier inserts it and burns the token.
+        """
+        if vote_req.candidate_id not in {candidate.id for candidate in election.candidates}:
+            raise ValueError("Candidate does not belong to this election.")
+        user_id, has_voted = self._journal_voter(vote_req, election)
+        voted = voted_bitmaps().get(election.id)
+        if has_voted or user_id in voted:
+            return self._double_vote(key_hash)
+        try:
+            record = journal.submit(
+                election.id, user_id, vote_req.candidate_id,
+                load_head=lambda: getattr(self.vote_repo.get_last_vote(election.id), "vote_hash", None),
+                key_hash=key_hash, key_ttl=get_settings().IDEMPOTENCY_KEY_TTL_SECONDS, durable=durable,
+                # Read again under the journal lock: a ballot it accepts must never be refused when applied.
+                has_voted=lambda: self.token_repo.has_voted(user_id, election.id),
+            )
+        except ValueError:
+            # The voter already has a ballot in the journal, or the database records their vote.
+            return self._double_vote(key_hash)
+        vote = Vote(
+            vote_hash=record["vote_hash"],
+            prev_vote_hash=record["prev_vote_hash"],
+            election_id=election.id,
+            candidate_id=vote_req.candidate_id,
+            created_at=datetime.datetime.fromisoformat(record["created_at"]),
+        )
+        if durable:
+            if key_hash is not None:
+                receipt_cache().set(key_hash, schemas.VoteReceipt(vote_hash=vote.vote_hash, timestamp=vote.created_at))
+            voted.add(user_id)
+        return vote
+
+    def _journal_voter(self, vote_req: schemas.VoteCastRequest, election):
+        """The ballot's voter and whether the database already records their vote; reads only."""
+        if vote_req.voting_token is not None and get_settings().VOTING_TOKEN_MODE == "derived":
+            user_id = self._verify_derived_token(vote_req)
+            db_token = self.token_repo.get_token(user_id, election.id)
+        elif vote_req.voting_token is not None:
+            db_token = self.token_repo.get_token_by_hash(hash_token(vote_req.voting_token))
+            if not db_token or db_token.election_id != election.id or vote_req.user_id not in (None, db_token.user_id):
+                raise ValueError("Invalid voting token.")
+            user_id = db_token.user_id
+        else:
+            user_id = vote_req.user_id
+            db_token = self.token_repo.get_token(user_id, election.id)
+            if not db_token and user_id not in self.election_repo.filter_eligible(election, [user_id]):
+                raise ValueError("You are not eligible to vote in this election.")
+        if db_token is None:
+            return user_id, False
+        if not db_token.is_used and db_token.expires_at < datetime.datetime.now(datetime.timezone.utc):
+            raise ValueError("Token has expired.")
+        return user_id, db_token.is_used
+
+    def _check_eligible(self, user_id: int, election_id: int) -> None:
+        election = self.election_repo.get_by_id(election_id)
+        if not election:
+            raise ValueError("Election not found.")
+        if user_id not in self.election_repo.filter_eligible(election, [user_id]):
+            raise ValueError("You are not eligible to vote in this election.")
+
+    @staticmethod
+    def _verify_derived_token(vote_req: schemas.VoteCastRequest) -> int:
+        # Derived token: an in-memory HMAC check that also proves eligibility; returns the voter.
+        user_id = verify_voting_token(vote_req.voting_token, vote_req.election_id)
+        if user_id is None or vote_req.user_id not in (None, user_id):
+            raise ValueError("Invalid voting token.")
+        return user_id
+
+    def _double_vote(self, key_hash: Optional[bytes]) -> schemas.VoteReceipt:
+        # A concurrent attempt with the same key may have committed since the first lookup.
+        receipt = self._find_receipt(key_hash) if key_hash else None
+        if receipt:
+            return receipt
+        raise ValueError("Double Vote: This token has already been used.")
+
+    @staticmethod
+    def _ballot_expiry(election) -> datetime.datetime:
+        # Same lifetime as a requested token: the end of the election, or 24h for open-ended ones.
+        return election.end_time or datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=24)
+
+    def _find_receipt(self, key_hash: bytes) -> Optional[schemas.VoteReceipt]:
+        cache = receipt_cache()
+        receipt = cache.get(key_hash)
+        journal = vote_journal()
+        if receipt is None and journal is not None:
+            # Accepted but not applied yet: its key is not in the database.
+            pending = journal.pending_receipt(key_hash)
+            if pending is not None:
+                receipt = schemas.VoteReceipt(vote_hash=pending[0], timestamp=pending[1])
+        if receipt is None:
+            row = self.vote_repo.get_receipt_by_idempotency_key(key_hash, datetime.datetime.now(datetime.timezone.utc))
+            if row is None:
+                return None
+            receipt = schemas.VoteReceipt(vote_hash=row.vote_hash, timestamp=row.created_at)
+            cache.set(key_hash, receipt)
+        return receipt
+
+    def cast_votes(self, ballots: List[schemas.VoteCastRequest]) -> List[schemas.BallotResult]:
+        """
+        Batch version of cast_vote for kiosks replaying buffered ballots.
+        Ballots are grouped by election and each election costs a fixed
+        handful of queries (election + candidates, tokens, eligibility, token
+        burn / ballot-state insert, chain head, vote insert) in its own transaction, whatever the batch size.
+        Accepted ballots are chained in the order they were submitted.
+        """
+        journal = vote_journal()
+        if journal is not None:
+            return self._cast_journaled_batch(journal, ballots)
+        results: List[Optional[schemas.BallotResult]] = [None] * len(ballots)
+        by_election: Dict[int, List[int]] = {}
+        for index, ballot in enumerate(ballots):
+            by_election.setdefault(ballot.election_id, []).append(index)
+        for election_id, indexes in by_election.items():
+            self._cast_election_batch(election_id, indexes, ballots, results)
+        return results
+
+    def _cast_journaled_batch(self, journal: VoteJournal, ballots: List[schemas.VoteCastRequest]) -> List[schemas.BallotResult]:
+        # Every accepted ballot of the batch shares one fsync. Their voters are not added to the
+        # voted bitmap here: the journal rejects a second ballot while they are pending, and the
+        # applier marks them when it applies them.
+        results: List[schemas.BallotResult] = []
+        elections: Dict[int, object] = {}
+        for index, ballot in enumerate(ballots):
+            try:
+                if ballot.election_id not in elections:
+                    try:
+                        elections[ballot.election_id] = self._active_election(ballot.election_id)
+                    except ValueError as e:
+                        elections[ballot.election_id] = e
+                election = elections[ballot.election_id]
+                if isinstance(election, ValueError):
+                    raise election
+                vote = self._cast_journaled(journal, ballot, election, None, durable=False)
+            except ValueError as e:
+                results.append(schemas.BallotResult(index=index, success=False, error=str(e)))
+                continue
+            results.append(schemas.BallotResult(index=index, success=True, vote_hash=vote.vote_hash, timestamp=vote.created_at))
+        journal.sync()
+        return results
+
+    def _resolve_voters(self, election_id: int, indexes: List[int], ballots: List[schemas.VoteCastRequest], reject) -> Dict[int, int]:
+        """Voter of each ballot: its user_id, or the owner of its voting token (one query for all stored tokens)."""
+        derived = get_settings().VOTING_TOKEN_MODE == "derived"
+        hashes = {index: hash_token(ballots[index].voting_token) for index in indexes if ballots[index].voting_token is not None and not derived}
+        owners = {}
+        if hashes:
+            owners = {token.token_hash: token.user_id for token in self.token_repo.get_tokens_by_hashes(election_id, list(set(hashes.values())))}
+        voters = {}
+        for index in indexes:
+            ballot = ballots[index]
+            if ballot.voting_token is None:
+                voters[index] = ballot.user_id
+            elif derived:
+                try:
+                    voters[index] = self._verify_derived_token(ballot)
+                except ValueError as e:
+                    reject(index, str(e))
+            elif owners.get(hashes[index]) is None or ballot.user_id not in (None, owners[hashes[index]]):
+                reject(index, "Invalid voting token.")
+            else:
+                voters[index] = owners[hashes[index]]
+        return voters
+
+    def _cast_election_batch(self, election_id: int, indexes: List[int], ballots: List[schemas.VoteCastRequest], results: list):
+        def reject(index: int, error: str):
+            results[index] = schemas.BallotResult(index=index, success=False, error=error)
+
+        election = self.election_repo.get_by_id(election_id)
+        if not election:
+            for index in indexes:
+                reject(index, "Election not found.")
+            return
+        status = election.status
+        if status != "active":
+            for index in indexes:
+                reject(index, f"Election is not active. Current status: {status}")
+            return
+
+        # 1. Validate all tokens with one query; voters without a row are checked against the eligibility rule
+        voters = self._resolve_voters(election_id, indexes, ballots, reject)
+        candidate_ids = {candidate.id for candidate in election.candidates}
+        user_ids = list(set(voters.values()))
+        tokens = {token.user_id: token for token in self.token_repo.get_tokens_for_users(election_id, user_ids)} if user_ids else {}
+        unseen = [user_id for user_id in user_ids if user_id not in tokens]
+        eligible = self.election_repo.filter_eligible(election, unseen) if unseen else set()
+        voted = voted_bitmaps().get(election_id)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        accepted = []  # (ballot index, token id, or None for a voter without a row)
+        claimed, claimed_users = set(), set()
+        for index in indexes:
+            if index not in voters:
+                continue
+            ballot, user_id = ballots[index], voters[index]
+            token = tokens.get(user_id)
+            if ballot.candidate_id not in candidate_ids:
+                reject(index, "Candidate does not belong to this election.")
+            elif user_id in voted:
+                reject(index, "Double Vote: This token has already been used.")
+            elif not token:
+                if user_id not in eligible:
+                    reject(index, "You are not eligible to vote in this election.")
+                elif user_id in claimed_users:
+                    reject(index, "Double Vote: This token has already been used.")
+                else:
+                    claimed_users.add(user_id)
+                    accepted.append((index, None))
+            elif token.is_used or token.id in claimed:
+                if token.is_used:
+                    voted.add(user_id)
+                reject(index, "Double Vote: This token has already been used.")
+            elif token.expires_at < now:
+                reject(index, "Token has expired.")
+            else:
+                claimed.add(token.id)
+                accepted.append((index, token.id))
+        if not accepted:
+            return
+
+        # 2. Burn existing tokens and create rows for first-time voters, one statement each; a
+        # ballot whose token was consumed (or row created) concurrently since step 1 is rejected.
+        # This also takes the write lock before the chain head is read.
+        token_ids = [token_id for _, token_id in accepted if token_id is not None]
+        new_voters = [voters[index] for index, token_id in accepted if token_id is None]
+        burned = set(self.token_repo.burn_tokens(token_ids))
+        created = set(self.token_repo.claim_ballots(election_id, new_voters, self._ballot_expiry(election)))
+
+        # 3. Blockchain Logic, then one INSERT for the whole chain segment
+        last_vote = self.vote_repo.get_last_vote(election_id)
+        prev_hash = last_vote.vote_hash if last_vote else GENESIS_HASH
+        rows = []
+        for index, token_id in accepted:
+            user_id = voters[index]
+            stored = token_id in burned if token_id is not None else user_id in created
+            if not stored:
+                reject(index, "Double Vote: This token has already been used.")
+                continue
+            ballot = ballots[index]
+            cast_at = datetime.datetime.now(datetime.timezone.utc)
+            vote_hash = compute_vote_hash(prev_hash, user_id, ballot.candidate_id, cast_at.isoformat())
+            rows.append({
+                "vote_hash": vote_hash,
+                "prev_vote_hash": prev_hash,
+                "election_id": election_id,
+                "candidate_id": ballot.candidate_id,
+                "created_at": cast_at,
+            })
+            results[index] = schemas.BallotResult(index=index, success=True, vote_hash=vote_hash, timestamp=cast_at)
+            prev_hash = vote_hash
+        self.vote_repo.create_many(rows)
+        for index, _ in accepted:
+            if results[index].success:
+                voted.add(voters[index])
 
     def get_results(self, election_id: int):
-        return self.vote_repo.get_results(election_id)
+        journal = vote_journal()
+        if journal is None:
+            return self.vote_repo.get_results(election_id)
+        # Ballots still in the journal are counted on top of the stored ones, so the tally stays exact.
+        with journal.consistent_read():
+            results = self.vote_repo.get_results(election_id)
+            pending = journal.pending_counts(election_id)
+        for row in results:
+            row["vote_count"] += pending.get(row["id"], 0)
+        return sorted(results, key=lambda row: row["vote_count"], reverse=True)
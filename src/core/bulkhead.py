@@ -0,0 +1,78 @@
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, TypeVar
+import anyio
+from anyio import to_thread
+from src.core import metrics
+
+T = TypeVar("T")
+
+DEFAULT_GROUP = "default"
+
+# Route group of the request being handled. Set by BulkheadMiddleware; the
+# thread that runs a sync endpoint inherits it, so the DB session picks the
+# group's connection pool (see session.new_session).
+current_group: ContextVar[str] = ContextVar("current_group", default=DEFAULT_GROUP)
+
+
+class BulkheadFull(Exception):
+    pass
+
+
+class Bulkhead:
+    """
+    At most `limit` requests of one route group run at once; the others wait
+    up to `queue_timeout` seconds for a slot and are then turned away, so a
+    flood in one group queues against itself instead of the whole server.
+    """
+
+    def __init__(self, name: str, limit: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = anyio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        started = time.perf_counter()
+        try:
+            with anyio.fail_after(self.queue_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            metrics.bulkhead_rejected_total.inc(self.name)
+            raise BulkheadFull(self.name) from None
+        metrics.bulkhead_queue_wait_seconds.observe(time.perf_counter() - started, self.name)
+        metrics.bulkhead_in_flight.inc(self.name)
+        token = current_group.set(self.name)
+        try:
+            yield
+        finally:
+            current_group.reset(token)
+            metrics.bulkhead_in_flight.dec(self.name)
+            self._semaphore.release()
+
+
+def parse_groups(spec: str, cast: Callable[[str], T]) -> Dict[str, T]:
+    """"voting=32,reads=16" -> {"voting": 32, "reads": 16}."""
+    groups = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        groups[name.strip()] = cast(value)
+    return groups
+
+
+def bulkheads_from_settings(settings) -> Dict[str, Bulkhead]:
+    limits = parse_groups(settings.BULKHEAD_LIMITS, int)
+    timeouts = parse_groups(settings.BULKHEAD_QUEUE_TIMEOUTS, float)
+    return {name: Bulkhead(name, limit, timeouts.get(name, 5.0)) for name, limit in limits.items()}
+
+
+def reserve_threads(bulkheads: Dict[str, Bulkhead], headroom: int = 8) -> None:
+    """
+    Sizes the worker-thread limiter that runs sync endpoints (40 by default)
+    to fit every group's limit at once, so each group effectively owns its
+    share of threads. Must run inside the event loop (e.g. in the lifespan).
+    """
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, sum(b.limit for b in bulkheads.values()) + headroom)
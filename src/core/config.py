@@ -1,6 +1,8 @@
 # Loads configuration settings from a .env file for the application.
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Optional
+import tempfile
 
 # Defines the application's configuration variables.
 class Settings(BaseSettings):
@@ -9,7 +11,107 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Populate an empty database with demo users and elections on startup.
+    SEED_DATABASE: bool = True
+    # Snapshot (see src/infrastructure/database/snapshot.py) restored at startup when the database is empty.
+    DB_SNAPSHOT_PATH: Optional[str] = None
+
+    # Only the worker holding this lock runs the lifecycle engine.
+    SCHEDULER_LOCK_FILE: str = str(Path(tempfile.gettempdir()) / "evoting-scheduler.lock")
+    # How often the leader reloads upcoming transitions created by other workers.
+    SCHEDULER_RESYNC_SECONDS: int = 60
+
+    # Prometheus-format /metrics endpoint and request/DB instrumentation.
+    METRICS_ENABLED: bool = True
+    # Debug mode adds X-DB-Query-Count / X-DB-Time-Ms headers to every response.
+    DEBUG: bool = False
+    # Executions of one statement within a request that get logged as a suspected N+1.
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Token-bucket admission control in front of the login and voting routes, as
+    # "<requests>/<seconds>". Auth routes are limited per IP, voting routes per
+    # user with a bearer token; GLOBAL caps all of them together.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_AUTH: str = "10/60"
+    RATE_LIMIT_VOTE: str = "30/60"
+    # Ballots name their voter in the body, not with a bearer token, so most are limited per
+    # IP. This bucket is shared by every voter behind one address (a polling station or campus NAT).
+    RATE_LIMIT_VOTE_ANONYMOUS: str = "600/60"
+    RATE_LIMIT_GLOBAL: str = "1000/1"
+    # SQLite file that shares the buckets between the workers of one host; unset keeps them per worker.
+    RATE_LIMIT_STORE: Optional[str] = None
+
+    # Bulkheads: concurrent requests per route group (voting, reads, admin, default)
+    # and how long a request may queue for a slot before a 503.
+    BULKHEADS_ENABLED: bool = True
+    BULKHEAD_LIMITS: str = "voting=32,reads=16,admin=4,default=16"
+    BULKHEAD_QUEUE_TIMEOUTS: str = "voting=2,reads=5,admin=10,default=5"
+    # Groups that get their own connection pool (pool size), so one group cannot
+    # hold every connection. Unlisted groups share the main engine. A pool is
+    # never smaller than its group's bulkhead limit.
+    DB_GROUP_POOLS: str = "voting=32,reads=16,admin=4"
+
+    # Background removal of voting tokens that belong to completed elections.
+    TOKEN_SWEEP_INTERVAL_SECONDS: int = 3600
+    TOKEN_SWEEP_BATCH_SIZE: int = 1000
+    # Run VACUUM after a sweep that reclaimed rows (locks the database while it runs).
+    TOKEN_SWEEP_COMPACT: bool = False
+
+    # "random": voting tokens are random and stored hashed in voting_tokens.
+    # "derived": tokens are an HMAC of user and election, issued without writes and checked in memory.
+    VOTING_TOKEN_MODE: str = "random"
+    # Secret for derived tokens; falls back to SECRET_KEY. Changing it invalidates every issued token.
+    VOTING_TOKEN_SECRET: Optional[str] = None
+
+    # Directory for the per-election "who has voted" bitmaps (memory-mapped, shared by the
+    # workers on one host). Unset keeps them in each worker's memory.
+    VOTED_BITMAP_DIR: Optional[str] = None
+
+    # How long a vote's Idempotency-Key keeps returning the original receipt.
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    # Receipts kept in each worker's in-process cache (the database is the fallback).
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+
+    # Ballot columns of completed elections kept in each worker's cache for the timeline
+    # endpoint (they no longer change); about 16 MB per million votes.
+    ANALYTICS_CACHE_SIZE: int = 8
+    ANALYTICS_CACHE_TTL_SECONDS: int = 3600
+
+    # Journal intake: ballots are acknowledged once appended (and fsynced) to this local
+    # file and applied to the database in batches by a background thread. Needs a single
+    # worker; unset casts straight into the database.
+    VOTE_JOURNAL_PATH: Optional[str] = None
+    VOTE_JOURNAL_APPLY_INTERVAL_SECONDS: float = 0.2
+    VOTE_JOURNAL_APPLY_BATCH_SIZE: int = 5000
+
+    # Request tracing (router -> service -> repository -> SQL spans).
+    TRACING_ENABLED: bool = False
+    # Share of new traces that are recorded; an incoming sampled traceparent is always honoured.
+    TRACING_SAMPLE_RATIO: float = 0.05
+    # "file" appends JSON lines to TRACING_FILE, "otlp" posts OTLP/JSON to TRACING_OTLP_ENDPOINT.
+    TRACING_EXPORTER: str = "file"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+
     # Look for the .env file in the Backend root directory (3 levels up from src/core/config.py)
     model_config = SettingsConfigDict(env_file=str(Path(__file__).parent.parent.parent / '.env'), extra='ignore')
 
-settings = Settings()
+_settings: Optional[Settings] = None
+
+def get_settings() -> Settings:
+    """Settings are read from the environment / .env on first use, not at import."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+def configure(new_settings: Settings) -> None:
+    """Installs explicit settings (see main.create_app); later get_settings() calls return them."""
+    global _settings
+    _settings = new_settings
+
+# Back-compat for `from src.core.config import settings`.
+def __getattr__(name):
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
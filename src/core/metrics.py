@@ -0,0 +1,227 @@
+import bisect
+import threading
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, tuned for API calls (1ms .. 10s).
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    """
+    Base class for the in-process metrics.
+
+    Every thread writes into its own shard (a plain dict reached through a
+    thread-local), so recording a sample takes no lock and never contends with
+    other request threads. The shards are only merged when /metrics is scraped.
+    When a thread exits (anyio retires idle workers), its shard is folded into
+    a base shard, so the number of shards tracks the live threads.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, List[float]]] = []
+        self._retired: Dict[LabelValues, List[float]] = {}  # folded shards of threads that exited
+        self._shards_lock = threading.Lock()
+        # Exported on /metrics unless another registry is given (e.g. by tests).
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _cell(self, labels: LabelValues) -> List[float]:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # The thread-local's values are released when the thread exits; the holder's
+            # finalizer then folds the shard (which it does not own) into the base.
+            self._local.holder = _ShardHolder()
+            weakref.finalize(self._local.holder, self._retire, shard).atexit = False
+            with self._shards_lock:
+                self._shards.append(shard)
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = self._new_cell()
+        return cell
+
+    def _new_cell(self) -> List[float]:
+        return [0.0]
+
+    def _retire(self, shard: Dict[LabelValues, List[float]]) -> None:
+        with self._shards_lock:
+            self._shards = [s for s in self._shards if s is not shard]
+            _add_cells(self._retired, shard)
+
+    def _merged(self) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        # Under the lock, so a shard being retired is counted either live or in the base, never twice.
+        with self._shards_lock:
+            _add_cells(merged, self._retired)
+            for shard in self._shards:
+                # dict.copy() is atomic under the GIL, so the owner thread may keep writing.
+                _add_cells(merged, shard.copy())
+        return merged
+
+    def _format_labels(self, labels: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def samples(self) -> Iterable[str]:
+        for labels, cell in sorted(self._merged().items()):
+            yield f"{self.name}{self._format_labels(labels)} {_number(cell[0])}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _ShardHolder:
+    """Lives in a thread's thread-local next to its shard; finalized when the thread exits."""
+
+
+def _add_cells(total: Dict[LabelValues, List[float]], shard: Dict[LabelValues, List[float]]) -> None:
+    for labels, cell in shard.items():
+        into = total.get(labels)
+        if into is None:
+            total[labels] = list(cell)
+        else:
+            for i, value in enumerate(cell):
+                into[i] += value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._cell(labels)[0] += amount
+
+
+class Gauge(_Metric):
+    """Gauge that is either moved with inc/dec or computed by a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._cell(labels)[0] += amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._cell(labels)[0] -= amount
+
+    def set_function(self, fn: Callable[[], float], *labels: str) -> None:
+        self._functions[labels] = fn
+
+    def samples(self) -> Iterable[str]:
+        yield from super().samples()
+        for labels, fn in sorted(self._functions.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            yield f"{self.name}{self._format_labels(labels)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_cell(self) -> List[float]:
+        # One slot per bucket plus +Inf, then sum and count.
+        return [0.0] * (len(self.buckets) + 3)
+
+    def observe(self, value: float, *labels: str) -> None:
+        cell = self._cell(labels)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for labels, cell in sorted(self._merged().items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, cell):
+                cumulative += count
+                yield f"{self.name}_bucket{self._format_labels(labels, ('le', bound))} {_number(cumulative)}"
+            yield f"{self.name}_sum{self._format_labels(labels)} {_number(cell[-2])}"
+            yield f"{self.name}_count{self._format_labels(labels)} {_number(cell[-1])}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Exposition in the Prometheus text format (version 0.0.4)."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = Registry()
+
+# --- Application metrics ---
+
+http_requests_total = Counter("evoting_http_requests_total", "HTTP requests handled, by route template and status.", ("method", "route", "status"))
+http_request_duration_seconds = Histogram("evoting_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+http_requests_in_flight = Gauge("evoting_http_requests_in_flight", "HTTP requests currently being handled.", ("method",))
+votes_cast_total = Counter("evoting_votes_cast_total", "Ballots accepted, by election.", ("election_id",))
+rate_limited_requests_total = Counter("evoting_rate_limited_requests_total", "Requests shed with 429 by the rate limiter, by rule.", ("rule",))
+
+db_queries_per_request = Histogram(
+    "evoting_db_queries_per_request",
+    "SQL statements executed while handling one request.",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+db_time_per_request_seconds = Histogram("evoting_db_time_per_request_seconds", "Time spent in SQL statements per request.", ("method", "route"))
+db_repeated_statements_total = Counter("evoting_db_repeated_statements_total", "Requests that repeated one statement past the N+1 threshold.", ("route",))
+
+db_pool_checkouts_total = Counter("evoting_db_pool_checkouts_total", "Connections checked out of each engine pool.", ("pool",))
+db_pool_checkout_wait_seconds = Histogram("evoting_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",))
+db_pool_connections = Gauge("evoting_db_pool_connections", "Engine pool state at scrape time.", ("pool", "state"))
+
+bulkhead_in_flight = Gauge("evoting_bulkhead_in_flight", "Requests running in each route group.", ("group",))
+bulkhead_queue_wait_seconds = Histogram("evoting_bulkhead_queue_wait_seconds", "Time requests waited for a slot in their route group.", ("group",))
+bulkhead_rejected_total = Counter("evoting_bulkhead_rejected_total", "Requests turned away with 503 after the group's queue timeout.", ("group",))
+
+vote_journal_pending_ballots = Gauge("evoting_vote_journal_pending_ballots", "Ballots acknowledged from the vote journal but not applied to the database yet.")
+
+scheduler_lag_seconds = Histogram(
+    "evoting_scheduler_lag_seconds",
+    "Delay between a lifecycle entry's due time and when the engine ran it.",
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0, 300.0),
+)
+scheduler_pending_entries = Gauge("evoting_scheduler_pending_entries", "Entries waiting in the lifecycle heap.")
+
+token_sweep_rows_deleted_total = Counter("evoting_token_sweep_rows_deleted_total", "Voting tokens reclaimed by the sweeper.")
+token_sweep_duration_seconds = Gauge("evoting_token_sweep_duration_seconds", "Wall time of the most recent token sweep.")
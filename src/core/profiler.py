@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Leaf frames of threads that are parked waiting for work. Skipping them keeps
+# idle pool threads from drowning out the stacks that actually burn time.
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is still running."""
+
+
+class StackSampler:
+    """
+    Statistical profiler: every `interval` seconds it snapshots the stack of
+    every thread in the process (sys._current_frames) and counts identical
+    stacks. Nothing is installed in the profiled threads, so the cost is one
+    stack walk per thread per tick, paid by the sampling thread.
+
+    The result is in the "collapsed stacks" format (`thread;outer;...;leaf N`),
+    which flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def sample(self, skip_thread: Optional[int] = None) -> None:
+        names: Dict[int, str] = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> "StackSampler":
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        next_tick = time.monotonic()
+        while next_tick < deadline:
+            self.sample(skip_thread=me)
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (GIL contention); resume from now instead of bursting.
+                next_tick = time.monotonic()
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+_profile_lock = threading.Lock()
+
+
+def profile(seconds: float, interval: float = 0.005, include_idle: bool = False) -> StackSampler:
+    """Samples the whole process for `seconds`. Only one profile runs at a time."""
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        return StackSampler(interval, include_idle).run(seconds)
+    finally:
+        _profile_lock.release()
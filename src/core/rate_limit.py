@@ -0,0 +1,127 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+
+class Limit(NamedTuple):
+    """`requests` per `seconds`, as a token bucket: bursts up to `requests`, refilled evenly."""
+    requests: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.seconds
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        """"30/60" is 30 requests per 60 seconds."""
+        requests, _, seconds = spec.partition("/")
+        limit = cls(int(requests), float(seconds or 1))
+        if limit.requests < 1 or limit.seconds <= 0:
+            raise ValueError(f"Invalid rate limit: {spec}")
+        return limit
+
+
+def _refill(tokens: float, updated: float, now: float, limit: Limit) -> Tuple[float, float]:
+    """Takes one token if there is one. Returns (tokens left, seconds to wait; 0 when allowed)."""
+    tokens = min(float(limit.requests), tokens + max(now - updated, 0.0) * limit.rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / limit.rate
+
+
+class MemoryBucketStore:
+    """Buckets in this process. The least recently used ones beyond `max_keys` are forgotten (i.e. refilled)."""
+
+    # Cheap enough to call on the event loop.
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(limit.requests), now))
+            tokens, wait = _refill(tokens, updated, now, limit)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SqliteBucketStore:
+    """
+    Buckets in a local SQLite file, shared by every worker on the host. One
+    short write transaction per request; use a file on local disk (tmpfs is
+    best), never a network share. Each row records when its bucket is full
+    again; from then on it is the same as no row, so such rows are deleted
+    every `prune_interval` seconds.
+    """
+
+    # Waits on other workers' transactions: call it from a worker thread, not the event loop.
+    blocking = True
+
+    def __init__(self, path: str, prune_interval: float = 60.0):
+        self.prune_interval = prune_interval
+        self._conn = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(buckets)")}
+        if columns and "full_at" not in columns:
+            # A file from before expiry was added; bucket state is disposable.
+            self._conn.execute("DROP TABLE buckets")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_buckets_full_at ON buckets (full_at)")
+        self._lock = threading.Lock()
+        self._pruned = 0.0
+
+    def take(self, key: str, limit: Limit, now: float) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (float(limit.requests), now)
+                tokens, wait = _refill(tokens, updated, now, limit)
+                full_at = now + (limit.requests - tokens) / limit.rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)", (key, tokens, now, full_at)
+                )
+                if now - self._pruned >= self.prune_interval:
+                    self._conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+                    self._pruned = now
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return wait
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RateLimiter:
+    """Token buckets by key. `hit` returns 0 when the request may proceed, else the seconds to wait."""
+
+    def __init__(self, store=None, clock=time.time):
+        self.store = store or MemoryBucketStore()
+        self.clock = clock
+
+    def hit(self, key: str, limit: Limit) -> float:
+        return self.store.take(key, limit, self.clock())
+
+
+def retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+def limiter_from_settings(settings) -> RateLimiter:
+    path: Optional[str] = settings.RATE_LIMIT_STORE
+    return RateLimiter(SqliteBucketStore(path) if path else MemoryBucketStore())
@@ -1,5 +1,174 @@
-from apscheduler.schedulers.background import BackgroundScheduler
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from src.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# (run_at as epoch seconds, sequence, kind, payload)
+Entry = Tuple[float, int, str, Any]
+
+
+class LifecycleEngine:
+    """
+    Single background thread that drives election lifecycle work.
+
+    Upcoming transitions are kept in one time-ordered heap of small tuples
+    instead of one scheduler job object per election. The thread sleeps until
+    the earliest entry is due (or until an earlier one is pushed), so 100k
+    scheduled elections cost 200k tuples and zero wake-ups in between.
+    The heap is rebuilt from the database on every start via `loader`, which
+    is what makes scheduling survive restarts, and again every
+    `resync_interval` seconds so the leader also picks up elections created
+    by other worker processes.
+    """
+
+    def __init__(self):
+        self._heap: List[Entry] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._handlers: Dict[str, Callable[[List[Any]], None]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._loader: Optional[Callable[[], Iterable[Tuple[datetime, str, Any]]]] = None
+        self._resync_interval: Optional[float] = None
+        # kind -> (interval seconds, next run as epoch seconds)
+        self._periodic: Dict[str, List[float]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def register(self, kind: str, handler: Callable[[List[Any]], None]) -> None:
+        """Registers the callable that runs the due payloads of the given kind."""
+        self._handlers[kind] = handler
+
+    def add_periodic(self, kind: str, interval: float) -> None:
+        """
+        Runs the handler of `kind` every `interval` seconds (with an empty
+        payload list) for as long as the engine runs. Call before `start`.
+        """
+        self._periodic[kind] = [interval, time.time() + interval]
+
+    def schedule(self, run_at: datetime, kind: str, payload: Any = None) -> None:
+        """
+        Pushes a transition. Entries in the past run on the next wake-up.
+        No-op in processes that are not running the engine (non-leader
+        workers); the leader learns about the election on its next resync.
+        """
+        if not self.running:
+            return
+        entry = (run_at.timestamp(), next(self._seq), kind, payload)
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            # Only wake the thread if the new entry is now the earliest one.
+            if self._heap[0] is entry:
+                self._cond.notify()
+
+    def schedule_election(self, election_id: int, start_time: Optional[datetime], end_time: Optional[datetime]) -> None:
+        for run_at in (start_time, end_time):
+            if run_at is not None:
+                self.schedule(run_at, "transition", election_id)
+
+    def start(
+        self,
+        loader: Optional[Callable[[], Iterable[Tuple[datetime, str, Any]]]] = None,
+        resync_interval: Optional[float] = None,
+    ) -> None:
+        if self.running:
+            return
+        self._loader = loader
+        self._resync_interval = resync_interval
+        with self._cond:
+            self._stopping = False
+        self._reload()
+        self._thread = threading.Thread(target=self._run, name="lifecycle-engine", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if wait and self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _reload(self) -> None:
+        entries = []
+        if self._loader is not None:
+            entries = [(run_at.timestamp(), next(self._seq), kind, payload) for run_at, kind, payload in self._loader()]
+        if self._resync_interval:
+            entries.append((time.time() + self._resync_interval, next(self._seq), "resync", None))
+        # Periodic tasks keep their own next-run time so resyncs never postpone them.
+        for kind, (_, next_run) in self._periodic.items():
+            entries.append((next_run, next(self._seq), kind, None))
+        with self._cond:
+            self._heap = entries
+            heapq.heapify(self._heap)
+        logger.info(f"SCHEDULER: Loaded {len(entries)} pending transitions.")
+
+    def _reschedule_periodic(self, kind: str) -> None:
+        period = self._periodic[kind]
+        period[1] = time.time() + period[0]
+        with self._cond:
+            heapq.heappush(self._heap, (period[1], next(self._seq), kind, None))
+
+    def _pop_due(self) -> Optional[List[Entry]]:
+        """Blocks until at least one entry is due; returns None on shutdown."""
+        with self._cond:
+            while not self._stopping:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                return due
+            return None
+
+    def _run(self) -> None:
+        while True:
+            due = self._pop_due()
+            if due is None:
+                return
+            metrics.scheduler_lag_seconds.observe(max(0.0, time.time() - due[0][0]))
+            # Coalesce: every handler runs once per wake-up with all of its due payloads,
+            # so hundreds of elections closing at the same second cost a single call.
+            batches: Dict[str, List[Any]] = {}
+            for _, _, kind, payload in due:
+                batches.setdefault(kind, []).append(payload)
+            if batches.pop("resync", None) is not None:
+                try:
+                    self._reload()
+                except Exception as e:
+                    logger.error(f"SCHEDULER ERROR (resync): {str(e)}")
+            for kind, payloads in batches.items():
+                if kind in self._periodic:
+                    self._reschedule_periodic(kind)
+                    payloads = [p for p in payloads if p is not None]
+                handler = self._handlers.get(kind)
+                if handler is None:
+                    logger.error(f"SCHEDULER: No handler registered for '{kind}'.")
+                    continue
+                try:
+                    handler(payloads)
+                except Exception as e:
+                    logger.error(f"SCHEDULER ERROR ({kind} {payloads}): {str(e)}")
+
 
 # Scheduler burada tek bir instance olarak tanımlanır.
 # Hem main.py (başlatmak için) hem router (iş eklemek için) burayı kullanacak.
-scheduler = BackgroundScheduler()
\ No newline at end of file
+scheduler = LifecycleEngine()
+metrics.scheduler_pending_entries.set_function(lambda: len(scheduler))
@@ -0,0 +1,351 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# W3C Trace Context: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(16)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def _new_id(length: int) -> str:
+    return f"{random.getrandbits(length * 4):0{length}x}"
+
+
+def parse_traceparent(header: Optional[str]):
+    """Returns (trace_id, parent_span_id, sampled) from a traceparent header, or None if it is missing or malformed."""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == _INVALID_TRACE_ID or parent_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 0x01)
+
+
+# --- Exporters ---
+
+class FileExporter:
+    """Appends finished spans to a JSON Lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OTLPHttpExporter:
+    """Posts spans as OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str, service_name: str = "evoting-api", timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.encode(spans)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "evoting"},
+                    "spans": [_otlp_span(span) for span in spans],
+                }],
+            }]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_otlp_attribute(k, v) for k, v in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+class BatchSpanProcessor:
+    """
+    Buffers finished spans and exports them from a background thread, so a
+    request never waits on disk or network I/O. The buffer is bounded: when
+    the exporter falls behind, new spans are dropped and counted instead of
+    growing memory.
+    """
+
+    def __init__(self, exporter, max_queue_size: int = 4096, max_batch_size: int = 512, interval: float = 1.0):
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if len(self._queue) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def _worker(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.max_batch_size:
+                batch.append(self._queue.popleft())
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning(f"Span export failed, dropped {len(batch)} spans: {e}")
+
+    def shutdown(self) -> None:
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+class SimpleSpanProcessor:
+    """Exports every span synchronously as it ends (tests, debugging)."""
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    def on_end(self, span: Span) -> None:
+        self.exporter.export([span])
+
+    def flush(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+# --- Tracer ---
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Head-sampled tracer. The sampling decision is made once per request by
+    `start_trace`: an incoming sampled traceparent is always honoured,
+    otherwise `sample_ratio` of new traces are kept. Unsampled requests get no
+    current span, so every nested `span()` / `@traced` call is a single
+    ContextVar lookup.
+    """
+
+    def __init__(self):
+        self.processor = None
+        self.sample_ratio = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+    def configure(self, processor, sample_ratio: float = 1.0) -> None:
+        if self.processor is not None:
+            self.processor.shutdown()
+        self.processor = processor
+        self.sample_ratio = max(0.0, min(1.0, sample_ratio))
+
+    def shutdown(self) -> None:
+        if self.processor is not None:
+            self.processor.shutdown()
+            self.processor = None
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Root span for an incoming request, or None when the request is not sampled."""
+        if self.processor is None:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+            if not sampled:
+                return None
+        else:
+            if random.random() >= self.sample_ratio:
+                return None
+            trace_id, parent_id = _new_id(32), None
+        return Span(trace_id, parent_id, name, SPAN_KIND_SERVER, attributes)
+
+    def start_child(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Child of the current span without making it current (for event-hook spans such as DB statements)."""
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        return Span(parent.trace_id, parent.span_id, name, kind, attributes)
+
+    def end(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        processor = self.processor
+        if processor is not None:
+            processor.on_end(span)
+
+
+tracer = Tracer()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def activate(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Makes `span` current for the block and ends it afterwards."""
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.end(span)
+
+
+def span(name: str, **attributes: Any):
+    """`with span("name"):` opens a child of the current span (no-op outside a sampled trace)."""
+    return activate(tracer.start_child(name, attributes=attributes))
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator that wraps each call in a span named after the function (sync or async)."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with activate(tracer.start_child(span_name)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with activate(tracer.start_child(span_name)):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def traced_class(cls):
+    """Class decorator: traces every public method defined on the class itself."""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.isfunction(value):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+def exporter_from_settings(settings):
+    if settings.TRACING_EXPORTER == "otlp":
+        return OTLPHttpExporter(settings.TRACING_OTLP_ENDPOINT)
+    return FileExporter(os.path.expanduser(settings.TRACING_FILE))
@@ -0,0 +1,164 @@
+import mmap
+import os
+import threading
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: growth is not coordinated between processes.
+    fcntl = None
+
+from src.core.config import get_settings
+
+PAGE = 4096
+
+
+class VotedBitmap:
+    """
+    Bitset of the user ids that have voted in one election: bit `user_id` is
+    set once their ballot is committed. A million voters take 125 KB.
+
+    In memory by default; with a `path` the bits live in a shared memory-mapped
+    file, so every worker on the host sees them and they survive restarts. The
+    database stays authoritative: a missing bit only means "ask the database",
+    and bits are set after the ballot is committed, never before.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._bits = bytearray()
+        if path:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            size = os.fstat(self._fd).st_size
+            if size:
+                self._bits = mmap.mmap(self._fd, size)
+
+    def __contains__(self, user_id: int) -> bool:
+        if user_id < 0:
+            return False  # not a user id (it may come straight from a request body)
+        byte, bit = divmod(user_id, 8)
+        with self._lock:
+            if byte >= len(self._bits):
+                self._remap()
+                if byte >= len(self._bits):
+                    return False
+            return bool(self._bits[byte] & (1 << bit))
+
+    def add(self, user_id: int) -> None:
+        if user_id < 0:
+            raise ValueError(f"Invalid user id: {user_id}")
+        byte, bit = divmod(user_id, 8)
+        with self._lock:
+            if byte >= len(self._bits):
+                # Another worker may have grown the file, though not necessarily far enough.
+                self._remap()
+                if byte >= len(self._bits):
+                    self._grow(byte + 1)
+            self._bits[byte] |= 1 << bit
+
+    def is_stale(self) -> bool:
+        """True when the backing file was deleted or replaced (e.g. by another worker's reset)."""
+        if self._fd is None:
+            return False
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            if isinstance(self._bits, mmap.mmap):
+                self._bits.close()
+            self._bits = bytearray()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _remap(self) -> bool:
+        # Another worker may have grown the shared file past our mapping.
+        if self._fd is None:
+            return False
+        size = os.fstat(self._fd).st_size
+        if size <= len(self._bits):
+            return False
+        self._map(size)
+        return True
+
+    def _grow(self, needed: int) -> None:
+        size = max(needed, len(self._bits) * 2, PAGE)
+        size = -(-size // PAGE) * PAGE
+        if self._fd is None:
+            self._bits.extend(bytes(size - len(self._bits)))
+            return
+        # Locked and sized from the file itself: a worker growing from a stale mapping
+        # must never truncate away bytes another worker has just added.
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            size = max(size, os.fstat(self._fd).st_size)
+            os.ftruncate(self._fd, size)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map(size)
+
+    def _map(self, size: int) -> None:
+        if isinstance(self._bits, mmap.mmap):
+            self._bits.close()
+        self._bits = mmap.mmap(self._fd, size)
+
+
+class VotedBitmaps:
+    """One VotedBitmap per election, files named election-<id>.bits under `directory` if given."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._bitmaps: Dict[int, VotedBitmap] = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, election_id: int) -> VotedBitmap:
+        with self._lock:
+            bitmap = self._bitmaps.get(election_id)
+            if bitmap is None or bitmap.is_stale():
+                if bitmap is not None:
+                    bitmap.close()
+                bitmap = self._bitmaps[election_id] = VotedBitmap(self._path(election_id))
+            return bitmap
+
+    def drop(self, election_id: int) -> None:
+        """Forgets an election's bits (election deleted); its id may be reused later."""
+        with self._lock:
+            bitmap = self._bitmaps.pop(election_id, None)
+            if bitmap is not None:
+                bitmap.close()
+            path = self._path(election_id)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def reset(self) -> None:
+        """Forgets every election's bits, e.g. after the database was replaced by a snapshot."""
+        with self._lock:
+            for bitmap in self._bitmaps.values():
+                bitmap.close()
+            self._bitmaps.clear()
+            if self.directory and os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if name.startswith("election-") and name.endswith(".bits"):
+                        os.remove(os.path.join(self.directory, name))
+
+    def _path(self, election_id: int) -> Optional[str]:
+        return os.path.join(self.directory, f"election-{election_id}.bits") if self.directory else None
+
+
+_voted_bitmaps: Optional[VotedBitmaps] = None
+
+def voted_bitmaps() -> VotedBitmaps:
+    """Process-wide registry; memory-mapped under VOTED_BITMAP_DIR when it is set."""
+    global _voted_bitmaps
+    if _voted_bitmaps is None:
+        _voted_bitmaps = VotedBitmaps(get_settings().VOTED_BITMAP_DIR)
+    return _voted_bitmaps
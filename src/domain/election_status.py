@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+
+PENDING = "pending"
+ACTIVE = "active"
+COMPLETED = "completed"
+STATUSES = (PENDING, ACTIVE, COMPLETED)
+
+
+def derive_status(start_time: Optional[datetime], end_time: Optional[datetime], override: Optional[str], now: datetime) -> str:
+    """
+    Computes an election's effective status from its window and an optional
+    admin override, so the answer is correct at any instant without a
+    background job having run.
+
+    - A 'completed' override closes the election for good.
+    - Once `end_time` has passed the election is completed, whatever else was set.
+    - An 'active' override opens it early; a 'pending' override holds it back.
+    - Otherwise it is active from `start_time` on. Elections without a
+      `start_time` stay pending until an admin opens them.
+    """
+    if override == COMPLETED:
+        return COMPLETED
+    if end_time is not None and now >= end_time:
+        return COMPLETED
+    if override in (ACTIVE, PENDING):
+        return override
+    if start_time is None or now < start_time:
+        return PENDING
+    return ACTIVE
@@ -0,0 +1,7 @@
+# Who may vote in an election. Nothing is written per voter when an election
+# is created: a voter's ballot-state row (voting_tokens) is created the first
+# time they request a token or cast a ballot, after this rule is checked.
+ALL = "all"        # every registered user
+ROLE = "role"      # users whose role equals the election's `eligible_role`
+ROSTER = "roster"  # users listed in election_roster for the election
+RULES = (ALL, ROLE, ROSTER)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Set
 
 class IUserRepository(ABC):
     @abstractmethod
@@ -55,6 +55,22 @@ class IElectionRepository(ABC):
     def end_election(self, election_id: int) -> Optional[Any]:
         pass
 
+    @abstractmethod
+    def get_scheduled_transitions(self) -> List[Any]:
+        pass
+
+    @abstractmethod
+    def transition_due_elections(self, now: Any) -> Dict[str, List[int]]:
+        pass
+
+    @abstractmethod
+    def add_to_roster(self, election_id: int, user_ids: List[int]) -> None:
+        pass
+
+    @abstractmethod
+    def filter_eligible(self, election: Any, user_ids: List[int]) -> Set[int]:
+        pass
+
 class ICandidateRepository(ABC):
     @abstractmethod
     def create(self, candidate_data: Any) -> Any:
@@ -85,13 +101,65 @@ class IVotingTokenRepository(ABC):
     def get_token(self, user_id: int, election_id: int) -> Optional[Any]:
         pass
 
+    @abstractmethod
+    def has_voted(self, user_id: int, election_id: int) -> bool:
+        pass
+
     @abstractmethod
     def mark_as_used(self, token: Any) -> Any:
         pass
 
+    @abstractmethod
+    def get_tokens_for_users(self, election_id: int, user_ids: List[int]) -> List[Any]:
+        pass
+
+    @abstractmethod
+    def burn_tokens(self, token_ids: List[int]) -> List[int]:
+        pass
+
+    @abstractmethod
+    def burn_token_by_hash(self, token_hash: str, election_id: int, user_id: Optional[int], now: Any) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    def get_token_by_hash(self, token_hash: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def get_tokens_by_hashes(self, election_id: int, token_hashes: List[str]) -> List[Any]:
+        pass
+
+    @abstractmethod
+    def claim_ballots(self, election_id: int, user_ids: List[int], expires_at: Any) -> List[int]:
+        pass
+
+    @abstractmethod
+    def delete_completed_election_tokens(self, now: Any, limit: int) -> int:
+        pass
+
+    @abstractmethod
+    def compact(self) -> None:
+        pass
+
 class IVoteRepository(ABC):
     @abstractmethod
-    def create(self, vote_data: Any) -> Any:
+    def create(self, vote_data: Any, idempotency_key_hash: Optional[bytes] = None, key_expires_at: Any = None) -> Any:
+        pass
+
+    @abstractmethod
+    def get_receipt_by_idempotency_key(self, key_hash: bytes, now: Any) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def delete_expired_idempotency_keys(self, now: Any, limit: int) -> int:
+        pass
+
+    @abstractmethod
+    def create_many(self, votes: List[Dict[str, Any]]) -> None:
+        pass
+
+    @abstractmethod
+    def apply_journaled(self, votes: List[Dict[str, Any]], idempotency_keys: List[Any]) -> None:
         pass
 
     @abstractmethod
@@ -101,3 +169,7 @@ class IVoteRepository(ABC):
     @abstractmethod
     def get_results(self, election_id: int) -> List[Dict[str, Any]]:
         pass
+
+    @abstractmethod
+    def get_vote_timeline(self, election_id: int) -> List[Any]:
+        pass
@@ -0,0 +1,13 @@
+import hashlib
+
+# prev_vote_hash of the first ballot in every election.
+GENESIS_HASH = "GENESIS"
+
+
+def compute_vote_hash(prev_hash: str, user_id, candidate_id, timestamp: str) -> str:
+    """
+    Hash that links a ballot to the one before it in the same election. Any
+    edit to an earlier ballot changes every hash after it, which is what makes
+    the chain tamper-evident.
+    """
+    return hashlib.sha256(f"{prev_hash}{user_id}{candidate_id}{timestamp}".encode()).hexdigest()
@@ -0,0 +1,156 @@
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from src.core import metrics
+from src.core.tracing import SPAN_KIND_CLIENT, tracer
+
+_instrumented_pools = weakref.WeakSet()
+
+
+def instrument_engine(engine: Engine, name: str = "default") -> None:
+    """
+    Exports connection pool statistics for `engine`, labelled `name`:
+    checkouts, time spent waiting for a connection, and pool occupancy
+    (read at scrape time).
+    Safe to call more than once.
+    """
+    pool = engine.pool
+    if pool in _instrumented_pools:
+        return
+    _instrumented_pools.add(pool)
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.db_pool_checkouts_total.inc(name)
+
+    # Engine.raw_connection() goes through pool.connect(); timing it captures
+    # the wait for a free connection (or for a new one to be opened).
+    checkout = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return checkout()
+        finally:
+            metrics.db_pool_checkout_wait_seconds.observe(time.perf_counter() - started, name)
+
+    pool.connect = timed_connect
+
+    # Only QueuePool-style pools report occupancy; others simply export nothing.
+    for state in ("checkedout", "checkedin", "overflow", "size"):
+        if hasattr(pool, state):
+            metrics.db_pool_connections.set_function(getattr(pool, state), name, state)
+
+
+class QueryStats:
+    """Queries issued while handling one request."""
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # statement text -> executions; identical text with different parameters is the N+1 signature
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.seconds += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(statement, n) for statement, n in self.statements.items() if n >= threshold]
+
+
+# Set by the request middleware; sync endpoints run in the threadpool with a
+# copy of the context, so they see (and mutate) the same QueryStats object.
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_queries_tracked = False
+
+
+def track_queries() -> None:
+    """
+    Times every statement executed by any engine in the process and adds it
+    to the current request's QueryStats, if there is one. Safe to call more
+    than once.
+    """
+    global _queries_tracked
+    if _queries_tracked:
+        return
+    _queries_tracked = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+    @event.listens_for(Engine, "handle_error")
+    def handle_error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection is not None else None
+        if started:
+            started.pop()
+
+
+_queries_traced = False
+
+
+def trace_queries() -> None:
+    """
+    Adds a span for every SQL statement, and one per Session commit (flush
+    plus COMMIT), under the current request's trace. Statements outside a
+    sampled trace cost one ContextVar lookup. Safe to call more than once.
+    """
+    global _queries_traced
+    if _queries_traced:
+        return
+    _queries_traced = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def start_statement_span(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_child("db.statement", SPAN_KIND_CLIENT, {"db.system": conn.dialect.name, "db.statement": " ".join(statement.split())[:500]})
+        conn.info.setdefault("statement_spans", []).append(span)
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def end_statement_span(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["statement_spans"].pop()
+        if span is not None:
+            if executemany:
+                span.set_attribute("db.executemany", True)
+            tracer.end(span)
+
+    @event.listens_for(Engine, "handle_error")
+    def fail_statement_span(exception_context):
+        spans = exception_context.connection.info.get("statement_spans") if exception_context.connection is not None else None
+        if spans:
+            span = spans.pop()
+            if span is not None:
+                span.record_error(exception_context.original_exception)
+                tracer.end(span)
+
+    @event.listens_for(Session, "before_commit")
+    def start_commit_span(session):
+        session.info["commit_span"] = tracer.start_child("db.commit", SPAN_KIND_CLIENT)
+
+    @event.listens_for(Session, "after_commit")
+    def end_commit_span(session):
+        span = session.info.pop("commit_span", None)
+        if span is not None:
+            tracer.end(span)
+
+    @event.listens_for(Session, "after_soft_rollback")
+    def fail_commit_span(session, previous_transaction):
+        span = session.info.pop("commit_span", None)
+        if span is not None:
+            span.error = "rolled back"
+            tracer.end(span)
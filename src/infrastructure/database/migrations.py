@@ -0,0 +1,58 @@
+"""
+Brings a database created by an older version up to the current models.
+
+`Base.metadata.create_all` creates missing tables but never alters existing
+ones, so columns and constraints added to existing tables are applied here.
+Every step checks the live schema first, so running it on each startup (see
+the lifespan in main.py) is a no-op once the database is current.
+"""
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+TOKEN_UNIQUE = "uq_voting_tokens_user_election"
+
+# Columns added to `elections` after its first release: name -> DDL type and default.
+ELECTION_COLUMNS = {
+    "status_override": "VARCHAR",
+    "eligibility": "VARCHAR NOT NULL DEFAULT 'all'",
+    "eligible_role": "VARCHAR",
+}
+
+
+def upgrade_schema(engine: Engine) -> None:
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        existing = {column["name"] for column in inspector.get_columns("elections")}
+        for name, ddl in ELECTION_COLUMNS.items():
+            if name in existing:
+                continue
+            conn.execute(text(f"ALTER TABLE elections ADD COLUMN {name} {ddl}"))
+            logger.info("Added elections.%s", name)
+            if name == "status_override":
+                # Statuses used to be stored as decisions. Keep the ones the clock would not
+                # reproduce (opened or closed by an admin); 'pending' now follows start_time.
+                conn.execute(text("UPDATE elections SET status_override = status WHERE status IN ('active', 'completed')"))
+
+        if not _has_token_unique(inspector):
+            # One ballot-state row per voter and election. Keep the row that records a vote,
+            # else the oldest, so nobody who voted can vote again.
+            deleted = conn.execute(text(
+                "DELETE FROM voting_tokens WHERE EXISTS ("
+                " SELECT 1 FROM voting_tokens keeper"
+                " WHERE keeper.user_id = voting_tokens.user_id AND keeper.election_id = voting_tokens.election_id"
+                " AND (COALESCE(keeper.is_used, FALSE) AND NOT COALESCE(voting_tokens.is_used, FALSE)"
+                "  OR (COALESCE(keeper.is_used, FALSE) = COALESCE(voting_tokens.is_used, FALSE) AND keeper.id < voting_tokens.id)))"
+            )).rowcount
+            conn.execute(text(f"CREATE UNIQUE INDEX {TOKEN_UNIQUE} ON voting_tokens (user_id, election_id)"))
+            logger.info("Created %s (removed %d duplicate voting tokens)", TOKEN_UNIQUE, deleted)
+
+
+def _has_token_unique(inspector) -> bool:
+    # create_all makes it a table constraint; an upgraded database has it as a unique index.
+    wanted = {"user_id", "election_id"}
+    if any(set(c["column_names"]) == wanted for c in inspector.get_unique_constraints("voting_tokens")):
+        return True
+    return any(i["unique"] and set(i["column_names"]) == wanted for i in inspector.get_indexes("voting_tokens"))
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.types import TypeDecorator
 import datetime
+from src.domain.election_status import derive_status
 
 # Base is a class that all our database models will inherit from.
 Base = declarative_base()
@@ -52,7 +53,13 @@ class Election(Base):
     description = Column(Text)
     start_time = Column(AwareDateTime, nullable=True)
     end_time = Column(AwareDateTime, nullable=True)
-    status = Column(String, default="pending")
+    # Cached materialization of `status`, refreshed by the lifecycle engine. Readers use `status`.
+    stored_status = Column("status", String, default="pending")
+    # Explicit admin decision ('pending', 'active' or 'completed'); None means follow the clock.
+    status_override = Column(String, nullable=True)
+    # Who may vote: 'all', 'role' (users with `eligible_role`) or 'roster' (election_roster). See domain.eligibility.
+    eligibility = Column(String, default="all", nullable=False)
+    eligible_role = Column(String, nullable=True)
     created_by = Column(Integer, ForeignKey("users.id"))
 
     creator = relationship("User", back_populates="elections")
@@ -60,6 +67,17 @@ class Election(Base):
     votes = relationship("Vote", back_populates="election")
     tokens = relationship("VotingToken", back_populates="election")
 
+    @property
+    def status(self) -> str:
+        """Effective status, derived from the election window and override at read time."""
+        return derive_status(self.start_time, self.end_time, self.status_override, datetime.datetime.now(datetime.timezone.utc))
+
+    @status.setter
+    def status(self, value):
+        # Assigning a status is an explicit override; None hands control back to the clock.
+        self.status_override = value
+        self.stored_status = self.status
+
 # Defines the 'candidates' table for each election.
 class Candidate(Base):
     __tablename__ = "candidates"
@@ -72,9 +90,19 @@ class Candidate(Base):
     election = relationship("Election", back_populates="candidates")
     votes = relationship("Vote", back_populates="candidate")
 
-# Defines 'voting_tokens' to ensure one person, one vote.
+# Voters of a 'roster' election.
+class ElectionRoster(Base):
+    __tablename__ = "election_roster"
+
+    election_id = Column(Integer, ForeignKey("elections.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+# Defines 'voting_tokens' to ensure one person, one vote. A row is the voter's
+# ballot state for one election and is created lazily, by the first token
+# request or ballot; token_hash stays null if they voted without a token.
 class VotingToken(Base):
     __tablename__ = "voting_tokens"
+    __table_args__ = (UniqueConstraint("user_id", "election_id", name="uq_voting_tokens_user_election"),)
 
     id = Column(Integer, primary_key=True, index=True)
     token_hash = Column(String, unique=True, index=True)
@@ -99,3 +127,15 @@ class Vote(Base):
 
     election = relationship("Election", back_populates="votes")
     candidate = relationship("Candidate", back_populates="votes")
+
+# Maps a client's Idempotency-Key to the ballot it produced, so a retried
+# request gets the original receipt back instead of a "Double Vote" error.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # First 16 bytes of sha256(election, user, key): fixed-size and compact whatever the client sends.
+    key_hash = Column(LargeBinary(16), primary_key=True)
+    vote_id = Column(Integer, ForeignKey("votes.id"))
+    expires_at = Column(AwareDateTime, index=True)
+
+    vote = relationship("Vote")
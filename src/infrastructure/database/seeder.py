@@ -1,53 +1,41 @@
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-import random
 
-# Schemas
-from src.application import schemas
+from src.domain.election_status import derive_status
+from src.infrastructure.database.models import User, Election, Candidate
 
-# Services & Repositories
-from src.infrastructure.repositories.user_repository import SqlAlchemyUserRepository
-from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository, SqlAlchemyCandidateRepository
-from src.infrastructure.repositories.vote_repository import SqlAlchemyVotingTokenRepository
-from src.application.services.auth_service import AuthService
-from src.application.services.election_service import ElectionService
+SEED_PASSWORD = "password123"
+# bcrypt hash of SEED_PASSWORD, computed once offline so seeding does no hashing work.
+SEED_PASSWORD_HASH = "$2b$12$5Dcj0hcFgGuSnA9Ly18wPe/MXcPJyv0INns6jg/y/CkhhIOPf.Uvu"
 
 def seed_database(db: Session):
     """
     Populates the database with extensive mock data if it is empty.
     Creates Admins, Voters, and multiple Elections with realistic scenarios.
+
+    Everything is written with bulk INSERTs in a single transaction; all
+    seeded accounts share one precomputed password hash.
     """
     print("🌱 Checking database state...")
-    
-    user_repo = SqlAlchemyUserRepository(db)
-    
+
     # Idempotency check: If admin exists, assume seeded.
-    if user_repo.get_by_username("admin"):
+    if db.execute(select(User.id).where(User.username == "admin")).first():
         print("✅ Database already seeded. Skipping.")
         return
 
     print("⚡ Seeding database with RICH mock data...")
+    now = datetime.now(timezone.utc)
 
-    # --- 1. SETUP SERVICES ---
-    auth_service = AuthService(user_repo)
-    election_repo = SqlAlchemyElectionRepository(db)
-    candidate_repo = SqlAlchemyCandidateRepository(db)
-    token_repo = SqlAlchemyVotingTokenRepository(db)
-    election_service = ElectionService(election_repo, candidate_repo, token_repo, user_repo)
-
-    # --- 2. CREATE USERS ---
+    # --- 1. CREATE USERS ---
     print("   --> Creating Users...")
-    
-    # 2.1 Admins
+
+    # 1.1 Admins
     admins = ["admin", "moderator"]
-    created_admins = []
     for adm in admins:
-        user = auth_service.register_user(schemas.UserCreate(username=adm, password="password123"))
-        auth_service.update_user_role(user.id, "admin")
-        created_admins.append(user)
         print(f"      - Admin: {adm}")
 
-    # 2.2 Voters (Increased Count & Variety)
+    # 1.2 Voters (Increased Count & Variety)
     # Generate 50 realistic usernames
     base_names = [
         "alice", "bob", "charlie", "david", "eve", "frank", "grace", "heidi", "ivan", "judy",
@@ -64,14 +52,15 @@ def seed_database(db: Session):
             voter_names.append(base_names[i])
         else:
             voter_names.append(f"voter_{i+1}")
-    
-    for v_name in voter_names:
-        if not user_repo.get_by_username(v_name):
-             auth_service.register_user(schemas.UserCreate(username=v_name, password="password123"))
-    
+
+    user_rows = [{"username": name, "password_hash": SEED_PASSWORD_HASH, "role": "admin", "created_at": now} for name in admins]
+    user_rows += [{"username": name, "password_hash": SEED_PASSWORD_HASH, "role": "voter", "created_at": now} for name in voter_names]
+    user_ids = db.execute(insert(User).returning(User.id, sort_by_parameter_order=True), user_rows).scalars().all()
+    primary_admin_id = user_ids[0]
+
     print(f"      - Created/Verified {len(voter_names)} voters.")
 
-    # --- 3. CREATE ELECTIONS ---
+    # --- 2. CREATE ELECTIONS ---
     print("   --> Creating Elections...")
 
     # Data Source (Expanded & Improved)
@@ -231,42 +220,37 @@ def seed_database(db: Session):
     ]
 
     # Create Loop
-    primary_admin = created_admins[0]
-    
+    election_rows = []
     for data in elections_data:
-        start_time = datetime.now(timezone.utc)
+        start_time = now
         
         # Adjust start time based on desired status logic
         if data["status"] == "pending":
              # Starts in future
-             start_time = datetime.now(timezone.utc) + timedelta(days=1)
+             start_time = now + timedelta(days=1)
         elif data["status"] == "completed":
              # Started in past
-             start_time = datetime.now(timezone.utc) - timedelta(days=data["days_active"] + 1)
+             start_time = now - timedelta(days=data["days_active"] + 1)
 
         end_time = start_time + timedelta(days=data["days_active"])
 
-        election_create = schemas.ElectionCreate(
-            title=data["title"],
-            description=data["desc"],
-            start_time=start_time,
-            end_time=end_time,
-            candidates=[
-                schemas.CandidateCreate(name=c["name"], bio=c["bio"]) for c in data["candidates"]
-            ]
-        )
-        
-        # Create via Service (Handles Token Generation)
-        election = election_service.create_election(election_create, user_id=primary_admin.id)
-        
-        # Apply Status Logic
-        if data["status"] == "active":
-             election_service.start_election(election.id)
-        elif data["status"] == "completed":
-             # We assume it was active then ended
-             election_service.start_election(election.id)
-             election_service.end_election(election.id)
-        
-        print(f"      - [{data['status'].upper()}] {election.title}")
+        # No override: the status follows from the window, the column just caches it.
+        election_rows.append({
+            "title": data["title"],
+            "description": data["desc"],
+            "start_time": start_time,
+            "end_time": end_time,
+            "stored_status": derive_status(start_time, end_time, None, now),
+            "created_by": primary_admin_id,
+        })
+    election_ids = db.execute(insert(Election).returning(Election.id, sort_by_parameter_order=True), election_rows).scalars().all()
+
+    # Same as ElectionService.create_election: open to all users, voting tokens are created on first use.
+    candidate_rows = []
+    for election_id, data in zip(election_ids, elections_data):
+        candidate_rows += [{"name": c["name"], "bio": c["bio"], "election_id": election_id} for c in data["candidates"]]
+        print(f"      - [{data['status'].upper()}] {data['title']}")
+    db.execute(insert(Candidate), candidate_rows)
+    db.commit()
 
-    print("✅ Seeding completed successfully!")
\ No newline at end of file
+    print("✅ Seeding completed successfully!")
@@ -1,23 +1,68 @@
+from typing import Dict, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
-from src.core.config import settings
+from src.core.bulkhead import current_group, parse_groups
+from src.core.config import get_settings
 
-# The database engine connects to the database specified in the config.
-connect_args = {}
-if "sqlite" in settings.DATABASE_URL:
-    connect_args = {"check_same_thread": False}
-
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args=connect_args
-)
+_engine: Optional[Engine] = None
+# Route group -> dedicated engine (see DB_GROUP_POOLS); created together with the main engine.
+_group_engines: Dict[str, Engine] = {}
 
 # A SessionLocal class is a factory for creating new database sessions.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# It is bound to the engine the first time get_engine() runs.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def _is_memory_database(url: str) -> bool:
+    # Each engine would get its own private in-memory database.
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:"))
+
+def get_engine() -> Engine:
+    """The database engine, created on first use from the configured DATABASE_URL."""
+    global _engine
+    if _engine is None:
+        settings = get_settings()
+        connect_args = {}
+        if "sqlite" in settings.DATABASE_URL:
+            connect_args = {"check_same_thread": False}
+        if _is_memory_database(settings.DATABASE_URL):
+            _engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
+            SessionLocal.configure(bind=_engine)
+            return _engine
+        pools = parse_groups(settings.DB_GROUP_POOLS, int)
+        limits = parse_groups(settings.BULKHEAD_LIMITS, int) if settings.BULKHEADS_ENABLED else {}
+        # A pool never holds fewer connections than its bulkhead admits requests, so requests
+        # queue (and are shed with 503) only at the bulkhead, never at the pool.
+        shared = sum(limit for group, limit in limits.items() if group not in pools)
+        _engine = create_engine(settings.DATABASE_URL, connect_args=connect_args, max_overflow=max(10, shared))
+        SessionLocal.configure(bind=_engine)
+        timeouts = parse_groups(settings.BULKHEAD_QUEUE_TIMEOUTS, float)
+        for group, size in pools.items():
+            _group_engines[group] = create_engine(
+                settings.DATABASE_URL, connect_args=connect_args,
+                pool_size=max(size, limits.get(group, 0)), max_overflow=0, pool_timeout=timeouts.get(group, 30.0),
+            )
+    return _engine
+
+def all_engines() -> Dict[str, Engine]:
+    """The main engine as "default" plus one per route group with a dedicated pool."""
+    return {"default": get_engine(), **_group_engines}
+
+def new_session():
+    get_engine()
+    # Requests of a group with its own pool draw connections only from it.
+    group_engine = _group_engines.get(current_group.get())
+    return SessionLocal(bind=group_engine) if group_engine is not None else SessionLocal()
 
 def get_db():
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
         db.close()
+
+# Back-compat for `from src.infrastructure.database.session import engine`.
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,124 @@
+"""
+Database snapshots: capture a seeded database into one compressed file and
+restore it in a single step, instead of replaying the seeder / ORM.
+
+Uses the SQLite online backup API, so a snapshot can be taken from a live
+database and restored page-by-page without going through SQL.
+
+    python -m src.infrastructure.database.snapshot capture snapshots/demo.db.gz
+    python -m src.infrastructure.database.snapshot restore snapshots/demo.db.gz [--force]
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from sqlalchemy import func, inspect, select
+from sqlalchemy.engine import Engine
+from src.core.voted_bitmap import voted_bitmaps
+from src.infrastructure.database.models import Base, User, Election
+
+
+def _sqlite_connection(engine: Engine):
+    if engine.dialect.name != "sqlite":
+        raise ValueError(f"Snapshots support SQLite only, not {engine.dialect.name}")
+    return engine.raw_connection()
+
+
+def is_empty(engine: Engine) -> bool:
+    """True when the schema is missing or holds no users and no elections."""
+    tables = set(inspect(engine).get_table_names())
+    if not {User.__tablename__, Election.__tablename__} <= tables:
+        return True
+    with engine.connect() as conn:
+        users = conn.execute(select(func.count()).select_from(User)).scalar()
+        elections = conn.execute(select(func.count()).select_from(Election)).scalar()
+    return users == 0 and elections == 0
+
+
+def capture(engine: Engine, path: str) -> int:
+    """Writes a gzip-compressed copy of the database to `path`; returns its size in bytes."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    raw = _sqlite_connection(engine)
+    with tempfile.TemporaryDirectory() as tmp:
+        copy_path = os.path.join(tmp, "snapshot.db")
+        copy = sqlite3.connect(copy_path)
+        try:
+            raw.driver_connection.backup(copy)
+        finally:
+            copy.close()
+            raw.close()
+        with open(copy_path, "rb") as src, gzip.open(path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    return os.path.getsize(path)
+
+
+def restore(engine: Engine, path: str) -> None:
+    """Replaces the contents of the database with the snapshot at `path`."""
+    raw = _sqlite_connection(engine)
+    with tempfile.TemporaryDirectory() as tmp:
+        copy_path = os.path.join(tmp, "snapshot.db")
+        with gzip.open(path, "rb") as src, open(copy_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        copy = sqlite3.connect(copy_path)
+        try:
+            copy.backup(raw.driver_connection)
+        finally:
+            copy.close()
+            raw.close()
+    # Who-has-voted bits describe the database that was just replaced.
+    voted_bitmaps().reset()
+
+
+def restore_if_empty(engine: Engine, path: str) -> bool:
+    """Startup hook: restores the snapshot only into an empty database. Returns True if it did."""
+    if not os.path.exists(path):
+        print(f"⚠️ Snapshot {path} not found, skipping restore.")
+        return False
+    if not is_empty(engine):
+        return False
+    started = time.perf_counter()
+    restore(engine, path)
+    print(f"📦 Restored database snapshot {path} in {(time.perf_counter() - started) * 1000:.0f} ms.")
+    return True
+
+
+def main(argv=None) -> int:
+    from src.infrastructure.database.session import get_engine
+
+    parser = argparse.ArgumentParser(description="Capture or restore a database snapshot (SQLite).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cap = sub.add_parser("capture", help="Snapshot the configured DATABASE_URL.")
+    cap.add_argument("path")
+    cap.add_argument("--seed", action="store_true", help="Create the schema and run the seeder first if the database is empty.")
+    res = sub.add_parser("restore", help="Restore a snapshot into the configured DATABASE_URL.")
+    res.add_argument("path")
+    res.add_argument("--force", action="store_true", help="Overwrite a database that already has data.")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.command == "capture":
+        if args.seed:
+            from src.infrastructure.database.session import new_session
+            from src.infrastructure.database.seeder import seed_database
+            Base.metadata.create_all(bind=engine)
+            with new_session() as db:
+                seed_database(db)
+        size = capture(engine, args.path)
+        print(f"✅ Snapshot written to {args.path} ({size / 1024:.0f} KiB).")
+        return 0
+
+    if not args.force and not is_empty(engine):
+        print("❌ Database is not empty; use --force to overwrite it.", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    restore(engine, args.path)
+    print(f"✅ Restored {args.path} in {(time.perf_counter() - started) * 1000:.0f} ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Deterministic synthetic dataset generator for capacity testing.
+
+Produces N users, M elections with a configurable candidate-count
+distribution, voting tokens and properly hash-chained votes for a given
+turnout, all with bulk INSERTs in one transaction. The same arguments and
+seed always produce the same rows (timestamps are relative to `--anchor`,
+midnight UTC today by default), so benchmark and query-plan runs are
+comparable.
+
+    python -m src.infrastructure.database.synthetic --users 100000 --elections 50 \\
+        --candidates 2-8 --turnout 0.6 --seed 42 --snapshot snapshots/100k.db.gz
+"""
+import argparse
+import hashlib
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from src.domain.election_status import ACTIVE, COMPLETED, PENDING, derive_status
+from src.domain.vote_chain import GENESIS_HASH, compute_vote_hash
+from src.infrastructure.database.models import Base, User, Election, Candidate, VotingToken, Vote
+from src.infrastructure.database.seeder import SEED_PASSWORD_HASH
+
+CHUNK_SIZE = 50_000
+
+
+class CandidateDistribution:
+    """
+    Number of candidates per election. Either a uniform range ("2-8") or
+    weighted counts ("2:0.5,3:0.3,5:0.2").
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        if ":" in spec:
+            pairs = [part.split(":") for part in spec.split(",")]
+            self.counts = [int(count) for count, _ in pairs]
+            self.weights = [float(weight) for _, weight in pairs]
+        else:
+            low, _, high = spec.partition("-")
+            self.counts = list(range(int(low), int(high or low) + 1))
+            self.weights = [1.0] * len(self.counts)
+        if not self.counts or min(self.counts) < 1:
+            raise ValueError(f"Invalid candidate distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> int:
+        return rng.choices(self.counts, self.weights)[0]
+
+
+def _parse_status_mix(spec: str) -> Dict[str, float]:
+    completed, active, pending = (float(part) for part in spec.split(","))
+    return {COMPLETED: completed, ACTIVE: active, PENDING: pending}
+
+
+def _next_id(conn: Connection, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert_chunked(conn: Connection, model, rows: Iterator[dict]) -> int:
+    total = 0
+    chunk: List[dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            conn.execute(insert(model), chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        conn.execute(insert(model), chunk)
+        total += len(chunk)
+    return total
+
+
+def _window(rng: random.Random, status: str, anchor: datetime) -> Tuple[datetime, datetime]:
+    if status == COMPLETED:
+        end = anchor - timedelta(hours=rng.randint(1, 60 * 24))
+        return end - timedelta(hours=rng.randint(24, 14 * 24)), end
+    if status == ACTIVE:
+        return anchor - timedelta(hours=rng.randint(1, 7 * 24)), anchor + timedelta(hours=rng.randint(24, 14 * 24))
+    start = anchor + timedelta(hours=rng.randint(1, 30 * 24))
+    return start, start + timedelta(hours=rng.randint(24, 14 * 24))
+
+
+def generate(
+    engine: Engine,
+    users: int,
+    elections: int,
+    candidates: CandidateDistribution,
+    turnout: float,
+    seed: int = 0,
+    status_mix: Optional[Dict[str, float]] = None,
+    anchor: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    Appends a synthetic dataset to the database behind `engine` and returns
+    row counts per table. Voters get a used token and a chained ballot; users
+    who did not vote have no token yet (they can still request one).
+    """
+    rng = random.Random(seed)
+    status_mix = status_mix or {COMPLETED: 0.5, ACTIVE: 0.4, PENDING: 0.1}
+    anchor = anchor or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    Base.metadata.create_all(bind=engine)
+    counts = {"users": 0, "elections": 0, "candidates": 0, "voting_tokens": 0, "votes": 0}
+
+    with engine.begin() as conn:
+        first_user = _next_id(conn, User)
+        election_id = _next_id(conn, Election)
+        candidate_id = _next_id(conn, Candidate)
+        suffix = f"s{seed}_{first_user}"
+
+        # Users: one admin (owner of every election) plus N voters sharing one password hash.
+        counts["users"] = _insert_chunked(conn, User, (
+            {"id": first_user + i, "username": f"synthetic_admin_{suffix}" if i == 0 else f"voter_{suffix}_{i:07d}",
+             "password_hash": SEED_PASSWORD_HASH, "role": "admin" if i == 0 else "voter", "created_at": anchor - timedelta(days=90)}
+            for i in range(users + 1)
+        ))
+        admin_id = first_user
+        voter_ids = range(first_user + 1, first_user + users + 1)
+
+        statuses = list(status_mix)
+        weights = [status_mix[s] for s in statuses]
+        for n in range(elections):
+            status = rng.choices(statuses, weights)[0]
+            start, end = _window(rng, status, anchor)
+            conn.execute(insert(Election), [{
+                "id": election_id, "title": f"Synthetic Election {n + 1}", "description": f"Generated with seed {seed}.",
+                "start_time": start, "end_time": end, "status": derive_status(start, end, None, anchor), "created_by": admin_id,
+            }])
+            candidate_ids = list(range(candidate_id, candidate_id + candidates.sample(rng)))
+            conn.execute(insert(Candidate), [
+                {"id": cid, "name": f"Candidate {i + 1}", "bio": "", "election_id": election_id}
+                for i, cid in enumerate(candidate_ids)
+            ])
+            candidate_id += len(candidate_ids)
+            counts["elections"] += 1
+            counts["candidates"] += len(candidate_ids)
+
+            if status != PENDING and users:
+                # Skewed preferences so results are not a flat tie.
+                preference = [rng.random() ** 2 for _ in candidate_ids]
+                voters = rng.sample(voter_ids, round(users * turnout))
+                voting_closes = min(end, anchor)
+                span = max((voting_closes - start).total_seconds(), 1.0)
+                times = sorted(start + timedelta(seconds=rng.random() * span) for _ in voters)
+                choices = rng.choices(candidate_ids, preference, k=len(voters))
+
+                counts["voting_tokens"] += _insert_chunked(conn, VotingToken, (
+                    {"token_hash": hashlib.sha256(f"synthetic-{seed}-{election_id}-{user_id}".encode()).hexdigest(),
+                     "is_used": True, "expires_at": end, "election_id": election_id, "user_id": user_id}
+                    for user_id in voters
+                ))
+
+                def chained_votes() -> Iterator[dict]:
+                    prev_hash = GENESIS_HASH
+                    for user_id, chosen, cast_at in zip(voters, choices, times):
+                        vote_hash = compute_vote_hash(prev_hash, user_id, chosen, cast_at.isoformat())
+                        yield {"vote_hash": vote_hash, "prev_vote_hash": prev_hash, "created_at": cast_at, "election_id": election_id, "candidate_id": chosen}
+                        prev_hash = vote_hash
+
+                counts["votes"] += _insert_chunked(conn, Vote, chained_votes())
+            election_id += 1
+    return counts
+
+
+def main(argv=None) -> int:
+    from src.infrastructure.database.session import get_engine
+
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset into DATABASE_URL.")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--elections", type=int, default=20)
+    parser.add_argument("--candidates", default="2-6", help='Uniform range "2-8" or weighted "2:0.5,3:0.3,5:0.2".')
+    parser.add_argument("--turnout", type=float, default=0.6, help="Share of users voting in each non-pending election.")
+    parser.add_argument("--status-mix", default="0.5,0.4,0.1", help="Weights for completed,active,pending elections.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--anchor", type=datetime.fromisoformat, help="Reference 'now' for election windows (ISO 8601, UTC).")
+    parser.add_argument("--snapshot", help="Capture a snapshot of the result to this path (see snapshot.py).")
+    args = parser.parse_args(argv)
+    if not 0 <= args.turnout <= 1:
+        parser.error("--turnout must be between 0 and 1")
+
+    anchor = args.anchor.replace(tzinfo=args.anchor.tzinfo or timezone.utc) if args.anchor else None
+    engine = get_engine()
+    started = time.perf_counter()
+    counts = generate(
+        engine, args.users, args.elections, CandidateDistribution(args.candidates), args.turnout,
+        seed=args.seed, status_mix=_parse_status_mix(args.status_mix), anchor=anchor,
+    )
+    print(f"✅ Generated {', '.join(f'{n} {table}' for table, n in counts.items())} in {time.perf_counter() - started:.1f}s.")
+    if args.snapshot:
+        from src.infrastructure.database.snapshot import capture
+        size = capture(engine, args.snapshot)
+        print(f"📦 Snapshot written to {args.snapshot} ({size / 1024 / 1024:.1f} MiB).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,13 @@
-from typing import List, Optional, Dict, Any
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Set
+from sqlalchemy import insert, or_, select, update
 from sqlalchemy.orm import Session, joinedload
+from src.domain import eligibility
 from src.domain.interfaces import IElectionRepository, ICandidateRepository
-from src.infrastructure.database.models import Election, Candidate
+from src.infrastructure.database.models import Election, Candidate, ElectionRoster, User
+from src.core.tracing import traced_class
 
+@traced_class
 class SqlAlchemyElectionRepository(IElectionRepository):
     def __init__(self, db: Session):
         self.db = db
@@ -40,7 +45,63 @@ class SqlAlchemyElectionRepository(IElectionRepository):
     def end_election(self, election_id: int) -> Optional[Election]:
         return self.update(election_id, {"status": "completed"})
 
+    def get_scheduled_transitions(self) -> List[Any]:
+        # Column-only query: rebuilding the scheduler must not hydrate ORM objects.
+        return self.db.query(
+            Election.id, Election.start_time, Election.end_time, Election.stored_status
+        ).filter(
+            Election.stored_status.in_(["pending", "active"]),
+            or_(Election.start_time.isnot(None), Election.end_time.isnot(None)),
+        ).all()
 
+    def transition_due_elections(self, now: datetime) -> Dict[str, List[int]]:
+        """
+        Refreshes the cached status of every due election with one set-based
+        UPDATE per target status and returns the affected ids. Completion runs
+        first so an election whose whole window has passed goes straight to
+        'completed'. Mirrors `derive_status`: overridden elections are never
+        opened by the clock.
+        """
+        completed = self.db.execute(
+            update(Election)
+            .where(Election.stored_status.in_(["pending", "active"]), Election.end_time <= now)
+            .values(stored_status="completed")
+            .returning(Election.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        started = self.db.execute(
+            update(Election)
+            .where(Election.stored_status == "pending", Election.status_override.is_(None), Election.start_time <= now)
+            .values(stored_status="active")
+            .returning(Election.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        self.db.commit()
+        return {"active": list(started), "completed": list(completed)}
+
+    def add_to_roster(self, election_id: int, user_ids: List[int]) -> None:
+        existing = set(self.db.execute(
+            select(ElectionRoster.user_id).where(ElectionRoster.election_id == election_id, ElectionRoster.user_id.in_(user_ids))
+        ).scalars())
+        rows = [{"election_id": election_id, "user_id": user_id} for user_id in dict.fromkeys(user_ids) if user_id not in existing]
+        if rows:
+            self.db.execute(insert(ElectionRoster), rows)
+        self.db.commit()
+
+    def filter_eligible(self, election: Election, user_ids: List[int]) -> Set[int]:
+        """Returns the subset of `user_ids` allowed to vote in `election`, with one query."""
+        if election.eligibility == eligibility.ROSTER:
+            query = select(ElectionRoster.user_id).where(
+                ElectionRoster.election_id == election.id, ElectionRoster.user_id.in_(user_ids)
+            )
+        else:
+            query = select(User.id).where(User.id.in_(user_ids))
+            if election.eligibility == eligibility.ROLE:
+                query = query.where(User.role == election.eligible_role)
+        return set(self.db.execute(query).scalars())
+
+
+@traced_class
 class SqlAlchemyCandidateRepository(ICandidateRepository):
     def __init__(self, db: Session):
         self.db = db
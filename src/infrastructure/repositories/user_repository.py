@@ -2,7 +2,9 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from src.domain.interfaces import IUserRepository
 from src.infrastructure.database.models import User
+from src.core.tracing import traced_class
 
+@traced_class
 class SqlAlchemyUserRepository(IUserRepository):
     def __init__(self, db: Session):
         self.db = db
@@ -1,9 +1,11 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, delete, insert, select, update, or_
 from src.domain.interfaces import IVoteRepository, IVotingTokenRepository
-from src.infrastructure.database.models import Vote, VotingToken, Candidate
+from src.infrastructure.database.models import Vote, VotingToken, Candidate, Election, IdempotencyKey
+from src.core.tracing import traced_class
 
+@traced_class
 class SqlAlchemyVotingTokenRepository(IVotingTokenRepository):
     def __init__(self, db: Session):
         self.db = db
@@ -25,22 +27,184 @@ class SqlAlchemyVotingTokenRepository(IVotingTokenRepository):
             VotingToken.election_id == election_id
         ).first()
 
+    def has_voted(self, user_id: int, election_id: int) -> bool:
+        # Reads the column, not the entity: a token loaded earlier in the session would keep its stale state.
+        return bool(self.db.scalar(
+            select(VotingToken.is_used).where(VotingToken.user_id == user_id, VotingToken.election_id == election_id)
+        ))
+
     def mark_as_used(self, token: VotingToken) -> VotingToken:
         token.is_used = True
         self.db.add(token) 
         self.db.commit()
         return token
 
+    def get_tokens_for_users(self, election_id: int, user_ids: List[int]) -> List[VotingToken]:
+        return self.db.query(VotingToken).filter(
+            VotingToken.election_id == election_id,
+            VotingToken.user_id.in_(user_ids)
+        ).all()
+
+    def burn_tokens(self, token_ids: List[int]) -> List[int]:
+        """
+        Marks the tokens used in one statement and returns the ids that were
+        still unused, so a token consumed concurrently is not burned twice.
+        Runs in the caller's transaction; it is committed with the votes.
+        """
+        if not token_ids:
+            return []
+        result = self.db.execute(
+            update(VotingToken)
+            .where(VotingToken.id.in_(token_ids), VotingToken.is_used.is_(False))
+            .values(is_used=True)
+            .returning(VotingToken.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars())
+
+    def burn_token_by_hash(self, token_hash: str, election_id: int, user_id: Optional[int], now: Any) -> Optional[int]:
+        """
+        Burns a presented token in one probe of the unique token_hash index and
+        returns its voter, or None if it is unknown, used, expired, for another
+        election or (with `user_id`) another voter. Runs in the caller's
+        transaction; it is committed with the vote.
+        """
+        statement = update(VotingToken).where(
+            VotingToken.token_hash == token_hash,
+            VotingToken.election_id == election_id,
+            VotingToken.is_used.is_(False),
+            VotingToken.expires_at > now,
+        )
+        if user_id is not None:
+            statement = statement.where(VotingToken.user_id == user_id)
+        result = self.db.execute(
+            statement.values(is_used=True).returning(VotingToken.user_id).execution_options(synchronize_session=False)
+        )
+        return result.scalar()
+
+    def get_token_by_hash(self, token_hash: str) -> Optional[VotingToken]:
+        return self.db.query(VotingToken).filter(VotingToken.token_hash == token_hash).first()
+
+    def get_tokens_by_hashes(self, election_id: int, token_hashes: List[str]) -> List[VotingToken]:
+        return self.db.query(VotingToken).filter(
+            VotingToken.election_id == election_id,
+            VotingToken.token_hash.in_(token_hashes)
+        ).all()
+
+    def claim_ballots(self, election_id: int, user_ids: List[int], expires_at: Any) -> List[int]:
+        """
+        Records that the voters have voted and returns the user ids it
+        recorded, in one statement: voters without a row get a used
+        ballot-state row, an existing unused token is burned, and a voter
+        who has already voted (possibly concurrently) is left out. Runs in
+        the caller's transaction, like burn_tokens.
+        """
+        if not user_ids:
+            return []
+        if self.db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(VotingToken).values(
+            [{"is_used": True, "expires_at": expires_at, "election_id": election_id, "user_id": user_id} for user_id in user_ids]
+        )
+        result = self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["user_id", "election_id"],
+                set_={"is_used": True},
+                where=VotingToken.is_used.is_(False),
+            ).returning(VotingToken.user_id)
+        )
+        return list(result.scalars())
+
+    def delete_completed_election_tokens(self, now: Any, limit: int) -> int:
+        """
+        Deletes at most `limit` unused tokens of elections that can no longer
+        take votes, in its own short transaction. Used tokens are kept: they
+        are the double-vote guard, and a completed election can be reopened
+        (new end_time, override cleared). Tokens of open elections are never
+        touched; an unused one is simply created again on request.
+        """
+        completed = select(Election.id).where(or_(Election.end_time <= now, Election.status_override == "completed"))
+        chunk = (
+            select(VotingToken.id)
+            .where(VotingToken.election_id.in_(completed), or_(VotingToken.is_used.is_(False), VotingToken.is_used.is_(None)))
+            .limit(limit)
+        )
+        result = self.db.execute(
+            delete(VotingToken).where(VotingToken.id.in_(chunk)).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
+
+    def compact(self) -> None:
+        # VACUUM cannot run inside a transaction, so use a dedicated autocommit connection.
+        engine = self.db.get_bind().engine
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if engine.dialect.name == "sqlite":
+                conn.exec_driver_sql("VACUUM")
+            else:
+                conn.exec_driver_sql(f"VACUUM ANALYZE {VotingToken.__tablename__}")
+
+@traced_class
 class SqlAlchemyVoteRepository(IVoteRepository):
     def __init__(self, db: Session):
         self.db = db
 
-    def create(self, vote: Vote) -> Vote:
+    def create(self, vote: Vote, idempotency_key_hash: Optional[bytes] = None, key_expires_at: Any = None) -> Vote:
         self.db.add(vote)
+        if idempotency_key_hash is not None:
+            # Same transaction as the ballot: a stored key always has its vote.
+            self.db.add(IdempotencyKey(key_hash=idempotency_key_hash, vote=vote, expires_at=key_expires_at))
         self.db.commit()
         self.db.refresh(vote)
         return vote
 
+    def create_many(self, votes: List[Dict[str, Any]]) -> None:
+        # One executemany INSERT, committed together with any pending token burns.
+        if votes:
+            self.db.execute(insert(Vote), votes)
+        self.db.commit()
+
+    def apply_journaled(self, votes: List[Dict[str, Any]], idempotency_keys: List[Any]) -> None:
+        """
+        Inserts ballots from the vote journal with their (key_hash, vote_hash,
+        expires_at) idempotency keys and commits, together with any pending
+        token burns. Rows that are already stored are skipped, so replaying
+        the journal after a crash is harmless.
+        """
+        if self.db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        if votes:
+            self.db.execute(dialect_insert(Vote).on_conflict_do_nothing(index_elements=["vote_hash"]), votes)
+        if idempotency_keys:
+            vote_ids = dict(self.db.execute(
+                select(Vote.vote_hash, Vote.id).where(Vote.vote_hash.in_([vote_hash for _, vote_hash, _ in idempotency_keys]))
+            ).all())
+            self.db.execute(
+                dialect_insert(IdempotencyKey).on_conflict_do_nothing(index_elements=["key_hash"]),
+                [{"key_hash": key_hash, "vote_id": vote_ids[vote_hash], "expires_at": expires_at} for key_hash, vote_hash, expires_at in idempotency_keys],
+            )
+        self.db.commit()
+
+    def get_receipt_by_idempotency_key(self, key_hash: bytes, now: Any) -> Optional[Any]:
+        return self.db.query(Vote.vote_hash, Vote.created_at).join(
+            IdempotencyKey, IdempotencyKey.vote_id == Vote.id
+        ).filter(
+            IdempotencyKey.key_hash == key_hash,
+            IdempotencyKey.expires_at > now
+        ).first()
+
+    def delete_expired_idempotency_keys(self, now: Any, limit: int) -> int:
+        chunk = select(IdempotencyKey.key_hash).where(IdempotencyKey.expires_at <= now).limit(limit)
+        result = self.db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key_hash.in_(chunk)).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
+
     def get_last_vote(self, election_id: int) -> Optional[Vote]:
         return self.db.query(Vote).filter(
             Vote.election_id == election_id
@@ -60,3 +224,13 @@ class SqlAlchemyVoteRepository(IVoteRepository):
             .all()
         )
         return [{"id": r.id, "name": r.name, "vote_count": r.vote_count} for r in results]
+
+    def get_vote_timeline(self, election_id: int) -> List[Any]:
+        """(seconds since the epoch, candidate_id) of every ballot, in one scan and without building datetimes."""
+        if self.db.get_bind().dialect.name == "sqlite":
+            # Stored as naive UTC text; julianday keeps the fractional seconds.
+            epoch = (func.julianday(Vote.created_at) - 2440587.5) * 86400.0
+        else:
+            epoch = func.extract("epoch", Vote.created_at)
+        # A Core result skips the ORM's per-row processing, which dominates for a million rows.
+        return self.db.connection().execute(select(epoch, Vote.candidate_id).where(Vote.election_id == election_id)).all()
@@ -0,0 +1,43 @@
+import base64
+import hashlib
+import hmac
+from functools import lru_cache
+from typing import Optional
+from src.core.config import get_settings
+
+# Derived voting tokens (VOTING_TOKEN_MODE=derived): "v1.<user id>.<mac>", where
+# mac = HMAC-SHA256(key, "v1:<election id>:<user id>") truncated to 128 bits.
+# Issuing one writes nothing and checking one reads nothing; the only stored
+# state is the voter's used ballot-state row, written when the ballot is cast.
+VERSION = "v1"
+MAC_BYTES = 16
+
+
+@lru_cache(maxsize=4)
+def _key(secret: str) -> bytes:
+    # Separate key from the JWT signing key even when both come from SECRET_KEY.
+    return hashlib.sha256(b"voting-token:" + secret.encode()).digest()
+
+
+def _mac(user_id: int, election_id: int) -> str:
+    settings = get_settings()
+    key = _key(settings.VOTING_TOKEN_SECRET or settings.SECRET_KEY)
+    digest = hmac.new(key, f"{VERSION}:{election_id}:{user_id}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:MAC_BYTES]).rstrip(b"=").decode()
+
+
+def derive_voting_token(user_id: int, election_id: int) -> str:
+    return f"{VERSION}.{user_id}.{_mac(user_id, election_id)}"
+
+
+def verify_voting_token(token: str, election_id: int) -> Optional[int]:
+    """Returns the user id the token was issued to for `election_id`, or None if it is not valid."""
+    version, _, rest = token.partition(".")
+    user_part, _, mac = rest.partition(".")
+    # isdigit() alone accepts characters such as "²" that int() rejects.
+    if version != VERSION or not (user_part.isascii() and user_part.isdigit()):
+        return None
+    user_id = int(user_part)
+    if not hmac.compare_digest(mac.encode(), _mac(user_id, election_id).encode()):
+        return None
+    return user_id
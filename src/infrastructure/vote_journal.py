@@ -0,0 +1,356 @@
+"""
+Write-ahead vote journal (VOTE_JOURNAL_PATH).
+
+Validated ballots are appended to a local append-only file and acknowledged
+once it is fsynced. Concurrent ballots share one fsync: while one fsync runs
+the next ones queue, and the following fsync covers all of them. The hash
+chain is extended in memory in journal order. A background applier drains
+the journal into `votes` in large batches, burning the voters' tokens in
+the same transaction, and records how far it got in `<path>.offset`. After a
+crash everything past that offset is applied again; applying is idempotent
+because vote hashes are unique.
+
+Until a ballot is applied it lives in the journal's pending overlay, which
+result reads add to the database counts, so tallies stay exact. The journal
+is the single intake for ballots: it holds an exclusive lock on the file, so
+run the API with one worker in this mode.
+"""
+import json
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; nothing stops a second process.
+    fcntl = None
+
+from src.core import metrics
+from src.core.voted_bitmap import voted_bitmaps
+from src.domain.vote_chain import GENESIS_HASH, compute_vote_hash
+from src.infrastructure.repositories.vote_repository import SqlAlchemyVoteRepository, SqlAlchemyVotingTokenRepository
+
+logger = logging.getLogger(__name__)
+
+
+class JournalRecord(dict):
+    """One ballot: election_id, user_id, candidate_id, vote_hash, prev_vote_hash, created_at, key_hash, key_expires_at."""
+
+
+class VoteJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self.offset_path = path + ".offset"
+        self._lock = threading.Lock()        # order of the journal: chain heads, pending state, writes
+        self._sync_lock = threading.Lock()   # one fsync at a time; waiters are covered by the next one
+        self._read_lock = threading.RLock()  # result reads vs. the applier's commit + overlay update
+        self._file = None
+        self._written = 0   # bytes handed to the file
+        self._synced = 0    # bytes known to be on disk
+        self._applied = 0   # bytes applied to the database
+        self._heads: Dict[int, str] = {}
+        self._pending_counts: Dict[int, Counter] = defaultdict(Counter)
+        self._pending_voters: Dict[int, Set[int]] = defaultdict(set)
+        self._pending_ballots: Dict[int, Dict[str, Tuple[float, int]]] = defaultdict(dict)  # vote_hash -> (epoch, candidate)
+        self._pending_receipts: Dict[bytes, Tuple[str, datetime]] = {}
+        # Deleted election -> journal size when it was deleted; its ballots before that point are not applied.
+        self._dropped: Dict[int, int] = {}
+        self._applier: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- lifecycle ---
+
+    def open(self) -> None:
+        """Takes the journal lock and loads the ballots that were not applied yet."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "ab+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._file.close()
+                raise RuntimeError(f"Vote journal {self.path} is held by another process; journal intake needs a single worker.")
+        self._applied = self._read_offset()
+        self._file.seek(0)
+        data = self._file.read()
+        # A torn last line (crash mid-write) was never acknowledged: drop it.
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            self._file.truncate(end)
+        self._written = self._synced = end
+        self._applied = min(self._applied, end)
+        for record in self._parse(data[self._applied:end]):
+            self._track(record)
+            self._heads[record["election_id"]] = record["vote_hash"]
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self) -> None:
+        self.stop_applier()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # --- intake ---
+
+    def has_pending_voter(self, election_id: int, user_id: int) -> bool:
+        with self._lock:
+            return user_id in self._pending_voters.get(election_id, ())
+
+    def submit(
+        self,
+        election_id: int,
+        user_id: int,
+        candidate_id: int,
+        load_head: Callable[[], Optional[str]],
+        key_hash: Optional[bytes] = None,
+        key_ttl: Optional[float] = None,
+        durable: bool = True,
+        has_voted: Optional[Callable[[], bool]] = None,
+    ) -> JournalRecord:
+        """
+        Appends a ballot and returns its record. Raises ValueError if the voter
+        already has a ballot in the journal, one was applied from it, or
+        `has_voted` (the database's answer) says so. With durable=False the caller must
+        call sync() before acknowledging (batch intake shares one fsync).
+        """
+        with self._lock:
+            # The applier marks a voter in the bitmap before taking them out of the pending set, both
+            # under this lock, so a ballot applied since the caller's database read is still caught.
+            if user_id in self._pending_voters.get(election_id, ()) or user_id in voted_bitmaps().get(election_id):
+                raise ValueError("Double Vote: This token has already been used.")
+            # Asked under the lock, so every ballot the journal accepts will be claimed when it is
+            # applied. A ballot left out then would break the chain: later ballots link to its hash.
+            if has_voted is not None and has_voted():
+                raise ValueError("Double Vote: This token has already been used.")
+            prev_hash = self._heads.get(election_id)
+            if prev_hash is None:
+                prev_hash = load_head() or GENESIS_HASH
+            created_at = datetime.now(timezone.utc)
+            record = JournalRecord(
+                election_id=election_id,
+                user_id=user_id,
+                candidate_id=candidate_id,
+                vote_hash=compute_vote_hash(prev_hash, user_id, candidate_id, created_at.isoformat()),
+                prev_vote_hash=prev_hash,
+                created_at=created_at.isoformat(),
+                key_hash=key_hash.hex() if key_hash else None,
+                key_expires_at=(created_at + timedelta(seconds=key_ttl)).isoformat() if key_hash else None,
+            )
+            line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+            self._file.write(line)
+            self._written += len(line)
+            self._heads[election_id] = record["vote_hash"]
+            self._track(record)
+        if durable:
+            self.sync()
+        return record
+
+    def forget(self, election_id: int) -> None:
+        """The election was deleted: drop its chain head and pending ballots (its id may be reused)."""
+        with self._lock:
+            self._heads.pop(election_id, None)
+            self._pending_counts.pop(election_id, None)
+            self._pending_voters.pop(election_id, None)
+            self._pending_ballots.pop(election_id, None)
+            if self._written > self._applied:
+                # Only ballots written so far: a later election that reuses the id is applied as usual.
+                self._dropped[election_id] = self._written
+
+    def sync(self) -> None:
+        """Returns once everything submitted so far is on disk."""
+        with self._lock:
+            target = self._written
+        with self._sync_lock:
+            if self._synced >= target:
+                return  # an fsync that started after our write already covered it
+            with self._lock:
+                target = self._written
+                self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced = target
+
+    # --- reads ---
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(sum(counts.values()) for counts in self._pending_counts.values())
+
+    def pending_counts(self, election_id: int) -> Dict[int, int]:
+        with self._lock:
+            return dict(self._pending_counts.get(election_id, {}))
+
+    def pending_ballots(self, election_id: int) -> List[Tuple[float, int]]:
+        """(seconds since the epoch, candidate_id) of the election's ballots that are not applied yet."""
+        with self._lock:
+            return list(self._pending_ballots.get(election_id, {}).values())
+
+    def pending_receipt(self, key_hash: bytes) -> Optional[Tuple[str, datetime]]:
+        with self._lock:
+            return self._pending_receipts.get(key_hash)
+
+    def consistent_read(self):
+        """Hold while reading the database and the overlay, so no batch is counted twice or not at all."""
+        return self._read_lock
+
+    # --- apply ---
+
+    def apply(self, session_factory, limit: int = 5000) -> int:
+        """Applies up to `limit` durable ballots in one transaction; returns how many."""
+        with self._lock:
+            start, end = self._applied, self._synced
+        if start >= end:
+            self._compact()
+            return 0
+        with open(self.path, "rb") as reader:
+            reader.seek(start)
+            data = reader.read(end - start)
+        records, consumed = [], 0
+        with self._lock:
+            dropped = dict(self._dropped)
+        live, discarded = [], []
+        for line in data.splitlines(keepends=True):
+            if len(records) >= limit:
+                break
+            record = json.loads(line)
+            position = start + consumed
+            records.append(record)
+            consumed += len(line)
+            (discarded if position < dropped.get(record["election_id"], -1) else live).append(record)
+        by_election: Dict[int, List[dict]] = defaultdict(list)
+        for record in live:
+            by_election[record["election_id"]].append(record)
+        with self._read_lock:
+            with session_factory() as db:
+                token_repo, vote_repo = SqlAlchemyVotingTokenRepository(db), SqlAlchemyVoteRepository(db)
+                claimed = set()
+                for election_id, batch in by_election.items():
+                    # Burns stored tokens and creates the ballot-state rows of first-time voters.
+                    expires = max(datetime.fromisoformat(r["created_at"]) for r in batch) + timedelta(days=1)
+                    claimed.update((election_id, user_id) for user_id in token_repo.claim_ballots(election_id, [r["user_id"] for r in batch], expires))
+                # A voter whose vote the database already records is not counted again. submit() checks the
+                # database under the journal lock, so these are ballots replayed after a crash, stored already.
+                stored = [r for r in live if (r["election_id"], r["user_id"]) in claimed]
+                if len(stored) < len(live):
+                    logger.warning("Vote journal: %d ballot(s) of voters the database already records were not applied.", len(live) - len(stored))
+                vote_repo.apply_journaled(
+                    [{"vote_hash": r["vote_hash"], "prev_vote_hash": r["prev_vote_hash"], "election_id": r["election_id"],
+                      "candidate_id": r["candidate_id"], "created_at": datetime.fromisoformat(r["created_at"])} for r in stored],
+                    [(bytes.fromhex(r["key_hash"]), r["vote_hash"], datetime.fromisoformat(r["key_expires_at"])) for r in stored if r["key_hash"]],
+                )
+            with self._lock:
+                for record in live:
+                    # Marked before leaving the pending set, so submit() never sees the voter in neither.
+                    voted_bitmaps().get(record["election_id"]).add(record["user_id"])
+                    self._untrack(record)
+                for record in discarded:
+                    if record["key_hash"]:
+                        self._pending_receipts.pop(bytes.fromhex(record["key_hash"]), None)
+                self._applied = start + consumed
+                for election_id, offset in list(self._dropped.items()):
+                    if offset <= self._applied:
+                        del self._dropped[election_id]
+                self._write_offset(self._applied)
+        return len(records)
+
+    def drain(self, session_factory, limit: int = 5000) -> int:
+        total = 0
+        while True:
+            applied = self.apply(session_factory, limit)
+            if not applied:
+                return total
+            total += applied
+
+    def start_applier(self, session_factory, interval: float, limit: int) -> None:
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    if self.apply(session_factory, limit) < limit:
+                        self._stop.wait(interval)
+                except Exception:
+                    # Nothing is lost: the ballots stay in the journal and are retried.
+                    logger.exception("Applying the vote journal failed; retrying.")
+                    self._stop.wait(interval)
+
+        self._applier = threading.Thread(target=run, name="vote-journal-applier", daemon=True)
+        self._applier.start()
+
+    def stop_applier(self) -> None:
+        if self._applier is not None:
+            self._stop.set()
+            self._applier.join()
+            self._applier = None
+
+    # --- internals ---
+
+    def _track(self, record: dict) -> None:
+        self._pending_counts[record["election_id"]][record["candidate_id"]] += 1
+        self._pending_voters[record["election_id"]].add(record["user_id"])
+        self._pending_ballots[record["election_id"]][record["vote_hash"]] = (datetime.fromisoformat(record["created_at"]).timestamp(), record["candidate_id"])
+        if record["key_hash"]:
+            self._pending_receipts[bytes.fromhex(record["key_hash"])] = (record["vote_hash"], datetime.fromisoformat(record["created_at"]))
+
+    def _untrack(self, record: dict) -> None:
+        counts = self._pending_counts[record["election_id"]]
+        counts[record["candidate_id"]] -= 1
+        if counts[record["candidate_id"]] <= 0:
+            del counts[record["candidate_id"]]
+        self._pending_voters[record["election_id"]].discard(record["user_id"])
+        self._pending_ballots[record["election_id"]].pop(record["vote_hash"], None)
+        if record["key_hash"]:
+            self._pending_receipts.pop(bytes.fromhex(record["key_hash"]), None)
+
+    def _compact(self) -> None:
+        # Everything written has been applied: start the file over instead of letting it grow.
+        with self._lock:
+            if self._applied == self._written and self._written > 0:
+                self._file.truncate(0)
+                self._file.seek(0)
+                os.fsync(self._file.fileno())
+                self._written = self._synced = self._applied = 0
+                self._dropped.clear()
+                self._write_offset(0)
+
+    @staticmethod
+    def _parse(data: bytes) -> List[dict]:
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_offset(self, offset: int) -> None:
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.offset_path)
+
+
+_journal: Optional[VoteJournal] = None
+
+def vote_journal() -> Optional[VoteJournal]:
+    """The open journal when journal intake is on (set up in the lifespan), else None."""
+    return _journal
+
+def open_journal(path: str) -> VoteJournal:
+    global _journal
+    journal = VoteJournal(path)
+    journal.open()
+    _journal = journal
+    metrics.vote_journal_pending_ballots.set_function(journal.pending)
+    return journal
+
+def close_journal() -> None:
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from src.application import schemas
+from src.core.profiler import ProfilerBusy, profile
+from src.presentation.routing import TracedRoute
+from src.presentation.dependencies import verify_admin_user
+
+router = APIRouter(route_class=TracedRoute)
+
+@router.get("/api/admin/profile", response_class=PlainTextResponse)
+def profile_process(
+    seconds: float = Query(10, gt=0, le=60),
+    interval_ms: float = Query(5, ge=1, le=100),
+    include_idle: bool = False,
+    current_user: schemas.User = Depends(verify_admin_user)
+):
+    # Sync endpoint: the sampler sleeps in a threadpool thread, not on the event loop.
+    try:
+        sampler = profile(seconds, interval_ms / 1000, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    filename = f"profile-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.folded"
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(sampler.samples),
+        },
+    )
@@ -3,9 +3,10 @@ from fastapi import APIRouter, Depends, HTTPException, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from src.application import schemas
 from src.application.services.auth_service import AuthService
+from src.presentation.routing import TracedRoute
 from src.presentation.dependencies import get_auth_service, get_current_user, verify_admin_user
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 @router.post("/users/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, auth_service: AuthService = Depends(get_auth_service)):
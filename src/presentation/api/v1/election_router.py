@@ -3,10 +3,10 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from src.application import schemas
 from src.application.services.election_service import ElectionService
+from src.presentation.routing import TracedRoute
 from src.presentation.dependencies import get_election_service, get_current_user, verify_admin_user, verify_election_manager
 from src.core.scheduler import scheduler
-from src.application.jobs import start_election_job, end_election_job
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 @router.post("/api/elections", status_code=status.HTTP_201_CREATED)
 def create_election(
@@ -28,45 +28,44 @@ def create_election(
         description=election_request.description,
         start_time=start_time,
         end_time=election_request.end_time,
-        candidates=candidate_objects
+        candidates=candidate_objects,
+        eligibility=election_request.eligibility,
+        eligible_role=election_request.eligible_role,
+        roster=election_request.roster
     )
 
     # 1. Seçimi veritabanına kaydet (Varsayılan status: 'pending')
     created_election = election_service.create_election(election_data=internal_election, user_id=current_user.id)
     
-    # 2. BAŞLANGIÇ MANTIĞI (Scheduling vs Immediate)
+    # 2. BAŞLANGIÇ MANTIĞI: status is derived from start_time/end_time on read,
+    # so the election opens and closes on time without any job. The heap entries
+    # only refresh the cached status column and fire the transition hooks.
     if start_time <= now:
-        # Tarih geldiyse veya geçmişse hemen başlat
-        election_service.start_election(created_election.id)
         message = "Election created and started immediately."
     else:
-        # Tarih gelecekteyse job ekle
-        scheduler.add_job(
-            start_election_job, 
-            'date', 
-            run_date=start_time, 
-            args=[created_election.id]
-        )
         message = f"Election created and scheduled to start at {start_time}."
 
     # 3. BİTİŞ MANTIĞI (Scheduling)
-    if internal_election.end_time:
-        # Bitiş tarihi geçmişte olamaz, kontrol eklenebilir ama şimdilik job ekliyoruz.
-        scheduler.add_job(
-            end_election_job, 
-            'date', 
-            run_date=internal_election.end_time, 
-            args=[created_election.id]
-        )
+    scheduler.schedule_election(created_election.id, start_time, internal_election.end_time)
 
     return {
         "success": True, 
         "message": message, 
         "election_id": created_election.id
     }
-    
-    
-    return {"success": True, "message": "Election created and tokens distributed to all users.", "election_id": created_election.id}
+
+@router.post("/api/elections/{election_id}/roster")
+def add_to_roster(
+    election_id: int,
+    roster: schemas.RosterUpdate,
+    election_service: ElectionService = Depends(get_election_service),
+    election = Depends(verify_election_manager)
+):
+    try:
+        election_service.add_to_roster(election_id, roster.user_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "message": f"{len(roster.user_ids)} voter(s) added to the roster."}
 
 @router.get("/api/elections", response_model=List[schemas.Election])
 def read_elections(skip: int = 0, limit: int = 100, election_service: ElectionService = Depends(get_election_service)):
@@ -86,7 +85,22 @@ def update_election(
     election_service: ElectionService = Depends(get_election_service),
     current_user: schemas.User = Depends(verify_admin_user),
 ):
-    db_election = election_service.election_repo.update(election_id, election.model_dump(exclude_unset=True))
+    update_data = election.model_dump(exclude_unset=True)
+    db_election = election_service.election_repo.update(election_id, update_data)
+    if db_election is None:
+        raise HTTPException(status_code=404, detail="Election not found")
+    # Rescheduled elections get fresh heap entries; the stale ones are ignored by the jobs.
+    scheduler.schedule_election(db_election.id, update_data.get("start_time"), update_data.get("end_time"))
+    return db_election
+
+@router.put("/api/elections/{election_id}/status", response_model=schemas.Election)
+def override_election_status(
+    election_id: int,
+    status_override: schemas.ElectionStatusOverride,
+    election_service: ElectionService = Depends(get_election_service),
+    current_user: schemas.User = Depends(verify_admin_user),
+):
+    db_election = election_service.set_status_override(election_id, status_override.status)
     if db_election is None:
         raise HTTPException(status_code=404, detail="Election not found")
     return db_election
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from src.application import schemas
+from src.core import metrics
 from src.application.services.voting_service import VotingService
+from src.presentation.routing import TracedRoute
 from src.presentation.dependencies import get_voting_service, get_current_user
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 @router.post("/elections/{election_id}/token")
 def generate_voting_token(
@@ -14,7 +17,10 @@ def generate_voting_token(
     # We might want to verify election exists here, but service checks token repo.
     # The requirement: "Verify election exists" was in main.py
     # Ideally service handles this.
-    token = voting_service.generate_token(user_id=current_user.id, election_id=election_id)
+    try:
+        token = voting_service.generate_token(user_id=current_user.id, election_id=election_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not token:
         # If token is None, it means it already exists (logic in service)
@@ -23,23 +29,47 @@ def generate_voting_token(
     return {"voting_token": token, "message": "Save this token! You need it to vote."}
 
 @router.post("/api/votes", status_code=status.HTTP_200_OK)
-def cast_vote(vote: schemas.VoteCastRequest, voting_service: VotingService = Depends(get_voting_service)):
+def cast_vote(
+    vote: schemas.VoteCastRequest,
+    response: Response,
+    voting_service: VotingService = Depends(get_voting_service),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
     # Check election status (active)
     
     try:
-        db_vote = voting_service.cast_vote(vote)
+        db_vote = voting_service.cast_vote(vote, idempotency_key=idempotency_key)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    
+
+    if isinstance(db_vote, schemas.VoteReceipt):
+        # Retry of a ballot that was already accepted: same receipt, nothing counted twice.
+        response.headers["Idempotent-Replayed"] = "true"
+    else:
+        metrics.votes_cast_total.inc(str(vote.election_id))
     return {
         "success": True,
         "message": "Vote successfully cast.",
         "vote_hash": db_vote.vote_hash
     }
 
+@router.post("/api/votes/batch", response_model=schemas.VoteBatchResponse)
+def cast_votes_batch(batch: schemas.VoteBatchRequest, voting_service: VotingService = Depends(get_voting_service)):
+    # Per-ballot outcome: a rejected ballot does not fail the rest of the batch.
+    results = voting_service.cast_votes(batch.ballots)
+
+    accepted = 0
+    for ballot, result in zip(batch.ballots, results):
+        if result.success:
+            accepted += 1
+            metrics.votes_cast_total.inc(str(ballot.election_id))
+    return schemas.VoteBatchResponse(accepted=accepted, rejected=len(results) - accepted, results=results)
+
 # Helper to avoid circular deps or messy signature
 from src.application.services.election_service import ElectionService
 from src.presentation.dependencies import get_election_service
+from src.application.services.analytics_service import AnalyticsService
+from src.presentation.dependencies import get_analytics_service
 
 @router.get("/api/elections/{election_id}/results", response_model=schemas.ElectionResult)
 def get_election_results(
@@ -63,3 +93,19 @@ def get_election_results(
         status=db_election.status,
         results=[schemas.CandidateResult(id=r['id'], name=r['name'], vote_count=r['vote_count']) for r in results]
     )
+
+@router.get("/api/elections/{election_id}/timeline", response_model=schemas.ElectionTimeline)
+def get_election_timeline(
+    election_id: int,
+    bucket_seconds: int = Query(3600, ge=60, le=7 * 86400),
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    # Turnout and votes per candidate per bucket (hourly by default), with cumulative curves.
+    try:
+        timeline = analytics_service.get_timeline(election_id, bucket_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not timeline:
+        raise HTTPException(status_code=404, detail="Election not found")
+    return timeline
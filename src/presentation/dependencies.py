@@ -4,7 +4,8 @@ from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from typing import Annotated
 
-from src.core.config import settings
+from src.core.config import get_settings
+from src.core.tracing import traced
 from src.application import schemas
 from src.infrastructure.database.session import get_db
 from src.infrastructure.repositories.user_repository import SqlAlchemyUserRepository
@@ -14,6 +15,7 @@ from src.infrastructure.database.models import User
 from src.application.services.auth_service import AuthService
 from src.application.services.election_service import ElectionService
 from src.application.services.voting_service import VotingService
+from src.application.services.analytics_service import AnalyticsService
 from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository, SqlAlchemyCandidateRepository
 from src.infrastructure.repositories.vote_repository import SqlAlchemyVoteRepository, SqlAlchemyVotingTokenRepository
 
@@ -57,8 +59,15 @@ def get_voting_service(
 ):
     return VotingService(vote_repo, token_repo, election_repo)
 
+def get_analytics_service(
+    vote_repo = Depends(get_vote_repository),
+    election_repo = Depends(get_election_repository)
+):
+    return AnalyticsService(vote_repo, election_repo)
+
 
 # Auth Dependencies
+@traced("get_current_user")
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,6 +75,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
+        settings = get_settings()
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
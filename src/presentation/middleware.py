@@ -0,0 +1,308 @@
+import logging
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import anyio
+from anyio import to_thread
+from jose import JWTError, jwt
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.core import metrics
+from src.core.bulkhead import DEFAULT_GROUP, Bulkhead, BulkheadFull
+from src.core.config import get_settings
+from src.core.rate_limit import Limit, RateLimiter, retry_after
+from src.core.tracing import activate, tracer
+from src.infrastructure.database.instrumentation import QueryStats, current_query_stats
+
+logger = logging.getLogger(__name__)
+
+
+def route_template(scope: Scope) -> str:
+    """Route path template (e.g. /api/elections/{election_id}) so labels stay low-cardinality."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Records per-route request counts, latency histograms and in-flight
+    requests. Written as a plain ASGI middleware (no BaseHTTPMiddleware) so it
+    adds only a couple of dict lookups per request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.http_requests_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.http_requests_in_flight.dec(method)
+            # The router stores the matched route in the shared scope dict.
+            route = route_template(scope)
+            metrics.http_request_duration_seconds.observe(time.perf_counter() - started, method, route)
+            metrics.http_requests_total.inc(method, route, str(status_code))
+
+
+class QueryAccountingMiddleware:
+    """
+    Counts the SQL statements and DB time of every request (see
+    `track_queries`). Always exported as metrics; also returned as
+    X-DB-Query-Count / X-DB-Time-Ms response headers when `expose_headers`
+    is on. A statement repeated `n_plus_one_threshold` times or more within
+    one request is logged as a suspected N+1 pattern.
+    """
+
+    def __init__(self, app: ASGIApp, expose_headers: bool = False, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.expose_headers = expose_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if self.expose_headers and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            method = scope["method"]
+            route = route_template(scope)
+            metrics.db_queries_per_request.observe(stats.count, method, route)
+            metrics.db_time_per_request_seconds.observe(stats.seconds, method, route)
+            repeated = stats.repeated(self.n_plus_one_threshold)
+            if repeated:
+                metrics.db_repeated_statements_total.inc(route)
+                for statement, executions in repeated:
+                    logger.warning(f"N+1 suspected on {method} {route}: statement ran {executions}x: {' '.join(statement.split())[:200]}")
+
+
+class TracingMiddleware:
+    """
+    Opens the root span of each request, continuing the caller's trace when a
+    W3C `traceparent` header is present. The span is named after the route
+    template once routing has happened, and its traceparent is echoed back so
+    a client can find its request in the trace store.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        method = scope["method"]
+        root = tracer.start_trace(f"{method} {scope['path']}", traceparent, {"http.method": method, "http.target": scope["path"]})
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.error = f"HTTP {message['status']}"
+                MutableHeaders(scope=message)["traceparent"] = root.traceparent
+            await send(message)
+
+        with activate(root):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                root.name = f"{method} {route}"
+                root.set_attribute("http.route", route)
+
+
+class RateLimitRule(NamedTuple):
+    name: str
+    method: str
+    path: "re.Pattern[str]"
+    limit: Limit
+    # Key by the user of a valid bearer token when there is one; by client IP otherwise.
+    per_user: bool
+    # Limit for a per_user rule's requests without a valid bearer token, keyed by IP
+    # (shared by everyone behind that address); None applies `limit` to them too.
+    anonymous_limit: Optional[Limit] = None
+
+
+def default_rate_limit_rules(settings) -> List[RateLimitRule]:
+    auth = Limit.parse(settings.RATE_LIMIT_AUTH)
+    vote = Limit.parse(settings.RATE_LIMIT_VOTE)
+    return [
+        # bcrypt on every call: limited per IP, before a username is known.
+        RateLimitRule("auth", "POST", re.compile(r"^/(token|api/auth/login|api/auth/register|users/)$"), auth, per_user=False),
+        # Ballots carry their voter in the body (unverified here), so without a bearer token the
+        # key is the IP, with a budget for a polling station's worth of voters behind one NAT.
+        RateLimitRule("vote", "POST", re.compile(r"^/api/votes(/batch)?$"), vote, per_user=True,
+                      anonymous_limit=Limit.parse(settings.RATE_LIMIT_VOTE_ANONYMOUS)),
+        RateLimitRule("voting_token", "POST", re.compile(r"^/elections/\d+/token$"), vote, per_user=True),
+    ]
+
+
+class RateLimitMiddleware:
+    """
+    Token-bucket admission control, applied before routing, so a request
+    over its limit is answered with 429 and Retry-After without opening a
+    DB session, resolving dependencies or hashing a password. Each rule has
+    a bucket per user (or IP) and every limited request also draws from
+    `global_limit`, which caps the total load those routes can put on the
+    database. A store that can block (the shared SQLite file) is called
+    from a worker thread of its own, so a contended file never stalls the
+    event loop or waits behind endpoint threads.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter, rules: List[RateLimitRule], global_limit: Optional[Limit] = None):
+        self.app = app
+        self.limiter = limiter
+        self.rules = rules
+        self.global_limit = global_limit
+        # The store serializes its calls anyway; one thread keeps the others free for endpoints.
+        self._store_threads = anyio.CapacityLimiter(1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            rule = self._match(scope)
+            if rule is not None:
+                identity = self._identity(scope, rule)
+                limit = rule.anonymous_limit if rule.anonymous_limit and identity.startswith("ip:") else rule.limit
+                key = f"{rule.name}:{identity}"
+                if getattr(self.limiter.store, "blocking", False):
+                    wait = await to_thread.run_sync(self._admit, key, limit, limiter=self._store_threads)
+                else:
+                    wait = self._admit(key, limit)
+                if wait:
+                    metrics.rate_limited_requests_total.inc(rule.name)
+                    await self._reject(send, wait)
+                    return
+        await self.app(scope, receive, send)
+
+    def _admit(self, key: str, limit: Limit) -> float:
+        wait = self.limiter.hit(key, limit)
+        if not wait and self.global_limit is not None:
+            wait = self.limiter.hit("global", self.global_limit)
+        return wait
+
+    def _match(self, scope: Scope) -> Optional[RateLimitRule]:
+        method, path = scope["method"], scope["path"]
+        for rule in self.rules:
+            if rule.method == method and rule.path.match(path):
+                return rule
+        return None
+
+    @staticmethod
+    def _identity(scope: Scope, rule: RateLimitRule) -> str:
+        if rule.per_user:
+            for key, value in scope["headers"]:
+                if key == b"authorization":
+                    scheme, _, token = value.decode("latin-1").partition(" ")
+                    if scheme.lower() == "bearer" and token:
+                        # Verified, so a client cannot spread its requests over made-up users.
+                        settings = get_settings()
+                        try:
+                            sub = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+                        except JWTError:
+                            sub = None
+                        if sub:
+                            return f"user:{sub}"
+                    break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    @staticmethod
+    async def _reject(send: Send, wait: float) -> None:
+        body = b'{"detail":"Too many requests. Retry later."}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after(wait).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# (group, method or None for any, path pattern); the first match wins, the rest is "default".
+BULKHEAD_GROUPS: List[Tuple[str, Optional[str], "re.Pattern[str]"]] = [
+    ("voting", "POST", re.compile(r"^/api/votes(/batch)?$")),
+    ("voting", "POST", re.compile(r"^/elections/\d+/token$")),
+    ("admin", None, re.compile(r"^/api/(admin|users)(/|$)")),
+    ("reads", "GET", re.compile(r"^/(api/)?elections(/|$)")),
+    ("admin", None, re.compile(r"^/(api/)?elections(/|$)")),
+]
+
+
+def bulkhead_group(method: str, path: str) -> str:
+    for group, group_method, pattern in BULKHEAD_GROUPS:
+        if (group_method is None or group_method == method) and pattern.match(path):
+            return group
+    return DEFAULT_GROUP
+
+
+class BulkheadMiddleware:
+    """
+    Runs each request inside its route group's Bulkhead (voting, reads,
+    admin, default), so dashboards and admin queries can saturate their own
+    slots, threads and DB pool but never the ones ballots use. A request that
+    cannot get a slot within the group's queue timeout gets 503.
+    """
+
+    def __init__(self, app: ASGIApp, bulkheads: Dict[str, Bulkhead]):
+        self.app = app
+        self.bulkheads = bulkheads
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        bulkhead = self.bulkheads.get(bulkhead_group(scope["method"], scope["path"])) if scope["type"] == "http" else None
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            async with bulkhead.slot():
+                await self.app(scope, receive, send)
+        except BulkheadFull:
+            body = b'{"detail":"Server busy. Retry later."}'
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
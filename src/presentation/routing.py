@@ -0,0 +1,22 @@
+from typing import Callable
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from src.core.tracing import span
+
+
+class TracedRoute(APIRoute):
+    """
+    Route class that wraps request handling (dependency resolution such as
+    JWT decoding, the endpoint itself and response serialization) in a span.
+    Use it as `APIRouter(route_class=TracedRoute)`.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        name = f"route {self.name}"
+
+        async def traced_handler(request: Request) -> Response:
+            with span(name, **{"http.route": self.path}):
+                return await handler(request)
+
+        return traced_handler
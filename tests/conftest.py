@@ -4,6 +4,10 @@ import os
 
 # Add the parent directory (Backend) to sys.path so we can import 'main' and 'src'
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Tests use their own in-memory database; skip demo seeding on every client start.
+os.environ.setdefault("SEED_DATABASE", "false")
+# Many logins and ballots from one client in quick succession; test_rate_limit covers the limiter.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
 
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -11,7 +15,7 @@ from sqlalchemy.orm import sessionmaker, Session
 import main
 from src.infrastructure.database.models import Base
 from src.infrastructure.database.session import get_db
-from apscheduler.schedulers.background import BackgroundScheduler
+from src.core.voted_bitmap import voted_bitmaps
 
 @pytest.fixture(scope="session")
 def db_engine():
@@ -43,6 +47,8 @@ def db_session(db_engine):
     db.close()
     trans.rollback()
     connection.close()
+    # Election and user ids are reused after the rollback; forget who voted.
+    voted_bitmaps().reset()
 
 @pytest.fixture(scope="function")
 def client(db_session):
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+import main
+from src.core import config
+
+
+def test_importing_main_has_no_side_effects():
+    # No DATABASE_URL / SECRET_KEY: importing must not read settings or create the engine.
+    env = {k: v for k, v in os.environ.items() if k not in ("DATABASE_URL", "SECRET_KEY")}
+    code = "import main, src.infrastructure.database.session as s; assert s._engine is None; print('ok')"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "ok"
+
+
+def test_create_app_uses_explicit_settings():
+    previous = config.get_settings()
+    try:
+        app = main.create_app(previous.model_copy(update={"METRICS_ENABLED": False}))
+        assert config.get_settings().METRICS_ENABLED is False
+        client = TestClient(app)
+        assert client.get("/").status_code == 200
+        assert client.get("/metrics").status_code == 404
+    finally:
+        config.configure(previous)
@@ -0,0 +1,80 @@
+import anyio
+import pytest
+
+from src.core.bulkhead import Bulkhead, BulkheadFull, bulkheads_from_settings, current_group
+from src.core.config import get_settings
+from src.infrastructure.database.session import all_engines, new_session
+from src.presentation.middleware import BulkheadMiddleware, bulkhead_group
+
+
+def test_routes_are_grouped():
+    assert bulkhead_group("POST", "/api/votes") == "voting"
+    assert bulkhead_group("POST", "/api/votes/batch") == "voting"
+    assert bulkhead_group("POST", "/elections/3/token") == "voting"
+    assert bulkhead_group("GET", "/api/elections/3/results") == "reads"
+    assert bulkhead_group("GET", "/api/users") == "admin"
+    assert bulkhead_group("DELETE", "/api/elections/3") == "admin"
+    assert bulkhead_group("POST", "/token") == "default"
+
+
+def test_full_group_sheds_after_queue_timeout_without_touching_others():
+    voting, reads = Bulkhead("voting", 1, 0.05), Bulkhead("reads", 1, 0.05)
+    app_calls = []
+
+    async def app(scope, receive, send):
+        app_calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = BulkheadMiddleware(app, {"voting": voting, "reads": reads})
+
+    async def request(path, method="GET"):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "method": method, "path": path}, None, send)
+        return sent[0]["status"], dict(sent[0]["headers"])
+
+    async def main():
+        async with reads.slot():
+            assert current_group.get() == "reads"
+            status, headers = await request("/api/elections")
+            assert (status, headers[b"retry-after"]) == (503, b"1")
+            # The voting group is unaffected by the saturated reads group.
+            assert (await request("/api/votes", "POST"))[0] == 200
+        assert (await request("/api/elections"))[0] == 200
+        with pytest.raises(BulkheadFull):
+            async with voting.slot():
+                async with voting.slot():
+                    pass
+
+    anyio.run(main)
+    assert app_calls == ["/api/votes", "/api/elections"]
+
+
+def test_sessions_use_the_group_pool():
+    engines = all_engines()
+    if "voting" not in engines:
+        pytest.skip("in-memory database: groups share one engine")
+    token = current_group.set("voting")
+    try:
+        db = new_session()
+        assert db.get_bind() is engines["voting"]
+        db.close()
+    finally:
+        current_group.reset(token)
+    db = new_session()
+    assert db.get_bind() is engines["default"]
+    db.close()
+
+
+def test_group_pools_hold_every_admitted_request():
+    engines = all_engines()
+    if "voting" not in engines:
+        pytest.skip("in-memory database: groups share one engine")
+    settings = get_settings()
+    for name, bulkhead in bulkheads_from_settings(settings).items():
+        pool = engines.get(name, engines["default"]).pool
+        assert pool.size() + max(pool._max_overflow, 0) >= bulkhead.limit, name
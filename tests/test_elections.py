@@ -91,4 +91,42 @@ def test_election_status_change(client, auth_header, db_session):
     # Check for "completed" status
     response = client.get(f"/api/elections/{election_id}")
     assert response.status_code == 200
-    assert response.json()["status"] == "completed"
\ No newline at end of file
+    assert response.json()["status"] == "completed"
+
+
+def test_status_is_derived_from_election_window(client, auth_header, db_session):
+    """An election whose window has passed reads as completed without any job running."""
+    now = datetime.now(timezone.utc)
+    repo = SqlAlchemyElectionRepository(db_session)
+    creator = db_session.query(database.User).filter(database.User.username == "admin").first()
+    election = repo.create(database.Election(
+        title="Already Over",
+        start_time=now - timedelta(hours=2),
+        end_time=now - timedelta(hours=1),
+        created_by=creator.id,
+    ))
+    assert election.stored_status == "pending"
+
+    response = client.get(f"/api/elections/{election.id}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+def test_admin_status_override(client, auth_header, db_session):
+    # The default auth_header user is a voter; promote it to admin for the override endpoint.
+    db_session.query(database.User).filter(database.User.username == "admin").update({"role": "admin"})
+    db_session.commit()
+    start_time = datetime.now(timezone.utc) + timedelta(days=1)
+    response = client.post("/api/elections", json={
+        "title": "Override Me",
+        "start_time": start_time.isoformat(),
+        "candidate_names": ["A"],
+    }, headers=auth_header)
+    election_id = response.json()["election_id"]
+
+    response = client.put(f"/api/elections/{election_id}/status", json={"status": "active"}, headers=auth_header)
+    assert response.status_code == 200
+    assert response.json()["status"] == "active"
+
+    # Clearing the override hands control back to the clock.
+    response = client.put(f"/api/elections/{election_id}/status", json={"status": None}, headers=auth_header)
+    assert response.json()["status"] == "pending"
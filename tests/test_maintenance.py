@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+
+from src.infrastructure.database import models as database
+from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository
+from src.infrastructure.repositories.vote_repository import SqlAlchemyVotingTokenRepository
+
+
+def test_sweep_deletes_only_tokens_of_completed_elections_in_chunks(db_session):
+    now = datetime.now(timezone.utc)
+    election_repo = SqlAlchemyElectionRepository(db_session)
+    token_repo = SqlAlchemyVotingTokenRepository(db_session)
+    finished = election_repo.create(database.Election(title="Finished", start_time=now - timedelta(days=2), end_time=now - timedelta(days=1)))
+    closed_early = election_repo.create(database.Election(title="Closed", start_time=now - timedelta(days=1)))
+    election_repo.end_election(closed_early.id)
+    running = election_repo.create(database.Election(title="Running", start_time=now - timedelta(days=1), end_time=now + timedelta(days=1)))
+
+    for election in (finished, closed_early, running):
+        for user_id in range(1, 6):
+            token_repo.create_token(f"{election.id}-{user_id}", user_id, election.id, now + timedelta(days=1))
+    voted = db_session.query(database.VotingToken).filter_by(election_id=finished.id, user_id=1).one()
+    voted.is_used = True
+    db_session.commit()
+
+    # Bounded chunks: 9 reclaimable rows take three deletes of at most 4 rows.
+    assert token_repo.delete_completed_election_tokens(now, 4) == 4
+    assert token_repo.delete_completed_election_tokens(now, 4) == 4
+    assert token_repo.delete_completed_election_tokens(now, 4) == 1
+    assert token_repo.delete_completed_election_tokens(now, 4) == 0
+
+    remaining = db_session.query(database.VotingToken.election_id).distinct().order_by(database.VotingToken.election_id).all()
+    assert [row.election_id for row in remaining] == [finished.id, running.id]
+
+    # Reopening the election: the voter's used token still blocks a second ballot.
+    finished.end_time = now + timedelta(days=1)
+    db_session.commit()
+    assert token_repo.claim_ballots(finished.id, [1, 2], now + timedelta(days=1)) == [2]
@@ -0,0 +1,84 @@
+import threading
+
+from src.core.metrics import REGISTRY, Counter, Histogram, Registry
+
+
+def test_sharded_counter_merges_threads():
+    counter = Counter("test_sharded_total", "Test counter.", ("route",), registry=Registry())
+
+    def work():
+        for _ in range(1000):
+            counter.inc("/a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counter.inc("/b", amount=2)
+
+    assert list(counter.samples()) == ['test_sharded_total{route="/a"} 4000', 'test_sharded_total{route="/b"} 2']
+    # Kept out of the registry that /metrics exports.
+    assert REGISTRY.get("test_sharded_total") is None
+
+
+def test_exited_threads_are_folded_into_one_shard():
+    counter = Counter("test_retired_total", "Test counter.", registry=Registry())
+    for _ in range(200):
+        thread = threading.Thread(target=counter.inc)
+        thread.start()
+        thread.join()
+    counter.inc()
+
+    assert len(counter._shards) == 1
+    assert list(counter.samples()) == ["test_retired_total 201"]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "Test histogram.", buckets=(0.1, 1.0), registry=Registry())
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert list(histogram.samples()) == [
+        'test_latency_seconds_bucket{le="0.1"} 2',
+        'test_latency_seconds_bucket{le="1"} 3',
+        'test_latency_seconds_bucket{le="+Inf"} 4',
+        "test_latency_seconds_sum 3.65",
+        "test_latency_seconds_count 4",
+    ]
+
+
+def test_metrics_endpoint_reports_route_templates(client, auth_header):
+    client.get("/api/elections/12345")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'evoting_http_requests_total{method="GET",route="/api/elections/{election_id}",status="404"}' in body
+    assert "evoting_http_request_duration_seconds_bucket" in body
+    assert "evoting_scheduler_pending_entries" in body
+
+
+def test_query_accounting_headers_and_n_plus_one_warning(db_engine, caplog):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+    from src.infrastructure.database.instrumentation import track_queries
+    from src.presentation.middleware import QueryAccountingMiddleware
+
+    track_queries()
+    app = FastAPI()
+    app.add_middleware(QueryAccountingMiddleware, expose_headers=True, n_plus_one_threshold=3)
+
+    @app.get("/loop")
+    def loop():
+        with db_engine.connect() as conn:
+            for i in range(4):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {}
+
+    with caplog.at_level("WARNING"):
+        response = TestClient(app).get("/loop")
+    assert response.headers["X-DB-Query-Count"] == "4"
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+    assert "N+1 suspected on GET /loop: statement ran 4x" in caplog.text
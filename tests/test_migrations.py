@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from src.infrastructure.database.migrations import upgrade_schema
+from src.infrastructure.database.models import Base, Election
+from src.infrastructure.repositories.vote_repository import SqlAlchemyVotingTokenRepository
+
+
+def test_upgrade_from_an_older_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # The tables as the first release created them.
+        conn.execute(text("CREATE TABLE elections (id INTEGER PRIMARY KEY, title VARCHAR, description TEXT, start_time DATETIME, end_time DATETIME, status VARCHAR, created_by INTEGER)"))
+        conn.execute(text("CREATE TABLE voting_tokens (id INTEGER PRIMARY KEY, token_hash VARCHAR UNIQUE, is_used BOOLEAN, expires_at DATETIME, election_id INTEGER, user_id INTEGER)"))
+        conn.execute(text("INSERT INTO elections (id, title, status) VALUES (1, 'Closed', 'completed'), (2, 'Waiting', 'pending')"))
+        conn.execute(text("INSERT INTO voting_tokens (id, token_hash, is_used, election_id, user_id) VALUES (1, 'a', 0, 1, 7), (2, 'b', 1, 1, 7), (3, 'c', 0, 1, 8)"))
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    upgrade_schema(engine)  # idempotent
+
+    assert {"status_override", "eligibility", "eligible_role"} <= {c["name"] for c in inspect(engine).get_columns("elections")}
+    with Session(engine) as db:
+        elections = {e.id: e for e in db.query(Election)}
+        assert elections[1].status == "completed" and elections[2].status == "pending"
+        assert elections[2].eligibility == "all"
+        # The duplicate that recorded the vote is kept.
+        assert db.execute(text("SELECT id FROM voting_tokens ORDER BY id")).scalars().all() == [2, 3]
+        claimed = SqlAlchemyVotingTokenRepository(db).claim_ballots(1, [7, 8, 9], datetime.now(timezone.utc) + timedelta(days=1))
+        assert sorted(claimed) == [8, 9]
@@ -0,0 +1,47 @@
+import threading
+
+from src.core import profiler
+from src.infrastructure.database import models as database
+
+
+def busy_loop_for_profiler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collapses_stacks_of_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop_for_profiler, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        sampler = profiler.profile(0.2, interval=0.002)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert sampler.samples > 10
+    lines = sampler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy-worker;") and "busy_loop_for_profiler" in line]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_profile_endpoint_is_admin_only_and_exclusive(client, auth_header, db_session):
+    response = client.get("/api/admin/profile?seconds=0.1", headers=auth_header)
+    assert response.status_code == 403
+
+    db_session.query(database.User).filter(database.User.username == "admin").update({"role": "admin"})
+    db_session.flush()
+    response = client.get("/api/admin/profile?seconds=0.2&interval_ms=2", headers=auth_header)
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.folded"')
+    assert int(response.headers["x-profile-samples"]) > 0
+
+    # A second profile while one is running is refused.
+    profiler._profile_lock.acquire()
+    try:
+        response = client.get("/api/admin/profile?seconds=0.1", headers=auth_header)
+    finally:
+        profiler._profile_lock.release()
+    assert response.status_code == 409
@@ -0,0 +1,106 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.rate_limit import Limit, MemoryBucketStore, RateLimiter, SqliteBucketStore
+from src.infrastructure.security.utils import create_access_token
+from src.presentation.middleware import RateLimitMiddleware, default_rate_limit_rules
+from src.core.config import get_settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_bursts_then_refills(tmp_path):
+    for store in (MemoryBucketStore(), SqliteBucketStore(str(tmp_path / "buckets.db"))):
+        clock = FakeClock()
+        limiter = RateLimiter(store, clock)
+        limit = Limit.parse("3/6")
+        assert [limiter.hit("k", limit) for _ in range(3)] == [0, 0, 0]
+        assert limiter.hit("k", limit) == 2.0
+        assert limiter.hit("other", limit) == 0
+        clock.now += 2
+        assert limiter.hit("k", limit) == 0
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    clock = FakeClock()
+    first, second = RateLimiter(SqliteBucketStore(path), clock), RateLimiter(SqliteBucketStore(path), clock)
+    limit = Limit.parse("2/60")
+    assert first.hit("k", limit) == 0 and second.hit("k", limit) == 0
+    assert first.hit("k", limit) > 0
+
+
+def test_sqlite_store_forgets_refilled_buckets(tmp_path):
+    store = SqliteBucketStore(str(tmp_path / "buckets.db"), prune_interval=0)
+    clock = FakeClock()
+    limiter = RateLimiter(store, clock)
+    limiter.hit("idle", Limit.parse("2/60"))
+    limiter.hit("busy", Limit.parse("2/600"))
+    # "idle" is full again after 30s; "busy" needs 300s, so it stays.
+    clock.now += 31
+    limiter.hit("new", Limit.parse("2/60"))
+    keys = [row[0] for row in store._conn.execute("SELECT key FROM buckets ORDER BY key")]
+    assert keys == ["busy", "new"]
+
+
+def test_middleware_calls_a_blocking_store_off_the_event_loop(tmp_path):
+    store = SqliteBucketStore(str(tmp_path / "buckets.db"))
+    take, threads = store.take, []
+
+    def spy(*args):
+        threads.append(threading.current_thread())
+        return take(*args)
+
+    store.take = spy
+    app = FastAPI()
+
+    @app.post("/token")
+    async def login():
+        return {"loop": threading.current_thread().name}
+
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(store), rules=default_rate_limit_rules(get_settings()))
+    loop_thread = TestClient(app).post("/token").json()["loop"]
+    assert threads and all(thread.name != loop_thread for thread in threads)
+
+
+def test_middleware_sheds_before_the_endpoint_runs():
+    settings = get_settings().model_copy(update={"RATE_LIMIT_AUTH": "2/60", "RATE_LIMIT_VOTE": "1/60", "RATE_LIMIT_VOTE_ANONYMOUS": "3/60"})
+    calls = []
+    app = FastAPI()
+
+    @app.post("/token")
+    def login():
+        calls.append("token")
+        return {}
+
+    @app.post("/api/votes")
+    def vote():
+        calls.append("vote")
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(), rules=default_rate_limit_rules(settings), global_limit=Limit.parse("100/1"))
+    client = TestClient(app)
+
+    assert [client.post("/token").status_code for _ in range(3)] == [200, 200, 429]
+    response = client.post("/token")
+    assert response.status_code == 429 and int(response.headers["retry-after"]) >= 1
+    assert calls == ["token", "token"]
+
+    # Voting routes are keyed by the authenticated user, so two users behind one IP do not share a bucket.
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': 'bob'})}"}
+    assert client.post("/api/votes", headers=alice).status_code == 200
+    assert client.post("/api/votes", headers=alice).status_code == 429
+    assert client.post("/api/votes", headers=bob).status_code == 200
+    # Without a valid token (a forged one included) ballots share the IP's larger anonymous bucket.
+    forged = {"Authorization": "Bearer not.a.jwt"}
+    assert [client.post("/api/votes", headers=forged).status_code for _ in range(3)] == [200, 200, 200]
+    assert client.post("/api/votes").status_code == 429
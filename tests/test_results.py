@@ -16,6 +16,7 @@ from src.infrastructure.repositories.election_repository import SqlAlchemyElecti
 from src.infrastructure.repositories.vote_repository import SqlAlchemyVotingTokenRepository, SqlAlchemyVoteRepository
 from src.application.services.election_service import ElectionService
 from src.application.services.voting_service import VotingService
+from src.core.voted_bitmap import voted_bitmaps
 
 # --- Test Database Setup ---
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_results.db"
@@ -42,6 +43,7 @@ def db_session():
     # Clean up the database before tests
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    voted_bitmaps().reset()
     
     db = TestingSessionLocal()
     
@@ -169,4 +171,24 @@ def test_get_results_requires_auth():
     Tests that the endpoint is protected and requires authentication.
     """
     response = client.get("/api/elections/1/results")
-    assert response.status_code == 401 # Unauthorized
\ No newline at end of file
+    assert response.status_code == 401 # Unauthorized
+
+def test_get_election_timeline(completed_election_with_votes, auth_headers):
+    """
+    Tests the binned turnout and per-candidate curves, and that a completed election's timeline is cached.
+    """
+    from src.application.services.analytics_service import timeline_cache
+    election_id = completed_election_with_votes.id
+
+    response = client.get(f"/api/elections/{election_id}/timeline?bucket_seconds=60", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_votes"] == 3
+    assert sum(data["turnout"]) == 3 and data["cumulative_turnout"][-1] == 3
+    assert len(data["turnout"]) == len(data["candidates"][0]["votes"])
+    assert {c["name"]: c["cumulative"][-1] for c in data["candidates"]} == {"Candidate A": 2, "Candidate B": 1}
+
+    cached = len(timeline_cache())
+    assert client.get(f"/api/elections/{election_id}/timeline?bucket_seconds=60", headers=auth_headers).json() == data
+    assert len(timeline_cache()) == cached >= 1
+    assert client.get("/api/elections/999/timeline", headers=auth_headers).status_code == 404
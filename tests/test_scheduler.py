@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from src.core.scheduler import LifecycleEngine
+from src.infrastructure.database import models as database
+from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository
+
+
+def test_engine_runs_due_entries_in_time_order():
+    engine = LifecycleEngine()
+    fired = []
+    done = threading.Event()
+
+    def handler(payloads):
+        fired.extend(payloads)
+        if len(fired) == 3:
+            done.set()
+
+    engine.register("transition", handler)
+    now = datetime.now(timezone.utc)
+    # Loader simulates the startup rebuild; the past entry must run immediately.
+    engine.start(loader=lambda: [(now + timedelta(milliseconds=200), "transition", 3), (now - timedelta(days=1), "transition", 1)])
+    engine.schedule(now + timedelta(milliseconds=50), "transition", 2)
+    try:
+        assert done.wait(timeout=5)
+    finally:
+        engine.shutdown()
+    assert fired == [1, 2, 3]
+    assert len(engine) == 0
+
+
+def test_engine_keeps_far_future_entries_without_waking():
+    engine = LifecycleEngine()
+    engine.register("transition", lambda payloads: None)
+    engine.start()
+    far = datetime.now(timezone.utc) + timedelta(days=365)
+    for election_id in range(1000):
+        engine.schedule(far, "transition", election_id)
+    engine.shutdown()
+    assert len(engine) == 1000
+
+
+def test_get_scheduled_transitions(db_session):
+    repo = SqlAlchemyElectionRepository(db_session)
+    now = datetime.now(timezone.utc)
+    scheduled = repo.create(database.Election(title="Scheduled", start_time=now + timedelta(hours=1), end_time=now + timedelta(hours=2)))
+    repo.create(database.Election(title="Unscheduled"))
+    finished = repo.create(database.Election(title="Finished", start_time=now - timedelta(hours=2), end_time=now - timedelta(hours=1)))
+    repo.end_election(finished.id)
+
+    rows = repo.get_scheduled_transitions()
+    assert [row.id for row in rows] == [scheduled.id]
+
+
+def test_transition_due_elections_is_set_based(db_session):
+    repo = SqlAlchemyElectionRepository(db_session)
+    now = datetime.now(timezone.utc)
+    due_start = [repo.create(database.Election(title=f"Open {i}", start_time=now - timedelta(minutes=1), end_time=now + timedelta(hours=1))).id for i in range(3)]
+    due_end = repo.create(database.Election(title="Close", start_time=now - timedelta(hours=2), end_time=now - timedelta(minutes=1)))
+    # Cached as active by an earlier tick; its window has since closed.
+    repo.update(due_end.id, {"stored_status": "active"})
+    missed = repo.create(database.Election(title="Missed", start_time=now - timedelta(hours=2), end_time=now - timedelta(hours=1)))
+    future = repo.create(database.Election(title="Future", start_time=now + timedelta(hours=1)))
+
+    changed = repo.transition_due_elections(now)
+    assert sorted(changed["active"]) == due_start
+    assert sorted(changed["completed"]) == [due_end.id, missed.id]
+    assert repo.get_by_id(future.id).stored_status == "pending"
+    # A second tick finds nothing left to do.
+    assert repo.transition_due_elections(now) == {"active": [], "completed": []}
+
+
+def test_leader_lock_fails_over_to_waiting_follower(tmp_path):
+    from src.core.leader import LeaderLock
+
+    path = str(tmp_path / "scheduler.lock")
+    leader = LeaderLock(path)
+    follower = LeaderLock(path)
+    elected = threading.Event()
+
+    assert leader.campaign(lambda: None) is True
+    assert follower.campaign(elected.set) is False
+    assert not elected.wait(timeout=0.2)
+
+    # Leader exits: the follower's blocked flock returns and it takes over.
+    leader.release()
+    assert elected.wait(timeout=5)
+    assert follower.is_leader
+    follower.release()
+
+
+def test_periodic_task_survives_resync():
+    engine = LifecycleEngine()
+    runs = []
+    ran_twice = threading.Event()
+
+    def sweep(payloads):
+        runs.append(payloads)
+        if len(runs) == 2:
+            ran_twice.set()
+
+    engine.register("token_sweep", sweep)
+    engine.add_periodic("token_sweep", 0.05)
+    # Resyncs every 20ms would keep pushing the task back if it did not keep its own clock.
+    engine.start(loader=lambda: [], resync_interval=0.02)
+    try:
+        assert ran_twice.wait(timeout=5)
+    finally:
+        engine.shutdown()
+    assert runs[0] == []
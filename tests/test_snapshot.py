@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.infrastructure.database.models import Base, User, Election, VotingToken
+from src.infrastructure.database.seeder import seed_database
+from src.infrastructure.database.snapshot import capture, is_empty, restore_if_empty
+
+
+def test_capture_and_restore_seeded_database(tmp_path):
+    source = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    Base.metadata.create_all(bind=source)
+    with Session(bind=source) as db:
+        seed_database(db)
+    snapshot = str(tmp_path / "seeded.db.gz")
+    assert capture(source, snapshot) > 0
+
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    assert is_empty(target)
+    assert restore_if_empty(target, snapshot)
+    with Session(bind=target) as db:
+        assert db.query(User).count() == 52
+        assert db.query(Election).count() == 13
+        # Ballot state is created lazily, on first token request or vote.
+        assert db.query(VotingToken).count() == 0
+
+    # A database that already has data is left alone.
+    assert not restore_if_empty(target, snapshot)
+    source.dispose()
+    target.dispose()
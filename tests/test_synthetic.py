@@ -0,0 +1,50 @@
+import random
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, select
+
+from src.domain.vote_chain import GENESIS_HASH
+from src.infrastructure.database.models import Candidate, Election, Vote, VotingToken
+from src.infrastructure.database.synthetic import CandidateDistribution, generate
+
+ANCHOR = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _generate(path, seed):
+    engine = create_engine(f"sqlite:///{path}")
+    counts = generate(engine, users=40, elections=6, candidates=CandidateDistribution("2-4"), turnout=0.5, seed=seed, anchor=ANCHOR)
+    return engine, counts
+
+
+def test_generated_votes_are_chained_and_deterministic(tmp_path):
+    engine, counts = _generate(tmp_path / "a.db", seed=3)
+    with engine.connect() as conn:
+        votes = conn.execute(select(Vote.election_id, Vote.vote_hash, Vote.prev_vote_hash).order_by(Vote.id)).all()
+        elections = conn.execute(select(Election.id, Election.stored_status)).all()
+        candidate_counts = [n for (n,) in conn.execute(select(Candidate.election_id).order_by(Candidate.election_id)).all()]
+        used_tokens = conn.execute(select(VotingToken.id).where(VotingToken.is_used)).all()
+
+    assert counts["votes"] == len(votes) == len(used_tokens)
+    assert counts["users"] == 41 and counts["elections"] == 6
+    assert all(2 <= candidate_counts.count(e) <= 4 for e, _ in elections)
+
+    heads = {}
+    for election_id, vote_hash, prev_hash in votes:
+        assert prev_hash == heads.get(election_id, GENESIS_HASH)
+        heads[election_id] = vote_hash
+    # Only elections that have opened received ballots, each from half the users.
+    for election_id, status in elections:
+        expected = 0 if status == "pending" else 20
+        assert sum(1 for e, _, _ in votes if e == election_id) == expected
+
+    engine_b, _ = _generate(tmp_path / "b.db", seed=3)
+    with engine_b.connect() as conn:
+        assert [row.vote_hash for row in conn.execute(select(Vote.vote_hash).order_by(Vote.id))] == [v[1] for v in votes]
+
+
+def test_weighted_candidate_distribution():
+    distribution = CandidateDistribution("2:0.9,7:0.1")
+    rng = random.Random(1)
+    samples = [distribution.sample(rng) for _ in range(1000)]
+    assert set(samples) == {2, 7}
+    assert samples.count(2) > samples.count(7)
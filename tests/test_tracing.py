@@ -0,0 +1,74 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.tracing import SimpleSpanProcessor, parse_traceparent, tracer
+from src.infrastructure.database.instrumentation import trace_queries
+from src.infrastructure.database.session import get_db
+from src.presentation.api.v1 import auth_router
+from src.presentation.middleware import TracingMiddleware
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def traced_client(db_session):
+    exporter = ListExporter()
+    tracer.configure(SimpleSpanProcessor(exporter), sample_ratio=0.0)
+    trace_queries()
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+    app.include_router(auth_router.router)
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield TestClient(app), exporter
+    tracer.shutdown()
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    assert parse_traceparent("00-" + "0" * 32 + f"-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None
+
+
+def test_incoming_trace_spans_router_service_repository_and_sql(traced_client):
+    client, exporter = traced_client
+    response = client.post("/users/", json={"username": "traced", "password": "secret"}, headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert response.status_code == 200
+    assert response.headers["traceparent"].startswith(f"00-{TRACE_ID}-")
+
+    spans = {span.span_id: span for span in exporter.spans}
+    assert {span.trace_id for span in spans.values()} == {TRACE_ID}
+    root = next(span for span in spans.values() if span.parent_id == PARENT_ID)
+    assert root.name == "POST /users/"
+    assert root.attributes["http.status_code"] == 200
+
+    def ancestors(span):
+        names = []
+        while span.parent_id in spans:
+            span = spans[span.parent_id]
+            names.append(span.name)
+        return names
+
+    statement = next(span for span in spans.values() if span.name == "db.statement" and "INSERT INTO users" in span.attributes["db.statement"])
+    assert ancestors(statement)[-3:] == ["AuthService.register_user", "route create_user", "POST /users/"]
+    assert "SqlAlchemyUserRepository.create" in ancestors(statement)
+    assert any(span.name == "db.commit" for span in spans.values())
+
+
+def test_unsampled_requests_record_nothing(traced_client):
+    client, exporter = traced_client
+    client.post("/users/", json={"username": "quiet", "password": "secret"})
+    response = client.post("/users/", json={"username": "quiet2", "password": "secret"}, headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+    assert "traceparent" not in response.headers
+    assert exporter.spans == []
@@ -0,0 +1,117 @@
+from contextlib import nullcontext
+
+import pytest
+from sqlalchemy import update
+
+from src.application import schemas
+from src.application.services.analytics_service import AnalyticsService
+from src.infrastructure.database import models as database
+from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository
+from src.infrastructure.repositories.vote_repository import SqlAlchemyVoteRepository
+from src.infrastructure.vote_journal import VoteJournal, close_journal, open_journal
+from tests.test_votes import _active_election, _voting_service
+
+
+@pytest.fixture
+def journal(tmp_path):
+    yield open_journal(str(tmp_path / "votes.journal"))
+    close_journal()
+
+
+def _ballot(election, candidate, user):
+    return schemas.VoteCastRequest(election_id=election.id, candidate_id=election.candidates[candidate].id, user_id=user.id)
+
+
+def test_journaled_ballots_are_counted_before_and_after_apply(db_session, journal):
+    election, users = _active_election(db_session, 3)
+    service = _voting_service(db_session)
+    first = service.cast_vote(_ballot(election, 0, users[0]), idempotency_key="k1")
+    service.cast_vote(_ballot(election, 1, users[1]))
+    with pytest.raises(ValueError, match="Double Vote"):
+        service.cast_vote(_ballot(election, 1, users[1]))
+    assert service.cast_vote(_ballot(election, 0, users[0]), idempotency_key="k1").vote_hash == first.vote_hash
+
+    # Acknowledged but not applied: only the overlay knows about them.
+    assert db_session.query(database.Vote).count() == 0
+    assert {r["name"]: r["vote_count"] for r in service.get_results(election.id)} == {"A": 1, "B": 1}
+    timeline = AnalyticsService(SqlAlchemyVoteRepository(db_session), SqlAlchemyElectionRepository(db_session)).get_timeline(election.id)
+    assert timeline.total_votes == 2 and [c.cumulative[-1] for c in timeline.candidates] == [1, 1]
+
+    assert journal.drain(lambda: nullcontext(db_session)) == 2
+    votes = db_session.query(database.Vote).order_by(database.Vote.id).all()
+    assert votes[1].prev_vote_hash == votes[0].vote_hash == first.vote_hash
+    assert {r["name"]: r["vote_count"] for r in service.get_results(election.id)} == {"A": 1, "B": 1}
+    tokens = db_session.query(database.VotingToken).filter(database.VotingToken.election_id == election.id)
+    assert sorted((t.user_id, t.is_used) for t in tokens) == [(users[0].id, True), (users[1].id, True)]
+    # The chain continues from the applied head, and a second ballot is caught by the database now.
+    assert service.cast_vote(_ballot(election, 1, users[2])).prev_vote_hash == votes[1].vote_hash
+    assert service.cast_votes([_ballot(election, 0, users[0])])[0].error.startswith("Double Vote")
+
+
+def test_journal_is_replayed_after_a_crash(db_session, tmp_path):
+    election, users = _active_election(db_session, 2)
+    path = str(tmp_path / "votes.journal")
+    crashed = VoteJournal(path)
+    crashed.open()
+    for user in users:
+        crashed.submit(election.id, user.id, election.candidates[0].id, load_head=lambda: None)
+    with pytest.raises(RuntimeError, match="single worker"):
+        VoteJournal(path).open()
+    crashed._file.write(b'{"election_id": 1, "us')  # torn write, never acknowledged
+    crashed._file.close()
+
+    recovered = VoteJournal(path)
+    recovered.open()
+    assert recovered.pending_counts(election.id) == {election.candidates[0].id: 2}
+    recovered.apply(lambda: nullcontext(db_session), limit=1)
+    recovered.close()
+
+    # The offset was lost after the first batch was committed: applying it again is harmless.
+    with open(tmp_path / "votes.journal.offset", "w") as f:
+        f.write("0")
+    again = VoteJournal(path)
+    again.open()
+    assert again.drain(lambda: nullcontext(db_session)) == 2
+    again.close()
+    assert db_session.query(database.Vote).filter(database.Vote.election_id == election.id).count() == 2
+
+
+def test_deleted_election_id_can_be_reused(db_session, journal):
+    election, users = _active_election(db_session, 2)
+    a, b = (candidate.id for candidate in election.candidates)
+    journal.submit(election.id, users[0].id, a, load_head=lambda: None)
+    journal.forget(election.id)
+    # A new election with the same id: only the ballot from before the delete is dropped.
+    journal.submit(election.id, users[1].id, b, load_head=lambda: None)
+    journal.drain(lambda: nullcontext(db_session))
+    votes = db_session.query(database.Vote).filter(database.Vote.election_id == election.id).all()
+    assert [vote.candidate_id for vote in votes] == [b]
+    assert journal.pending_counts(election.id) == {}
+
+
+def test_applied_voter_cannot_vote_again(db_session, journal):
+    election, users = _active_election(db_session, 2)
+    candidate_id = election.candidates[0].id
+    journal.submit(election.id, users[0].id, candidate_id, load_head=lambda: None)
+    journal.drain(lambda: nullcontext(db_session))
+    # Applied after the caller's database read: the journal still refuses the second ballot.
+    with pytest.raises(ValueError, match="Double Vote"):
+        journal.submit(election.id, users[0].id, candidate_id, load_head=lambda: None)
+
+
+def test_voter_recorded_by_the_database_is_refused_at_intake(db_session, journal):
+    election, users = _active_election(db_session, 3)
+    service = _voting_service(db_session)
+    service.cast_vote(_ballot(election, 0, users[0]))
+    # The session holds the voter's unused token while the database records their vote.
+    token = service.token_repo.create_token("t1", users[1].id, election.id, election.end_time)
+    db_session.execute(update(database.VotingToken).where(database.VotingToken.id == token.id).values(is_used=True).execution_options(synchronize_session=False))
+    assert token.is_used is False
+    with pytest.raises(ValueError, match="Double Vote"):
+        service.cast_vote(_ballot(election, 0, users[1]))
+    service.cast_vote(_ballot(election, 1, users[2]))
+
+    # Every accepted ballot is applied, so the stored chain has no gap.
+    journal.drain(lambda: nullcontext(db_session))
+    votes = db_session.query(database.Vote).filter(database.Vote.election_id == election.id).order_by(database.Vote.id).all()
+    assert len(votes) == 2 and votes[1].prev_vote_hash == votes[0].vote_hash
@@ -0,0 +1,50 @@
+import pytest
+
+from src.core.voted_bitmap import VotedBitmap, VotedBitmaps
+
+
+def test_bits_grow_and_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "election-1.bits")
+    writer, reader = VotedBitmap(path), VotedBitmap(path)
+    assert 7 not in writer
+    writer.add(7)
+    writer.add(1_000_003)
+    assert 7 in writer and 1_000_003 in writer and 1_000_002 not in writer
+    # A second mapping (another worker) sees the bits and remaps after growth.
+    assert 7 in reader and 1_000_003 in reader
+    writer.close()
+    reader.close()
+    assert 1_000_003 in VotedBitmap(path)
+
+
+def test_reset_and_drop_forget_voters(tmp_path):
+    bitmaps = VotedBitmaps(str(tmp_path))
+    bitmaps.get(1).add(5)
+    bitmaps.get(2).add(5)
+    other_worker = VotedBitmaps(str(tmp_path))
+    assert 5 in other_worker.get(1)
+
+    bitmaps.drop(1)
+    assert 5 not in bitmaps.get(1)
+    # The other worker notices its file was replaced.
+    assert 5 not in other_worker.get(1)
+
+    bitmaps.reset()
+    assert 5 not in bitmaps.get(2)
+    assert 5 not in VotedBitmaps().get(2)
+
+
+def test_growth_past_another_workers_mapping_and_negative_ids(tmp_path):
+    path = str(tmp_path / "election-1.bits")
+    a, b = VotedBitmap(path), VotedBitmap(path)
+    a.add(7)
+    # b remaps to a's single page, which is still too small, and must grow the file itself.
+    b.add(1_000_003)
+    assert 1_000_003 in a and 7 in b
+    # a grows from its stale one-page mapping without truncating what b added.
+    a.add(2_000_000)
+    assert 1_000_003 in VotedBitmap(path)
+
+    assert -1 not in VotedBitmap() and -1 not in a
+    with pytest.raises(ValueError):
+        a.add(-1)
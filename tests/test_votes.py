@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.application import schemas
+from src.application.services.election_service import ElectionService
+from src.application.services.voting_service import VotingService
+from src.domain.vote_chain import GENESIS_HASH
+from src.infrastructure.database import models as database
+from src.infrastructure.database.instrumentation import QueryStats, current_query_stats, track_queries
+from src.infrastructure.repositories.election_repository import SqlAlchemyElectionRepository, SqlAlchemyCandidateRepository
+from src.infrastructure.repositories.user_repository import SqlAlchemyUserRepository
+from src.infrastructure.repositories.vote_repository import SqlAlchemyVoteRepository, SqlAlchemyVotingTokenRepository
+
+
+def _active_election(db_session, voters, **eligibility):
+    users = [SqlAlchemyUserRepository(db_session).create(database.User(username=f"kiosk_voter_{i}", password_hash="x", role="voter")) for i in range(voters)]
+    now = datetime.now(timezone.utc)
+    election = _election_service(db_session).create_election(schemas.ElectionCreate(
+        title="Kiosk Election", description="", start_time=now - timedelta(minutes=1), end_time=now + timedelta(days=1),
+        candidates=[schemas.CandidateCreate(name="A"), schemas.CandidateCreate(name="B")], **eligibility,
+    ), user_id=users[0].id)
+    return election, users
+
+
+def _election_service(db_session):
+    return ElectionService(
+        SqlAlchemyElectionRepository(db_session), SqlAlchemyCandidateRepository(db_session),
+        SqlAlchemyVotingTokenRepository(db_session), SqlAlchemyUserRepository(db_session),
+    )
+
+
+def _voting_service(db_session):
+    return VotingService(SqlAlchemyVoteRepository(db_session), SqlAlchemyVotingTokenRepository(db_session), SqlAlchemyElectionRepository(db_session))
+
+
+def test_ballot_state_is_created_on_first_use(db_session):
+    election, users = _active_election(db_session, 3)
+    tokens = db_session.query(database.VotingToken).filter(database.VotingToken.election_id == election.id)
+    assert tokens.count() == 0
+
+    service = _voting_service(db_session)
+    assert service.generate_token(users[0].id, election.id)
+    assert service.generate_token(users[0].id, election.id) is None
+    service.cast_vote(schemas.VoteCastRequest(election_id=election.id, candidate_id=election.candidates[0].id, user_id=users[1].id))
+    assert sorted((t.user_id, t.is_used) for t in tokens) == [(users[0].id, False), (users[1].id, True)]
+
+    with pytest.raises(ValueError, match="Double Vote"):
+        service.cast_vote(schemas.VoteCastRequest(election_id=election.id, candidate_id=election.candidates[0].id, user_id=users[1].id))
+
+
+def test_role_and_roster_eligibility(db_session):
+    election, users = _active_election(db_session, 3, eligibility="role", eligible_role="auditor")
+    service = _voting_service(db_session)
+    with pytest.raises(ValueError, match="not eligible"):
+        service.generate_token(users[1].id, election.id)
+    SqlAlchemyUserRepository(db_session).update_role(users[1].id, "auditor")
+    assert service.generate_token(users[1].id, election.id)
+
+    roster = _election_service(db_session).create_election(schemas.ElectionCreate(
+        title="Board", start_time=election.start_time, end_time=election.end_time,
+        candidates=[schemas.CandidateCreate(name="Yes")], eligibility="roster", roster=[users[2].id],
+    ), user_id=users[0].id)
+    candidate_id = roster.candidates[0].id
+    results = service.cast_votes([
+        schemas.VoteCastRequest(election_id=roster.id, candidate_id=candidate_id, user_id=users[2].id),
+        schemas.VoteCastRequest(election_id=roster.id, candidate_id=candidate_id, user_id=users[0].id),
+        schemas.VoteCastRequest(election_id=roster.id, candidate_id=candidate_id, user_id=users[2].id),
+    ])
+    assert [r.success for r in results] == [True, False, False]
+    assert results[1].error == "You are not eligible to vote in this election."
+    assert results[2].error.startswith("Double Vote")
+
+
+def test_batch_returns_per_ballot_receipts_and_errors(client, db_session):
+    election, users = _active_election(db_session, 4)
+    a, b = (c.id for c in election.candidates)
+    ballots = [
+        {"election_id": election.id, "candidate_id": a, "user_id": users[0].id},
+        {"election_id": election.id, "candidate_id": b, "user_id": users[1].id},
+        {"election_id": election.id, "candidate_id": a, "user_id": users[0].id},  # second ballot, same voter
+        {"election_id": election.id, "candidate_id": 99999, "user_id": users[2].id},
+        {"election_id": 424242, "candidate_id": a, "user_id": users[3].id},
+        {"election_id": election.id, "candidate_id": b, "user_id": users[3].id},
+    ]
+    response = client.post("/api/votes/batch", json={"ballots": ballots})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["accepted"], body["rejected"]) == (3, 3)
+    results = body["results"]
+    assert [r["success"] for r in results] == [True, True, False, False, False, True]
+    assert results[2]["error"].startswith("Double Vote")
+    assert results[3]["error"] == "Candidate does not belong to this election."
+    assert results[4]["error"] == "Election not found."
+
+    # Accepted ballots extend the election's chain in submission order.
+    votes = db_session.query(database.Vote).filter(database.Vote.election_id == election.id).order_by(database.Vote.id).all()
+    assert [v.vote_hash for v in votes] == [results[0]["vote_hash"], results[1]["vote_hash"], results[5]["vote_hash"]]
+    assert votes[0].prev_vote_hash == GENESIS_HASH
+    assert votes[1].prev_vote_hash == votes[0].vote_hash and votes[2].prev_vote_hash == votes[1].vote_hash
+
+    # Replaying the same batch burns nothing twice.
+    replay = client.post("/api/votes/batch", json={"ballots": ballots[:2]}).json()
+    assert replay["accepted"] == 0
+
+
+def test_batch_query_count_does_not_grow_with_ballots(db_session):
+    election, users = _active_election(db_session, 60)
+    service = _voting_service(db_session)
+    ballots = [schemas.VoteCastRequest(election_id=election.id, candidate_id=election.candidates[i % 2].id, user_id=u.id) for i, u in enumerate(users)]
+
+    track_queries()
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        results = service.cast_votes(ballots)
+    finally:
+        current_query_stats.reset(token)
+    assert all(r.success for r in results)
+    assert stats.count <= 6
+
+
+def test_idempotency_key_returns_original_receipt(client, db_session):
+    from src.application.services.voting_service import receipt_cache
+
+    election, users = _active_election(db_session, 2)
+    ballot = {"election_id": election.id, "candidate_id": election.candidates[0].id, "user_id": users[0].id}
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post("/api/votes", json=ballot, headers=headers)
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+
+    retry = client.post("/api/votes", json=ballot, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json()["vote_hash"] == first.json()["vote_hash"]
+
+    # Another worker (empty cache) finds the receipt through the index.
+    receipt_cache().clear()
+    retry = client.post("/api/votes", json=ballot, headers=headers)
+    assert retry.json()["vote_hash"] == first.json()["vote_hash"]
+    assert db_session.query(database.Vote).filter(database.Vote.election_id == election.id).count() == 1
+
+    # Without the key, or with a fresh one, the retry is a double vote.
+    assert client.post("/api/votes", json=ballot).status_code == 400
+    assert client.post("/api/votes", json=ballot, headers={"Idempotency-Key": "other"}).status_code == 400
+
+
+def test_expired_idempotency_keys_are_purged(db_session):
+    repo = SqlAlchemyVoteRepository(db_session)
+    now = datetime.now(timezone.utc)
+    vote = database.Vote(vote_hash="idem-vote", prev_vote_hash=GENESIS_HASH, election_id=1, candidate_id=1)
+    repo.create(vote, b"k" * 16, now - timedelta(seconds=1))
+    assert repo.get_receipt_by_idempotency_key(b"k" * 16, now) is None
+    assert repo.delete_expired_idempotency_keys(now, 100) == 1
+
+
+def test_derived_tokens_are_issued_without_writes_and_burned_once(db_session, monkeypatch):
+    from src.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "VOTING_TOKEN_MODE", "derived")
+    election, users = _active_election(db_session, 2)
+    service = _voting_service(db_session)
+    token = service.generate_token(users[0].id, election.id)
+    assert token == service.generate_token(users[0].id, election.id)
+    assert db_session.query(database.VotingToken).count() == 0
+
+    ballot = dict(election_id=election.id, candidate_id=election.candidates[0].id, user_id=users[0].id)
+    with pytest.raises(ValueError, match="Invalid voting token"):
+        service.cast_vote(schemas.VoteCastRequest(**ballot, voting_token=token[:-1] + ("A" if token[-1] != "A" else "B")))
+    with pytest.raises(ValueError, match="Invalid voting token"):
+        service.cast_vote(schemas.VoteCastRequest(**{**ballot, "user_id": users[1].id}, voting_token=token))
+    with pytest.raises(ValueError, match="Invalid voting token"):
+        service.cast_vote(schemas.VoteCastRequest(**ballot, voting_token="v1.\u00b2." + token.rsplit(".", 1)[1]))
+
+    service.cast_vote(schemas.VoteCastRequest(**ballot, voting_token=token))
+    row = db_session.query(database.VotingToken).one()
+    assert (row.user_id, row.is_used, row.token_hash) == (users[0].id, True, None)
+    with pytest.raises(ValueError, match="Double Vote"):
+        service.cast_vote(schemas.VoteCastRequest(**ballot, voting_token=token))
+
+
+def test_cast_with_stored_token_needs_no_user_id(client, db_session):
+    election, users = _active_election(db_session, 2)
+    service = _voting_service(db_session)
+    token = service.generate_token(users[0].id, election.id)
+    ballot = {"election_id": election.id, "candidate_id": election.candidates[0].id}
+
+    track_queries()
+    stats = QueryStats()
+    reset = current_query_stats.set(stats)
+    try:
+        service.cast_vote(schemas.VoteCastRequest(**ballot, voting_token=token))
+    finally:
+        current_query_stats.reset(reset)
+    # The token is found and burned by one UPDATE on token_hash; nothing SELECTs it first.
+    token_statements = [sql for sql in stats.statements if "voting_tokens" in sql]
+    assert len(token_statements) == 1 and token_statements[0].startswith("UPDATE")
+
+    assert client.post("/api/votes", json={**ballot, "voting_token": token}).json()["detail"].startswith("Double Vote")
+    assert client.post("/api/votes", json={**ballot, "voting_token": "not-a-token"}).json()["detail"] == "Invalid voting token."
+    other = service.generate_token(users[1].id, election.id)
+    assert client.post("/api/votes", json={**ballot, "voting_token": other, "user_id": users[0].id}).json()["detail"] == "Invalid voting token."
+    assert client.post("/api/votes", json=ballot).status_code == 422
+
+    batch = client.post("/api/votes/batch", json={"ballots": [{**ballot, "token": other}, {**ballot, "token": other}]}).json()
+    assert [r["success"] for r in batch["results"]] == [True, False]